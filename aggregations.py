@@ -0,0 +1,252 @@
+"""
+Aggregations behind the Data Visualization page.
+
+`bankroll_series` keeps a running P&L, peak and drawdown per gambler in one ledger per date scope (see
+`archive.scope_key`), shared by every session loading that scope. New bets are folded into the last running totals as
+they are appended; only an edit to an already processed bet, or a backdated bet, triggers a recompute from the start.
+"""
+import json
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+import metrics
+from analytics import net_result
+from schema import DATE_COLUMN, data_version
+
+LEDGER_COLUMNS = ["Gambler Name", DATE_COLUMN, "Bet Status", "Bet Amount", "Bet Payout Amount"]
+SETTLED_STATUSES = ["Win", "Loss", "Push"]
+FACETS = ["Bet Status", "Bet Type", "Bet Sport", "Sportsbook Name", "Certified Degenerate Bet"]
+AMOUNT_COLUMNS = ["Bet Amount", "Bet Net Win Amount"]
+# Pandas period frequencies for each chart resolution, finest first; seasons are calendar quarters
+RESOLUTIONS = {"Day": "D", "Week": "W", "Month": "M", "Season": "Q"}
+# Most buckets a time chart draws (two bars each)
+MAX_BUCKETS = 62
+
+
+def selection_key(selection: dict) -> str:
+    """
+    Stable cache key for a filter selection such as DynamicFilters' `st.session_state[filters_name]`.
+
+    Args:
+        selection (dict): {column: [selected values]}
+
+    Returns:
+        str: Canonical JSON of the non-empty selections
+    """
+    return json.dumps({column: sorted(map(str, values)) for column, values in sorted(selection.items()) if values}, sort_keys=True)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def facet_summary(_df: pd.DataFrame, version: str, selection: str) -> dict:
+    """
+    Counts every facet in one pass over categorical codes, and sums the amounts per day and rolls them up to every
+    resolution. Cached per data version and filter selection, so changing the date range or switching a chart never
+    recomputes anything.
+
+    Args:
+        _df (pd.DataFrame): Filtered bet data (not hashed; identified by `version` and `selection`)
+        version (str): `schema.data_version` of the unfiltered data
+        selection (str): `selection_key` of the active filters
+
+    Returns:
+        dict: {"facets": {facet: DataFrame[facet, "Count"]}, "rollups": {resolution: DataFrame} per `RESOLUTIONS`}
+            where each rollup has "Period", "Start", "End", *AMOUNT_COLUMNS and "Bets"
+    """
+    metrics.cache_miss()
+    # Offset each facet's codes into its own range so a single bincount counts all facets at once.
+    # Missing values (code -1) land in the slot reserved at the start of each range and are dropped.
+    categories = [_df[facet].cat.categories for facet in FACETS]
+    sizes = np.array([len(values) + 1 for values in categories])
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    codes = np.stack([_df[facet].cat.codes.to_numpy(dtype=np.int64) + 1 for facet in FACETS]) + offsets[:, None]
+    counts = np.bincount(codes.ravel(), minlength=sizes.sum())
+
+    facets = {}
+    for facet, values, offset, size in zip(FACETS, categories, offsets, sizes):
+        facet_counts = counts[offset + 1: offset + size]
+        observed = facet_counts > 0
+        # Largest first, as value_counts() ordered them
+        order = np.argsort(-facet_counts[observed], kind="stable")
+        facets[facet] = pd.DataFrame({facet: values[observed][order], "Count": facet_counts[observed][order]})
+
+    dates = _df[DATE_COLUMN].to_numpy(dtype="datetime64[D]")
+    valid = ~np.isnat(dates)
+    daily = pd.DataFrame({
+        DATE_COLUMN: pd.Series(dtype="datetime64[ns]"),
+        **{column: pd.Series(dtype="float64") for column in AMOUNT_COLUMNS},
+        "Bets": pd.Series(dtype="int64"),
+    })
+    if valid.any():
+        first = dates[valid].min()
+        day = (dates[valid] - first).astype(np.int64)
+        sums = {
+            column: np.bincount(day, weights=np.nan_to_num(_df[column].to_numpy(dtype=np.float64)[valid]))
+            for column in AMOUNT_COLUMNS
+        }
+        bets = np.bincount(day)
+        present = bets > 0
+        daily = pd.DataFrame({DATE_COLUMN: pd.to_datetime(first + np.flatnonzero(present))})
+        for column, values in sums.items():
+            daily[column] = values[present]
+        daily["Bets"] = bets[present]
+    return {"facets": facets, "rollups": rollups(daily)}
+
+
+def rollups(daily: pd.DataFrame) -> dict:
+    """
+    Rolls daily sums up to every resolution in `RESOLUTIONS`.
+
+    Args:
+        daily (pd.DataFrame): [DATE_COLUMN, *AMOUNT_COLUMNS, "Bets"], one row per day with bets
+
+    Returns:
+        dict: {resolution: DataFrame["Period", "Start", "End", *AMOUNT_COLUMNS, "Bets"]} with one row per period
+    """
+    result = {}
+    for resolution, frequency in RESOLUTIONS.items():
+        periods = daily[DATE_COLUMN].dt.to_period(frequency)
+        rollup = daily[AMOUNT_COLUMNS + ["Bets"]].groupby(periods.rename("Period"), sort=True).sum().reset_index()
+        rollup.insert(1, "Start", rollup["Period"].dt.start_time)
+        rollup.insert(2, "End", rollup["Period"].dt.end_time.dt.normalize())
+        rollup["Period"] = rollup["Period"].astype(str)
+        result[resolution] = rollup
+    return result
+
+
+def pick_resolution(rollups: dict, start: pd.Timestamp, end: pd.Timestamp) -> tuple:
+    """
+    Finest resolution whose periods overlapping [start, end] fit in `MAX_BUCKETS`, so any range draws a bounded
+    number of marks.
+
+    Args:
+        rollups (dict): Output of `rollups`
+        start (pd.Timestamp): First day of the range
+        end (pd.Timestamp): Last day of the range
+
+    Returns:
+        tuple: (resolution, rows of that rollup overlapping the range)
+    """
+    for resolution, rollup in rollups.items():
+        buckets = rollup[(rollup["End"] >= start) & (rollup["Start"] <= end)]
+        if len(buckets) <= MAX_BUCKETS:
+            break
+    return resolution, buckets
+
+
+class BankrollLedger:
+    """
+    Running P&L (payout minus stake, see `analytics.net_result`), peak and drawdown per gambler over settled bets in
+    date order, extended in place as bets append.
+    """
+
+    def __init__(self):
+        # Reentrant: `bankroll_series` holds it across an update and the series
+        self.lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.version = None
+        self.row_hashes = np.empty(0, dtype=np.uint64)
+        self.last_date = None
+        # {gambler: (P&L, peak, max drawdown)} after the last processed bet
+        self.totals = {}
+        self.chunks = []
+        self.daily = None
+
+    def _extend(self, rows: pd.DataFrame) -> None:
+        settled = rows["Bet Status"].isin(SETTLED_STATUSES).to_numpy() & rows[DATE_COLUMN].notna().to_numpy()
+        points = pd.DataFrame({
+            "Gambler": rows["Gambler Name"].astype("string").to_numpy()[settled],
+            DATE_COLUMN: rows[DATE_COLUMN].to_numpy()[settled],
+            # Payout minus stake: "Bet Net Win Amount" is 0 on a loss, so the curve would never fall
+            "Net": net_result(rows)[settled],
+        }).dropna(subset=["Gambler"]).sort_values(DATE_COLUMN, kind="stable")
+        if points.empty:
+            return
+        # Carry each gambler's totals from the previous chunk into this one
+        previous = pd.DataFrame.from_dict(self.totals, orient="index", columns=["P&L", "Peak", "Max Drawdown"])
+        previous = previous.reindex(points["Gambler"].unique()).astype("float64").fillna(0.0)
+        by_gambler = points.groupby("Gambler", sort=False)
+        points["P&L"] = by_gambler["Net"].cumsum() + previous.loc[points["Gambler"], "P&L"].to_numpy()
+        points["Peak"] = np.maximum(
+            points.groupby("Gambler", sort=False)["P&L"].cummax(), previous.loc[points["Gambler"], "Peak"].to_numpy()
+        )
+        points["Drawdown"] = points["Peak"] - points["P&L"]
+        points["Max Drawdown"] = np.maximum(
+            points.groupby("Gambler", sort=False)["Drawdown"].cummax(), previous.loc[points["Gambler"], "Max Drawdown"].to_numpy()
+        )
+        last = points.groupby("Gambler", sort=False)[["P&L", "Peak", "Max Drawdown"]].last()
+        self.totals.update({gambler: tuple(values) for gambler, values in zip(last.index, last.to_numpy())})
+        self.last_date = points[DATE_COLUMN].iloc[-1]
+        self.chunks.append(points.drop(columns="Net"))
+
+    def update(self, df: pd.DataFrame, version: str) -> int:
+        """
+        Folds bets appended since the last update into the running totals, or starts over when an already processed
+        bet changed or a new bet is dated before the last processed one.
+
+        Args:
+            df (pd.DataFrame): Bet data from `load_bets`
+            version (str): `schema.data_version` of the frame
+
+        Returns:
+            int: Number of rows processed
+        """
+        with self.lock:
+            if version == self.version:
+                return 0
+            hashes = pd.util.hash_pandas_object(df[LEDGER_COLUMNS], index=False).to_numpy()
+            processed = len(self.row_hashes)
+            appended = df.iloc[processed:]
+            appended_dates = appended.loc[appended["Bet Status"].isin(SETTLED_STATUSES), DATE_COLUMN].dropna()
+            incremental = (
+                processed <= len(hashes)
+                and np.array_equal(hashes[:processed], self.row_hashes)
+                and (self.last_date is None or appended_dates.empty or appended_dates.min() >= self.last_date)
+            )
+            if not incremental:
+                self._reset()
+                appended = df
+            self._extend(appended)
+            self.row_hashes = hashes
+            self.version = version
+            self.daily = None
+            return len(appended)
+
+    def series(self) -> pd.DataFrame:
+        """
+        End-of-day values per gambler.
+
+        Returns:
+            pd.DataFrame: ["Gambler", DATE_COLUMN, "P&L", "Peak", "Drawdown", "Max Drawdown"]
+        """
+        with self.lock:
+            if self.daily is None:
+                columns = ["Gambler", DATE_COLUMN, "P&L", "Peak", "Drawdown", "Max Drawdown"]
+                points = pd.concat(self.chunks, ignore_index=True) if self.chunks else pd.DataFrame(columns=columns)
+                self.daily = points.drop_duplicates(["Gambler", DATE_COLUMN], keep="last").reset_index(drop=True)[columns]
+            return self.daily
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _bankroll_ledger(scope: str) -> BankrollLedger:
+    return BankrollLedger()
+
+
+def bankroll_series(df: pd.DataFrame, scope: str = "") -> pd.DataFrame:
+    """
+    Daily running P&L and drawdown per gambler over the full, unfiltered bet history of a date scope. The scope's
+    ledger is updated and read under one lock, so another session cannot swap in a different frame in between.
+
+    Args:
+        df (pd.DataFrame): Bet data from `archive.load_scope`
+        scope (str): `archive.scope_key` of the scope `df` was loaded for
+
+    Returns:
+        pd.DataFrame: See `BankrollLedger.series`
+    """
+    ledger = _bankroll_ledger(scope)
+    with ledger.lock:
+        ledger.update(df, data_version(df))
+        return ledger.series()
@@ -0,0 +1,123 @@
+"""
+Odds and profitability metrics for the Data Visualization page.
+
+Everything is computed on whole columns: American odds become decimal odds and implied probabilities in a few array
+operations, and grouped totals are `np.bincount` sums over the categorical codes of each grouping column.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+import metrics
+from schema import ODDS_COLUMN
+
+GROUPINGS = ["Gambler Name", "Sportsbook Name", "Bet Sport", "Bet Type"]
+STAKE_COLUMN = "Bet Amount"
+PAYOUT_COLUMN = "Bet Payout Amount"
+# Win and Loss decide the hit rate; a Push returns the stake and only counts towards staked money
+HIT_STATUSES = ["Win", "Loss"]
+SETTLED_STATUSES = HIT_STATUSES + ["Push"]
+METRIC_COLUMNS = ["Bets", "Settled", "Wins", "Hit Rate", "Breakeven Rate", "Edge", "Staked", "Net", "ROI", "Avg Decimal Odds"]
+
+
+def american_to_decimal(odds: np.ndarray) -> np.ndarray:
+    """
+    Converts American odds to decimal odds, e.g. +150 -> 2.5 and -110 -> 1.909. Odds between -100 and +100, which
+    American odds cannot express, and unparsed odds become NaN.
+
+    Args:
+        odds (np.ndarray): American odds as numbers (see `schema.parse_odds`)
+
+    Returns:
+        np.ndarray: float64 decimal odds
+    """
+    odds = np.asarray(odds, dtype=np.float64)
+    decimal = np.full(odds.shape, np.nan)
+    positive = odds >= 100
+    negative = odds <= -100
+    decimal[positive] = 1 + odds[positive] / 100
+    decimal[negative] = 1 + 100 / -odds[negative]
+    return decimal
+
+
+def net_result(df: pd.DataFrame) -> np.ndarray:
+    """
+    Profit or loss of each bet: payout minus stake, so a lost stake counts against the gambler. "Bet Net Win Amount"
+    is entered as 0 on a loss and cannot be used for this. Missing amounts count as 0.
+
+    Args:
+        df (pd.DataFrame): Normalized bet data
+
+    Returns:
+        np.ndarray: float64 net per bet, aligned with `df`
+    """
+    stake = np.nan_to_num(df[STAKE_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan))
+    payout = np.nan_to_num(df[PAYOUT_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan))
+    return payout - stake
+
+
+def _grouped(codes: np.ndarray, labels: pd.Index, columns: dict) -> pd.DataFrame:
+    """
+    Sums each weight array per group code; code -1 (missing) is dropped by shifting it into a discarded slot.
+    """
+    size = len(labels) + 1
+    sums = {name: np.bincount(codes + 1, weights=weights, minlength=size)[1:] for name, weights in columns.items()}
+    return pd.DataFrame(sums, index=labels)
+
+
+def _metrics(totals: pd.DataFrame) -> pd.DataFrame:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        totals["Hit Rate"] = totals["Wins"] / totals["Decided"]
+        totals["Breakeven Rate"] = totals["Implied Sum"] / totals["Priced"]
+        totals["Edge"] = totals["Hit Rate"] - totals["Breakeven Rate"]
+        totals["ROI"] = totals["Net"] / totals["Staked"]
+        totals["Avg Decimal Odds"] = totals["Decimal Sum"] / totals["Priced"]
+    totals = totals.replace([np.inf, -np.inf], np.nan)
+    for column in ["Bets", "Settled", "Wins"]:
+        totals[column] = totals[column].astype(np.int64)
+    return totals[METRIC_COLUMNS]
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def profitability(_df: pd.DataFrame, version: str, selection: str) -> dict:
+    """
+    Hit rate against the breakeven rate implied by the odds, plus staked money, net and ROI, overall and per
+    grouping. Cached per data version and filter selection.
+
+    Hit rate counts only wins and losses. The breakeven rate is the mean implied probability of those same bets, so
+    "Edge" is how much more often a gambler wins than the odds they took require. ROI is net (see `net_result`) over
+    staked for settled bets (wins, losses and pushes).
+
+    Args:
+        _df (pd.DataFrame): Filtered bet data (not hashed; identified by `version` and `selection`)
+        version (str): `schema.data_version` of the unfiltered data
+        selection (str): `aggregations.selection_key` of the active filters
+
+    Returns:
+        dict: {"overall": Series of METRIC_COLUMNS, "groups": {grouping: DataFrame[METRIC_COLUMNS] by value}}
+    """
+    metrics.cache_miss()
+    status = _df["Bet Status"].astype("string").to_numpy(dtype=object, na_value="")
+    decided = np.isin(status, HIT_STATUSES)
+    settled = np.isin(status, SETTLED_STATUSES)
+    decimal = american_to_decimal(_df[ODDS_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan))
+    priced = decided & ~np.isnan(decimal)
+    columns = {
+        "Bets": np.ones(len(_df)),
+        "Settled": settled.astype(np.float64),
+        "Decided": decided.astype(np.float64),
+        "Wins": (status == "Win").astype(np.float64),
+        "Priced": priced.astype(np.float64),
+        "Implied Sum": np.where(priced, 1 / decimal, 0.0),
+        "Decimal Sum": np.where(priced, decimal, 0.0),
+        "Staked": np.where(settled, np.nan_to_num(_df[STAKE_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)), 0.0),
+        "Net": np.where(settled, net_result(_df), 0.0),
+    }
+
+    overall = _metrics(pd.DataFrame({name: [values.sum()] for name, values in columns.items()})).iloc[0]
+    groups = {}
+    for grouping in GROUPINGS:
+        values = _df[grouping]
+        codes = values.cat.codes.to_numpy(dtype=np.int64)
+        totals = _metrics(_grouped(codes, values.cat.categories, columns))
+        groups[grouping] = totals[totals["Bets"] > 0].sort_values("Net", ascending=False)
+    return {"overall": overall, "groups": groups}
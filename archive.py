@@ -0,0 +1,345 @@
+"""
+Date-partitioned archive of closed periods.
+
+Master is the hot partition: it holds the current period's bets, every open ("Placed") bet and anything logged since
+the last rollover, and it is the only tab the app writes to. Settled bets of closed periods are moved into one
+read-only `Archive <period>` tab per year (or per season, a calendar quarter, with `BETS_ARCHIVE_PERIOD=season`).
+
+`utils.load_bets(start, end)` reads Master plus only the archive tabs overlapping the requested Bet Date range, and
+an archive tab's mirror is never re-fetched once it has been read. The rollover runs through the write queue so it is
+ordered with every other write to Master:
+
+    python archive.py rollover          # queue a rollover for the running app's write worker
+    python archive.py rollover --run    # roll over now, in this process
+    python archive.py list              # print the archive tabs and their date ranges
+"""
+import argparse
+from collections import Counter
+import os
+from typing import TYPE_CHECKING
+import pandas as pd
+import streamlit as st
+from schema import DATE_COLUMN, data_version
+from utils import (
+    BETS_CACHE_TTL,
+    FIRST_DATA_ROW,
+    LOCAL_SOURCE_ENV,
+    MASTER_TAB,
+    get_spreadsheet,
+    get_worksheet,
+    invalidate_bets,
+    load_bets,
+    spreadsheet_id,
+    write_bet_delta,
+)
+
+# gspread is imported where a tab is created; reading the partition list only needs the spreadsheet handle
+if TYPE_CHECKING:
+    import gspread
+
+ARCHIVE_PREFIX = "Archive "
+# Partition size: "year", or "season" (calendar quarter, as on the Data Visualization page)
+ARCHIVE_PERIOD = os.environ.get("BETS_ARCHIVE_PERIOD", "year")
+FREQUENCIES = {"year": "Y", "season": "Q"}
+# Open bets stay in Master, where they are settled, even after their period closes
+HOT_STATUSES = ["Placed"]
+ROLLOVER_GAMBLER = "Archive rollover"
+
+
+def period_of(dates: pd.Series) -> pd.Series:
+    """
+    Archive partition of each date, per `ARCHIVE_PERIOD`.
+
+    Args:
+        dates (pd.Series): datetime64 dates
+
+    Returns:
+        pd.Series: Periods, NaT where the date is missing
+    """
+    return dates.dt.to_period(FREQUENCIES[ARCHIVE_PERIOD])
+
+
+@st.cache_data(ttl=BETS_CACHE_TTL, show_spinner=False)
+def archived_periods(key: str) -> dict:
+    """
+    Archive tabs and the date range each covers, from the spreadsheet's tab list. Cached like the bet data and
+    cleared by a rollover.
+
+    Args:
+        key (str): Spreadsheet key
+
+    Returns:
+        dict: {tab title: (first day, last day)} ordered by first day
+    """
+    periods = {}
+    for worksheet in get_spreadsheet(key).worksheets():
+        if worksheet.title.startswith(ARCHIVE_PREFIX):
+            period = pd.Period(worksheet.title[len(ARCHIVE_PREFIX):])
+            periods[worksheet.title] = (period.start_time.normalize(), period.end_time.normalize())
+    return dict(sorted(periods.items(), key=lambda item: item[1]))
+
+
+def partitions_for(key: str, start: pd.Timestamp = None, end: pd.Timestamp = None) -> list:
+    """
+    Archive tabs overlapping [start, end]; Master is always read on top of them.
+
+    Args:
+        key (str): Spreadsheet key
+        start (pd.Timestamp): First Bet Date needed, or None for the beginning
+        end (pd.Timestamp): Last Bet Date needed, or None for today
+
+    Returns:
+        list: Tab titles, oldest first
+    """
+    return [
+        title for title, (first, last) in archived_periods(key).items()
+        if (start is None or last >= start) and (end is None or first <= end)
+    ]
+
+
+def hot_start(key: str):
+    """
+    First day after the newest archived period. Passing it as `start` to `utils.load_bets` reads Master alone.
+
+    Args:
+        key (str): Spreadsheet key
+
+    Returns:
+        pd.Timestamp | None: The day, or None when nothing is archived yet
+    """
+    periods = archived_periods(key)
+    return max(last for _, last in periods.values()) + pd.Timedelta(days=1) if periods else None
+
+
+def hot_only() -> dict:
+    """
+    `utils.load_bets` arguments that read Master alone, for pages that write to it by row position.
+
+    Returns:
+        dict: {"start": ...}, empty when reading a local source file
+    """
+    if os.environ.get(LOCAL_SOURCE_ENV):
+        return {}
+    return {"start": hot_start(spreadsheet_id())}
+
+
+def default_scope() -> dict:
+    """
+    The `date_scope` a session starts with: the hot partition up to today, or no bounds when nothing is archived.
+
+    Returns:
+        dict: `load_scope` arguments
+    """
+    if os.environ.get(LOCAL_SOURCE_ENV):
+        return {}
+    hot = hot_start(spreadsheet_id())
+    if hot is None:
+        return {}
+    return {"start": hot, "end": max(pd.Timestamp.today().normalize(), hot)}
+
+
+def date_scope() -> dict:
+    """
+    Sidebar range of Bet Dates to load, shown once periods have been archived. It defaults to the hot partition, so a
+    page reads only Master until the range is widened into archived periods.
+
+    Returns:
+        dict: `load_scope` arguments, {"start": ..., "end": ...}, empty when nothing is archived
+    """
+    default = default_scope()
+    if not default:
+        return {}
+    first = min(first for first, _ in archived_periods(spreadsheet_id()).values())
+    scope = st.sidebar.date_input(
+        "Bet dates to load:", value=(default["start"].date(), default["end"].date()), min_value=first.date(),
+        key="bet_date_scope",
+    )
+    st.sidebar.caption(
+        f"Bets before {default['start']:%Y-%m-%d} are archived by {ARCHIVE_PERIOD}. Only bets dated within the range "
+        "are shown."
+    )
+    # The range is a single date while the second end is being picked
+    start, end = (scope[0], scope[1]) if len(scope) == 2 else (scope[0], None)
+    return {"start": pd.Timestamp(start), "end": pd.Timestamp(end) if end else None}
+
+
+def scope_key(scope: dict) -> str:
+    """
+    Names a `date_scope` for the caches kept per scope rather than per data version (`search.search_text`,
+    `aggregations.bankroll_series`), so sessions loading different ranges do not share them.
+
+    Args:
+        scope (dict): `load_scope` arguments
+
+    Returns:
+        str: e.g. "2026-01-01..2026-10-18", or ".." when unbounded
+    """
+    return "..".join(f"{scope[bound]:%Y-%m-%d}" if scope.get(bound) is not None else "" for bound in ("start", "end"))
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _in_scope(_df: pd.DataFrame, version: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    dates = _df[DATE_COLUMN]
+    keep = pd.Series(True, index=_df.index)
+    if start is not None:
+        keep &= dates >= start
+    if end is not None:
+        keep &= dates < end + pd.Timedelta(days=1)
+    keep |= dates.isna()
+    if keep.all():
+        return _df
+    scoped = _df[keep.to_numpy()].reset_index(drop=True)
+    scoped.attrs["data_version"] = f"{version}:{start}:{end}"
+    return scoped
+
+
+def load_scope(start: pd.Timestamp = None, end: pd.Timestamp = None) -> pd.DataFrame:
+    """
+    Bets dated within [start, end]. `utils.load_bets` reads whole partitions, so this trims Master and the archived
+    periods it loaded to the range. Bets without a date are kept, and rows are renumbered so Bet IDs stay positions.
+
+    Args:
+        start (pd.Timestamp): First Bet Date, inclusive
+        end (pd.Timestamp): Last Bet Date, inclusive
+
+    Returns:
+        pd.DataFrame: Bet data
+    """
+    df = load_bets(start, end)
+    if start is None and end is None:
+        return df
+    return _in_scope(df, data_version(df), start, end)
+
+
+def archive_worksheet(key: str, title: str, header: list) -> "gspread.Worksheet":
+    """
+    Gets an archive tab, creating it with the sheet header on first use.
+
+    Args:
+        key (str): Spreadsheet key
+        title (str): Tab title
+        header (list): Master's header row
+
+    Returns:
+        gspread.Worksheet: Archive worksheet
+    """
+    import gspread
+
+    try:
+        return get_worksheet(key, title)
+    except gspread.exceptions.WorksheetNotFound:
+        worksheet = get_spreadsheet(key).add_worksheet(title, rows=1, cols=len(header))
+        worksheet.update("A1", [header], value_input_option="RAW")
+        return get_worksheet(key, title)
+
+
+def _archive_rows(worksheet: "gspread.Worksheet", rows: list) -> bool:
+    """
+    Appends the rows an archive tab does not hold yet, as the strings Master shows (`RAW`, so a re-read compares equal
+    to Master's row). Each attempt re-reads the tab, so retrying an append that had landed does not write it twice.
+
+    Returns:
+        bool: Whether any rows were appended
+    """
+    archived = Counter(tuple((row + [""] * len(rows[0]))[:len(rows[0])]) for row in worksheet.get_all_values()[1:])
+    pending = []
+    for row in map(tuple, rows):
+        if archived[row]:
+            archived[row] -= 1
+        else:
+            pending.append(list(row))
+    if pending:
+        worksheet.append_rows(pending, value_input_option="RAW")
+    return bool(pending)
+
+
+def _prune_master(master: "gspread.Worksheet", header: list, rows: list, closed) -> None:
+    """
+    Deletes the archived rows from Master. Each attempt re-reads Master and deletes only the archived rows still in
+    it, so retrying after a deletion that had landed does not delete other bets.
+    """
+    current = [(row + [""] * len(header))[:len(header)] for row in master.get_all_values()[1:]]
+    # Master has only lost archived rows since `rows` was read (and may have gained appended ones), so the rows still
+    # in it line up with `rows` in order
+    deleted_rows, next_row = [], 0
+    for position, row in enumerate(rows):
+        if next_row < len(current) and current[next_row] == row:
+            if closed[position]:
+                deleted_rows.append(next_row)
+            next_row += 1
+        elif not closed[position]:
+            raise ValueError(
+                f"Master changed during the rollover (the bet in sheet row {position + FIRST_DATA_ROW} moved); run it again"
+            )
+    write_bet_delta(master, header, {"edited_rows": {}, "added_rows": [], "deleted_rows": deleted_rows})
+
+
+def rollover(key: str = None, today: pd.Timestamp = None) -> list:
+    """
+    Moves settled bets of closed periods from Master into their archive tabs: appends each period's rows to its tab,
+    then deletes them from Master bottom-up. Rows already in the archive tab (from a rollover interrupted between the
+    two steps) are not appended twice, and rows already gone from Master are not deleted twice.
+
+    Args:
+        key (str): Spreadsheet key, defaults to `spreadsheet_id()`
+        today (pd.Timestamp): Decides which period is current, defaults to today
+
+    Returns:
+        list: Journal rows for the deletions from Master
+    """
+    import journal
+    import mirror
+    from write_queue import with_backoff
+
+    key = key or spreadsheet_id()
+    master = get_worksheet(key, MASTER_TAB)
+    values = with_backoff(master.get_all_values)
+    if len(values) < 2:
+        return []
+    header, rows = values[0], [(row + [""] * len(values[0]))[:len(values[0])] for row in values[1:]]
+    raw = pd.DataFrame(rows, columns=header, dtype="string")
+    periods = period_of(pd.to_datetime(raw[DATE_COLUMN], errors="coerce", format="mixed"))
+    current = pd.Timestamp(today or pd.Timestamp.today()).to_period(FREQUENCIES[ARCHIVE_PERIOD])
+    closed = (periods.notna() & (periods < current) & ~raw["Bet Status"].isin(HOT_STATUSES)).to_numpy(dtype=bool)
+    if not closed.any():
+        return []
+
+    for period in sorted(periods[closed].unique()):
+        worksheet = archive_worksheet(key, f"{ARCHIVE_PREFIX}{period}", header)
+        positions = (closed & (periods == period).to_numpy(dtype=bool)).nonzero()[0]
+        if with_backoff(_archive_rows, worksheet, [rows[position] for position in positions]):
+            # Archive mirrors are otherwise never re-read
+            mirror.mark_changed(full=True, key=key, tab_name=worksheet.title)
+
+    with_backoff(_prune_master, master, header, rows, closed)
+    # Deletions shift every row below them, so Master's mirror needs a full re-read
+    mirror.mark_changed(full=True, key=key)
+    archived_periods.clear()
+    invalidate_bets()
+    delta = {"edited_rows": {}, "added_rows": [], "deleted_rows": closed.nonzero()[0].tolist()}
+    before = {position: dict(zip(header, rows[position])) for position in delta["deleted_rows"]}
+    return journal.delta_entries(ROLLOVER_GAMBLER, header, before, delta)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    rollover_parser = subparsers.add_parser("rollover", help="Archive settled bets of closed periods")
+    rollover_parser.add_argument("--run", action="store_true", help="Roll over in this process instead of queueing it")
+    subparsers.add_parser("list", help="Print the archive tabs")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for title, (first, last) in archived_periods.__wrapped__(spreadsheet_id()).items():
+            print(f"{title}: {first:%Y-%m-%d} to {last:%Y-%m-%d}")
+    elif args.run:
+        import journal
+
+        key = spreadsheet_id()
+        entries = rollover(key)
+        journal.record(key, entries)
+        print(f"Archived {len(entries)} bets from {MASTER_TAB}")
+    else:
+        from write_queue import enqueue_rollover
+
+        print(f"Queued rollover as write #{enqueue_rollover()}")
@@ -0,0 +1,349 @@
+"""
+Spreadsheet backends.
+
+The app reaches Google Sheets through `utils.get_spreadsheet`, which returns a gspread `Spreadsheet`. With
+`BETS_BACKEND=local` it returns a `LocalSpreadsheet` instead: a SQLite-backed stand-in implementing the subset of the
+gspread API the app uses (`worksheet`, `worksheets`, `add_worksheet`, `del_worksheet`, and on worksheets
+`get_all_values`, `batch_get`, `update`, `batch_update`, `append_rows`, `delete_rows`, `clear` and `read`). Every call
+can be slowed down and rate limited like the real API:
+
+    BETS_BACKEND=local BETS_LOCAL_LATENCY_MS=250 BETS_LOCAL_WRITE_QUOTA=60 streamlit run Home.py
+
+Over-quota calls raise the same `gspread.exceptions.APIError` (HTTP 429) that Google returns, so caching, batching and
+the write queue's backoff behave as they would online. Seed the Master and Backup tabs from a file with:
+
+    python backend.py seed --from .cache/bench/bets_100000.parquet
+"""
+import argparse
+from collections import deque
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+import json
+import os
+import sqlite3
+import threading
+import time
+import gspread
+import pandas as pd
+import requests
+import metrics
+from schema import COLUMNS
+
+GSHEETS = "gsheets"
+LOCAL = "local"
+BACKEND = os.environ.get("BETS_BACKEND", GSHEETS)
+LOCAL_SPREADSHEET_ID = os.environ.get("BETS_LOCAL_SPREADSHEET", "local")
+LOCAL_PATH = os.environ.get(
+    "BETS_LOCAL_SHEETS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "local_sheets.sqlite"),
+)
+# Simulated API behavior: added latency per call, and read/write requests allowed per minute (0 = unlimited)
+LATENCY_SECONDS = float(os.environ.get("BETS_LOCAL_LATENCY_MS", 0)) / 1000
+READ_QUOTA = int(os.environ.get("BETS_LOCAL_READ_QUOTA", 0))
+WRITE_QUOTA = int(os.environ.get("BETS_LOCAL_WRITE_QUOTA", 0))
+QUOTA_WINDOW_SECONDS = 60
+# Tabs created with the sheet header when a local spreadsheet is first opened
+DEFAULT_TABS = ["Master", "Backup"]
+
+
+class Quota:
+    """
+    Sliding one-minute window of request timestamps per kind ("read" / "write"), shared by every local spreadsheet
+    in the process, like Google's per-user quota.
+    """
+
+    def __init__(self, limits: dict):
+        self.limits = limits
+        self.calls = {kind: deque() for kind in limits}
+        self.lock = threading.Lock()
+
+    def acquire(self, kind: str) -> None:
+        """
+        Sleeps for the configured latency, then records a call or raises a 429 when the window is full.
+
+        Args:
+            kind (str): "read" or "write"
+        """
+        metrics.count("sheets_api_calls", method=kind, backend=LOCAL)
+        if LATENCY_SECONDS:
+            time.sleep(LATENCY_SECONDS)
+        limit = self.limits[kind]
+        if not limit:
+            return
+        with self.lock:
+            now = time.monotonic()
+            calls = self.calls[kind]
+            while calls and now - calls[0] >= QUOTA_WINDOW_SECONDS:
+                calls.popleft()
+            if len(calls) >= limit:
+                raise quota_exceeded(kind, limit)
+            calls.append(now)
+
+
+def quota_exceeded(kind: str, limit: int) -> gspread.exceptions.APIError:
+    """
+    The error gspread raises when Google rejects a request for exceeding the per-minute quota.
+    """
+    response = requests.models.Response()
+    response.status_code = 429
+    response._content = json.dumps({
+        "error": {
+            "code": 429,
+            "message": f"Quota exceeded for quota metric '{kind.title()} requests' ({limit} per minute per user).",
+            "status": "RESOURCE_EXHAUSTED",
+        }
+    }).encode()
+    return gspread.exceptions.APIError(response)
+
+
+quota = Quota({"read": READ_QUOTA, "write": WRITE_QUOTA})
+
+
+@contextmanager
+def _connect(path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with closing(sqlite3.connect(path, timeout=30, isolation_level=None)) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS tabs (spreadsheet TEXT, title TEXT, position INTEGER, PRIMARY KEY (spreadsheet, title))")
+        conn.execute("CREATE TABLE IF NOT EXISTS cells (spreadsheet TEXT, tab TEXT, row INTEGER, data TEXT, PRIMARY KEY (spreadsheet, tab, row))")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (spreadsheet TEXT PRIMARY KEY, modified_time TEXT)")
+        yield conn
+
+
+def _render(value) -> str:
+    # Sheets displays whole numbers without a decimal point and booleans in capitals
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return str(value).upper()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _grid(range_name: str) -> tuple:
+    """
+    0-based (first row, end row, first column, end column) of an A1 range, ends exclusive and None when unbounded.
+    """
+    grid = gspread.utils.a1_range_to_grid_range(range_name.split("!")[-1])
+    return grid.get("startRowIndex", 0), grid.get("endRowIndex"), grid.get("startColumnIndex", 0), grid.get("endColumnIndex")
+
+
+class LocalWorksheet:
+    """
+    One tab of a `LocalSpreadsheet`. Rows are stored as JSON lists of display strings, keyed by 1-based row number.
+    """
+
+    def __init__(self, spreadsheet: "LocalSpreadsheet", title: str):
+        self.spreadsheet = spreadsheet
+        self.title = title
+
+    def _rows(self, conn: sqlite3.Connection, first: int = 1, last: int = None) -> dict:
+        rows = conn.execute(
+            "SELECT row, data FROM cells WHERE spreadsheet = ? AND tab = ? AND row >= ? AND row <= ? ORDER BY row",
+            (self.spreadsheet.id, self.title, first, last if last is not None else 2 ** 62),
+        ).fetchall()
+        return {row: json.loads(data) for row, data in rows}
+
+    def _write(self, conn: sqlite3.Connection, first_row: int, first_col: int, values: list) -> None:
+        existing = self._rows(conn, first_row, first_row + len(values) - 1)
+        for offset, row_values in enumerate(values):
+            row = existing.get(first_row + offset, [])
+            row += [""] * (first_col + len(row_values) - len(row))
+            row[first_col:first_col + len(row_values)] = map(_render, row_values)
+            while row and row[-1] == "":
+                row.pop()
+            conn.execute(
+                "INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?)", (self.spreadsheet.id, self.title, first_row + offset, json.dumps(row))
+            )
+
+    def _last_row(self, conn: sqlite3.Connection) -> int:
+        last = conn.execute("SELECT MAX(row) FROM cells WHERE spreadsheet = ? AND tab = ?", (self.spreadsheet.id, self.title)).fetchone()[0]
+        return last or 0
+
+    def _get(self, conn: sqlite3.Connection, range_name: str) -> list:
+        first_row, end_row, first_col, end_col = _grid(range_name)
+        rows = self._rows(conn, first_row + 1, end_row)
+        values = [rows.get(row, [])[first_col:end_col] for row in range(first_row + 1, max(rows, default=first_row) + 1)]
+        # Like the API, trailing empty rows are not returned
+        while values and not any(values[-1]):
+            values.pop()
+        return values
+
+    def get_all_values(self) -> list:
+        """
+        Every row, padded to the widest row, as gspread returns it.
+        """
+        quota.acquire("read")
+        with _connect(self.spreadsheet.path) as conn:
+            rows = self._rows(conn)
+        values = [rows.get(row, []) for row in range(1, max(rows, default=0) + 1)]
+        width = max(map(len, values), default=0)
+        return [row + [""] * (width - len(row)) for row in values]
+
+    def batch_get(self, ranges: list, **kwargs) -> list:
+        quota.acquire("read")
+        with _connect(self.spreadsheet.path) as conn:
+            return [self._get(conn, range_name) for range_name in ranges]
+
+    def read(self) -> pd.DataFrame:
+        """
+        The tab as a string DataFrame with the first row as header, like `GSheetsConnection.read`.
+        """
+        values = self.get_all_values()
+        if not values:
+            return pd.DataFrame(dtype="string")
+        return pd.DataFrame(values[1:], columns=values[0], dtype="string")
+
+    def update(self, range_name: str, values: list = None, **kwargs) -> dict:
+        quota.acquire("write")
+        first_row, _, first_col, _ = _grid(range_name)
+        with self.spreadsheet._transaction() as conn:
+            self._write(conn, first_row + 1, first_col, values or [])
+        return {"updatedRange": f"{self.title}!{range_name.split('!')[-1]}", "updatedRows": len(values or [])}
+
+    def batch_update(self, data: list, **kwargs) -> dict:
+        quota.acquire("write")
+        with self.spreadsheet._transaction() as conn:
+            for entry in data:
+                first_row, _, first_col, _ = _grid(entry["range"])
+                self._write(conn, first_row + 1, first_col, entry["values"])
+        return {"totalUpdatedRows": sum(len(entry["values"]) for entry in data)}
+
+    def append_rows(self, values: list, **kwargs) -> dict:
+        quota.acquire("write")
+        with self.spreadsheet._transaction() as conn:
+            first_row = self._last_row(conn) + 1
+            self._write(conn, first_row, 0, values)
+        last_col = gspread.utils.rowcol_to_a1(1, max(map(len, values), default=1)).rstrip("1")
+        return {
+            "spreadsheetId": self.spreadsheet.id,
+            "updates": {
+                "updatedRange": f"{self.title}!A{first_row}:{last_col}{first_row + len(values) - 1}",
+                "updatedRows": len(values),
+            },
+        }
+
+    def delete_rows(self, start_index: int, end_index: int = None) -> dict:
+        quota.acquire("write")
+        end_index = end_index or start_index
+        count = end_index - start_index + 1
+        with self.spreadsheet._transaction() as conn:
+            key = (self.spreadsheet.id, self.title)
+            conn.execute("DELETE FROM cells WHERE spreadsheet = ? AND tab = ? AND row BETWEEN ? AND ?", (*key, start_index, end_index))
+            # Shift through negative row numbers so no intermediate state collides with the primary key
+            conn.execute("UPDATE cells SET row = -(row - ?) WHERE spreadsheet = ? AND tab = ? AND row > ?", (count, *key, end_index))
+            conn.execute("UPDATE cells SET row = -row WHERE spreadsheet = ? AND tab = ? AND row < 0", key)
+        return {}
+
+    def clear(self) -> dict:
+        quota.acquire("write")
+        with self.spreadsheet._transaction() as conn:
+            conn.execute("DELETE FROM cells WHERE spreadsheet = ? AND tab = ?", (self.spreadsheet.id, self.title))
+        return {}
+
+
+class LocalSpreadsheet:
+    """
+    SQLite-backed stand-in for `gspread.Spreadsheet`. Opening a new one creates `DEFAULT_TABS` with the sheet header.
+    """
+
+    def __init__(self, key: str = LOCAL_SPREADSHEET_ID, path: str = LOCAL_PATH):
+        self.id = key
+        self.title = key
+        self.path = path
+        with _connect(path) as conn:
+            if not conn.execute("SELECT 1 FROM tabs WHERE spreadsheet = ?", (key,)).fetchone():
+                for title in DEFAULT_TABS:
+                    self._add(conn, title)
+                    LocalWorksheet(self, title)._write(conn, 1, 0, [COLUMNS])
+                self._touch(conn)
+
+    def _add(self, conn: sqlite3.Connection, title: str) -> None:
+        position = conn.execute("SELECT COUNT(*) FROM tabs WHERE spreadsheet = ?", (self.id,)).fetchone()[0]
+        conn.execute("INSERT INTO tabs VALUES (?, ?, ?)", (self.id, title, position))
+
+    def _touch(self, conn: sqlite3.Connection) -> None:
+        modified = datetime.now(timezone.utc).isoformat(timespec="microseconds").replace("+00:00", "Z")
+        conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (self.id, modified))
+
+    @contextmanager
+    def _transaction(self):
+        with _connect(self.path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                self._touch(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    @property
+    def lastUpdateTime(self) -> str:
+        """
+        RFC 3339 time of the last write, the local equivalent of Drive's `modifiedTime`.
+        """
+        quota.acquire("read")
+        with _connect(self.path) as conn:
+            return conn.execute("SELECT modified_time FROM meta WHERE spreadsheet = ?", (self.id,)).fetchone()[0]
+
+    def worksheets(self) -> list:
+        quota.acquire("read")
+        with _connect(self.path) as conn:
+            titles = conn.execute("SELECT title FROM tabs WHERE spreadsheet = ? ORDER BY position", (self.id,)).fetchall()
+        return [LocalWorksheet(self, title) for title, in titles]
+
+    def worksheet(self, title: str) -> LocalWorksheet:
+        quota.acquire("read")
+        with _connect(self.path) as conn:
+            if not conn.execute("SELECT 1 FROM tabs WHERE spreadsheet = ? AND title = ?", (self.id, title)).fetchone():
+                raise gspread.exceptions.WorksheetNotFound(title)
+        return LocalWorksheet(self, title)
+
+    def add_worksheet(self, title: str, rows: int = 1000, cols: int = 26, **kwargs) -> LocalWorksheet:
+        quota.acquire("write")
+        with self._transaction() as conn:
+            self._add(conn, title)
+        return LocalWorksheet(self, title)
+
+    def del_worksheet(self, worksheet: LocalWorksheet) -> None:
+        quota.acquire("write")
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM tabs WHERE spreadsheet = ? AND title = ?", (self.id, worksheet.title))
+            conn.execute("DELETE FROM cells WHERE spreadsheet = ? AND tab = ?", (self.id, worksheet.title))
+
+
+def seed(source: pd.DataFrame, key: str = LOCAL_SPREADSHEET_ID, path: str = LOCAL_PATH, tabs: list = DEFAULT_TABS) -> None:
+    """
+    Replaces the contents of the given local tabs with a header row plus `source`.
+
+    Args:
+        source (pd.DataFrame): Sheet values, e.g. from `bench/generate.py` or `utils.read_local_source`
+        key (str): Local spreadsheet key
+        path (str): SQLite file
+        tabs (list): Tabs to fill
+    """
+    spreadsheet = LocalSpreadsheet(key, path)
+    values = [source.columns.tolist()] + source.fillna("").astype(str).values.tolist()
+    with spreadsheet._transaction() as conn:
+        for title in tabs:
+            if not conn.execute("SELECT 1 FROM tabs WHERE spreadsheet = ? AND title = ?", (key, title)).fetchone():
+                spreadsheet._add(conn, title)
+            conn.execute("DELETE FROM cells WHERE spreadsheet = ? AND tab = ?", (key, title))
+            conn.executemany(
+                "INSERT INTO cells VALUES (?, ?, ?, ?)",
+                [(key, title, row, json.dumps(row_values)) for row, row_values in enumerate(values, start=1)],
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    seed_parser = subcommands.add_parser("seed", help="Fill the local Master and Backup tabs from a Parquet or CSV file")
+    seed_parser.add_argument("--from", dest="source", required=True)
+    args = parser.parse_args()
+
+    from utils import read_local_source
+
+    seed(read_local_source(args.source))
+    print(f"Seeded {', '.join(DEFAULT_TABS)} in {LOCAL_PATH} from {args.source}")
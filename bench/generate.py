@@ -0,0 +1,154 @@
+"""
+Synthetic bet history generator.
+
+Produces sheet-formatted string rows (the same values `mirror.sync` returns) using the app's real gamblers,
+sportsbooks, statuses, sports and bet types, with multi-leg parlays, odds that follow the number of legs, and payouts
+consistent with each bet's status. Point the app at the output with `BETS_LOCAL_SOURCE`:
+
+    python bench/generate.py --rows 100000 --out .cache/bench/bets_100000.parquet
+    BETS_LOCAL_SOURCE=.cache/bench/bets_100000.parquet streamlit run Home.py
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from schema import (  # noqa: E402
+    COLUMNS,
+    bet_category_selectbox,
+    bet_sport_selectbox,
+    bet_type_selectbox,
+    gambler_selectbox,
+    risk_type_selectbox,
+    sportsbook_selectbox,
+)
+
+FIRST_BET_DATE = np.datetime64("2025-01-01")
+PLAYERS = [
+    "Obi Toppin", "Sandy Alcantara", "Jalen Brunson", "Tyrese Haliburton", "Giannis Antetokounmpo", "Jordan Love",
+    "Christian Yelich", "Aaron Judge", "Shohei Ohtani", "Connor McDavid", "Auston Matthews", "Josh Allen",
+    "Patrick Mahomes", "Nikola Jokic", "Luka Doncic", "Jayson Tatum", "Scottie Scheffler", "Carlos Alcaraz",
+    "Jannik Sinner", "Erling Haaland", "Bobby Witt Jr.", "Jacob Misiorowski", "Kyle Schwarber", "Jonathan Taylor",
+]
+STATISTICS = [
+    "Over 4.5 R+A", "Under 17.5 Outs", "Over 24.5 Points", "Over 1.5 Hits+Runs+RBIs", "Anytime TD", "Over 6.5 Strikeouts",
+    "Over 249.5 Passing Yards", "Over 0.5 Goals", "Under 3.5 Assists", "Over 8.5 Rebounds", "Moneyline", "-1.5 Spread",
+]
+TEAMS = ["NYK", "IND", "MIA", "NYM", "MIL", "GB", "CHI", "DET", "BOS", "LAD", "NYY", "DEN", "DAL", "KC", "BUF", "TOR", "EDM"]
+NOTES = ["", "", "", "", "FLEX FRIDAY", "PAYOUT BOOST", "Profit boost 50%", "Free bet", "Tail Ty", "Fade the public"]
+# Share of bets by bet type; the most recent bets are still open
+TYPE_WEIGHTS = [0.45, 0.5, 0.05]
+PUSH_RATE = 0.04
+REBOOT_RATE = 0.03
+# Bets win slightly less often than their odds imply, as they would against the vig
+WIN_RATE_EDGE = 0.95
+OPEN_DAYS = 3
+MAX_LEGS = 6
+
+
+def _choice(rng: np.random.Generator, values: list, size: int, weights: list = None) -> np.ndarray:
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=size, p=weights)]
+
+
+def _legs(rng: np.random.Generator, counts: np.ndarray, pool: list) -> np.ndarray:
+    """
+    Newline-joined legs, `counts[i]` of them for row i.
+    """
+    picks = np.asarray(pool, dtype=object)[rng.integers(len(pool), size=counts.sum())]
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    return np.array(["\n".join(picks[start:end]) for start, end in zip(bounds[:-1], bounds[1:])], dtype=object)
+
+
+def _money(values: np.ndarray) -> np.ndarray:
+    return np.char.mod("%.2f", np.round(values, 2)).astype(object)
+
+
+def generate_bets(rows: int, seed: int = 0, days: int = 365) -> pd.DataFrame:
+    """
+    Generates a bet history in sheet format.
+
+    Args:
+        rows (int): Number of bets
+        seed (int): Random seed, so runs are repeatable
+        days (int): Days of history starting at 2025-01-01
+
+    Returns:
+        pd.DataFrame: String frame with the sheet's `schema.COLUMNS`, sorted by bet date
+    """
+    rng = np.random.default_rng(seed)
+    day = np.sort(rng.integers(days, size=rows))
+    bet_type = _choice(rng, bet_type_selectbox, rows, TYPE_WEIGHTS)
+    legs = np.where(bet_type == "Parlay", rng.integers(2, MAX_LEGS + 1, size=rows), 1)
+
+    # Each extra leg roughly doubles the price; straights sit around even money
+    decimal = np.exp(rng.normal(np.log(1.9) * legs, 0.25))
+    odds = np.where(decimal >= 2, (decimal - 1) * 100, -100 / (decimal - 1)).round().astype(int)
+    odds = np.where(np.abs(odds) < 100, 100, odds)
+    decimal = np.where(odds > 0, 1 + odds / 100, 1 + 100 / -odds)
+
+    draw = rng.random(rows)
+    status = np.select(
+        [day >= days - OPEN_DAYS, draw < PUSH_RATE, draw < PUSH_RATE + REBOOT_RATE, rng.random(rows) < WIN_RATE_EDGE / decimal],
+        ["Placed", "Push", "Reboot", "Win"],
+        "Loss",
+    ).astype(object)
+    risk_type = _choice(rng, risk_type_selectbox, rows, [0.85, 0.15])
+    amount = np.round(rng.lognormal(np.log(10), 0.8, size=rows), 0).clip(1, 500)
+    # As the slip form records them: a risk-free promo bet has a Bet Amount of 0 and pays out only its winnings, and
+    # Bet Net Win Amount is never negative, 0 on a loss
+    promo = risk_type == "Promotion"
+    promotion = np.where(promo, amount, 0.0)
+    stake = np.where(promo, 0.0, amount)
+    payout = np.select([status == "Win", np.isin(status, ["Push", "Reboot"])], [stake + amount * (decimal - 1), stake], 0.0)
+    net = np.maximum(payout - stake, 0.0)
+
+    settled = status != "Placed"
+    df = pd.DataFrame({
+        "Gambler Name": _choice(rng, gambler_selectbox, rows),
+        "Sportsbook Name": _choice(rng, sportsbook_selectbox, rows),
+        "Bet Status": status,
+        "Bet Risk Type": risk_type,
+        "Bet Type": bet_type,
+        "Bet Category": np.where(bet_type == "Parlay", "Mixed", _choice(rng, bet_category_selectbox[:-1], rows)),
+        "Bet Sport": _choice(rng, bet_sport_selectbox, rows, [0.3, 0.2, 0.25, 0.08, 0.04, 0.06, 0.03, 0.04]),
+        "Bet Date": np.datetime_as_string(FIRST_BET_DATE + day, unit="D"),
+        "Bet Amount": _money(stake),
+        "Bet Promotion Amount": _money(promotion),
+        "Bet Payout Amount": np.where(settled, _money(payout), ""),
+        "Bet Net Win Amount": np.where(settled, _money(net), ""),
+        "Bet Odds": np.char.mod("%+d", odds).astype(object),
+        "Bet Team/Player(s)": _legs(rng, legs, PLAYERS),
+        "Bet Statistic(s)": _legs(rng, legs, STATISTICS),
+        "Bet Game(s)": _legs(rng, legs, [f"{away} @ {home}" for away in TEAMS[:8] for home in TEAMS[8:]]),
+        "Certified Degenerate Bet": np.where((legs >= 5) | (odds >= 1000), "Yes", "No"),
+        "Bet Notes": _choice(rng, NOTES, rows),
+    })
+    return df[COLUMNS].astype("string")
+
+
+def write_bets(df: pd.DataFrame, path: str) -> None:
+    """
+    Writes generated bets where `utils.read_local_source` can read them.
+
+    Args:
+        df (pd.DataFrame): Output of `generate_bets`
+        path (str): .parquet or .csv file
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="Number of bets (10k to 1M is the useful range)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--days", type=int, default=365, help="Days of history")
+    parser.add_argument("--out", required=True, help="Output .parquet or .csv file")
+    args = parser.parse_args()
+    write_bets(generate_bets(args.rows, args.seed, args.days), args.out)
+    print(f"Wrote {args.rows:,} bets to {args.out}")
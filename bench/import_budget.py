@@ -0,0 +1,111 @@
+"""
+Import-time budget for the app's modules.
+
+Each module is imported in a fresh interpreter after streamlit, pandas and numpy, which every page loads anyway, so the
+measured time is what the module itself adds to a cold page load. A module fails when it exceeds its budget or pulls
+in a dependency that is meant to be loaded only where it is used:
+
+    python bench/import_budget.py            # exits non-zero on any violation
+    python bench/import_budget.py --json out.json
+    python -m pytest tests/test_import_budget.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Milliseconds each module may add on top of streamlit, pandas and numpy
+BUDGET_MS = {
+    "schema": 20,
+    "metrics": 20,
+    "utils": 50,
+    "search": 50,
+    "filters": 50,
+    "bulk_import": 50,
+    "export": 50,
+    "archive": 50,
+    "aggregations": 50,
+    "analytics": 50,
+    "charts": 50,
+    "journal": 60,
+    "mirror": 60,
+    "write_queue": 80,
+}
+# Heavy dependencies deferred to the code paths that need them
+DEFERRED = ["gspread", "googleapiclient", "google.auth.transport.requests", "altair", "streamlit_gsheets"]
+PROBE = """
+import json, sys, time
+import numpy, pandas, streamlit
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"ms": (time.perf_counter() - start) * 1000, "loaded": [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module: str, runs: int) -> dict:
+    """
+    Best of `runs` cold imports of `module`.
+
+    Args:
+        module (str): Module name
+        runs (int): Fresh interpreters to try
+
+    Returns:
+        dict: {"ms": fastest import in milliseconds, "loaded": deferred dependencies it imported}
+    """
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, deferred=DEFERRED)],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return min(results, key=lambda result: result["ms"])
+
+
+def violations(module: str, result: dict) -> list:
+    """
+    What is wrong with a module's measured import.
+
+    Args:
+        module (str): Module name, a key of `BUDGET_MS`
+        result (dict): Output of `measure`
+
+    Returns:
+        list: Problem descriptions, empty when the module is within budget
+    """
+    problems = []
+    if result["ms"] > BUDGET_MS[module]:
+        problems.append(f"{result['ms']:.1f} ms over the {BUDGET_MS[module]} ms budget")
+    if result["loaded"]:
+        problems.append(f"imports {', '.join(result['loaded'])} at module level")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Cold imports per module; the fastest counts")
+    parser.add_argument("--json", help="Also write the measurements to this file")
+    args = parser.parse_args()
+
+    report, failures = {}, []
+    for module, budget in BUDGET_MS.items():
+        result = report[module] = {**measure(module, args.runs), "budget_ms": budget}
+        problems = violations(module, result)
+        status = "FAIL" if problems else "ok"
+        print(f"{module:<14} {result['ms']:>7.1f} ms / {budget:>3} ms  {status}  {'; '.join(problems)}")
+        failures += [f"{module}: {problem}" for problem in problems]
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+    if failures:
+        print("\nImport budget exceeded:\n  " + "\n  ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+"""
+Benchmarks every page's data path against generated bet histories.
+
+Each page runs end to end in Streamlit's AppTest, reading a generated file through `BETS_LOCAL_SOURCE` instead of
+Google Sheets, and the heavier steps inside it are also timed on their own:
+
+    python bench/run.py --rows 10000 100000 1000000
+    python bench/run.py --rows 100000 --compare bench/results/<earlier run>.json
+
+Results are written to bench/results/<timestamp>-<commit>.json.
+"""
+import argparse
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORK_DIR = os.path.join(ROOT, ".cache", "bench")
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+# Keep the app's own mirror and write queue out of the benchmark, so no queued job can reach the real sheet
+os.environ["BETS_MIRROR_DIR"] = tempfile.mkdtemp(prefix="bets-bench-")
+sys.path.insert(0, ROOT)
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import streamlit as st  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+import aggregations  # noqa: E402
+import analytics  # noqa: E402
+import backend  # noqa: E402
+import charts  # noqa: E402
+import export  # noqa: E402
+import filters  # noqa: E402
+import mirror  # noqa: E402
+import utils  # noqa: E402
+from bench.generate import generate_bets, write_bets  # noqa: E402
+from schema import COLUMNS, data_version, normalize_bets  # noqa: E402
+
+PAGES = {
+    "bet_logger": "pages/1_Bet_Logger.py",
+    "historical_lookup": "pages/2_Historical_Bet_Lookup.py",
+    "data_visualization": "pages/3_Data_Visualization.py",
+}
+PAGE_TIMEOUT = 600
+EDITED_ROWS = 100
+ADDED_ROWS = 25
+DELETED_ROWS = 10
+
+
+class RecordingWorksheet:
+    """
+    Accepts the gspread worksheet calls made by `utils.write_bet_delta` and records their payload sizes, so the
+    write-back path is timed without the network.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def batch_update(self, data, **kwargs):
+        self.calls.append(("batch_update", sum(len(entry["values"]) for entry in data)))
+
+    def append_rows(self, rows, **kwargs):
+        self.calls.append(("append_rows", len(rows)))
+        return {"updates": {"updatedRange": f"{utils.MASTER_TAB}!A2:R{len(rows) + 1}"}}
+
+    def delete_rows(self, start, end=None):
+        self.calls.append(("delete_rows", (end or start) - start + 1))
+
+
+def timed(call, repeat: int) -> dict:
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        runs.append(time.perf_counter() - start)
+    return {"min": min(runs), "median": statistics.median(runs), "runs": runs}
+
+
+def clear_caches() -> None:
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def source_file(rows: int) -> str:
+    path = os.path.join(WORK_DIR, f"bets_{rows}.parquet")
+    if not os.path.exists(path):
+        write_bets(generate_bets(rows), path)
+    return path
+
+
+def run_page(name: str) -> AppTest:
+    app = AppTest.from_file(os.path.join(ROOT, PAGES[name]), default_timeout=PAGE_TIMEOUT).run()
+    if app.exception:
+        raise RuntimeError(f"{PAGES[name]} raised: {app.exception[0].value}")
+    return app
+
+
+def by_label(widgets, label: str):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+def bench_pages(results: dict, repeat: int) -> None:
+    for name in PAGES:
+        clear_caches()
+        results[f"{name}.cold"] = timed(lambda: run_page(name), 1)
+        results[f"{name}.warm"] = timed(lambda: run_page(name), repeat)
+
+
+def bench_filters(results: dict, repeat: int) -> None:
+    """
+    `filter_dataframe` on Historical Bet Lookup: one rerun per filter added, as a user would apply them.
+    """
+    clear_caches()
+    app = run_page("historical_lookup")
+    steps = [
+        ("enable", lambda: by_label(app.checkbox, "Add filters").check()),
+        ("columns", lambda: by_label(app.multiselect, "Filter dataframe on").set_value(
+            ["Gambler Name", "Bet Sport", "Bet Amount", "Bet Date", "Bet Team/Player(s)"])),
+        ("categorical", lambda: by_label(app.multiselect, "Values for Gambler Name").set_value(
+            by_label(app.multiselect, "Values for Gambler Name").options[:2])),
+        ("numeric", lambda: by_label(app.slider, "Values for Bet Amount").set_range(5.0, 100.0)),
+        ("datetime", lambda: by_label(app.date_input, "Values for Bet Date").set_value(
+            (datetime(2025, 3, 1).date(), datetime(2025, 9, 30).date()))),
+        ("text", lambda: by_label(app.text_input, "Substring or regex in Bet Team/Player(s)").input("Toppin")),
+    ]
+    for step, interact in steps:
+        interact()
+        results[f"filter_dataframe.{step}"] = timed(lambda: app.run(timeout=PAGE_TIMEOUT), 1)
+        if app.exception:
+            raise RuntimeError(f"filter step {step} raised: {app.exception[0].value}")
+    results["filter_dataframe.warm"] = timed(lambda: app.run(timeout=PAGE_TIMEOUT), repeat)
+
+
+def bench_data_path(results: dict, path: str, repeat: int) -> pd.DataFrame:
+    raw = utils.read_local_source(path)
+    results["load.read"] = timed(lambda: utils.read_local_source(path), repeat)
+    parsed = mirror.parse_values(raw)
+    results["load.parse"] = timed(lambda: mirror.parse_values(raw), repeat)
+    df = normalize_bets(parsed)
+    results["load.normalize"] = timed(lambda: normalize_bets(parsed), repeat)
+    results["load.data_version"] = timed(lambda: data_version(df), repeat)
+    df.attrs["data_version"] = data_version(df)
+    version = df.attrs["data_version"]
+
+    # The cached functions' undecorated bodies, so every repeat does the work
+    summary = aggregations.facet_summary.__wrapped__(df, version, "{}")
+    results["visualization.facet_summary"] = timed(lambda: aggregations.facet_summary.__wrapped__(df, version, "{}"), repeat)
+    results["visualization.profitability"] = timed(lambda: analytics.profitability.__wrapped__(df, version, "{}"), repeat)
+    results["visualization.bankroll"] = timed(lambda: aggregations.BankrollLedger().update(df, version), repeat)
+    columns = ["Gambler Name", "Bet Status", "Bet Sport", "Bet Date", "Bet Category", "Certified Degenerate Bet"]
+    results["visualization.filter_index"] = timed(lambda: filters.FilterIndex(df, columns), repeat)
+    index = filters.FilterIndex(df, columns)
+    selection = {column: index.values[column][:1] for column in ["Gambler Name", "Bet Status"]}
+    results["visualization.filter_change"] = timed(
+        lambda: (index.counts(index.prune(selection)), index.mask(selection)), repeat
+    )
+    results["visualization.charts"] = timed(lambda: [
+        charts.pie_spec.__wrapped__(counts, facet, facet) for facet, counts in summary["facets"].items()
+    ] + [charts.amount_bar_spec.__wrapped__(summary["rollups"]["Week"], "Week")], repeat)
+    for file_format in export.FORMATS:
+        name = file_format.lower().replace(" ", "_")
+        results[f"export.{name}"] = timed(lambda: export.export_bets(df, file_format), repeat)
+        results[f"export.{name}_legs"] = timed(lambda: export.export_bets(df, file_format, legs=True), repeat)
+    return df
+
+
+def bench_write_back(results: dict, df: pd.DataFrame, repeat: int) -> None:
+    """
+    Bet Logger write-back: converting new slips to sheet values, turning an editor delta into Sheets calls, and
+    applying it to the local Sheets stand-in from `backend.py`.
+    """
+    rows = df.iloc[:ADDED_ROWS][COLUMNS]
+    results["write_back.to_cell"] = timed(lambda: [[utils.to_cell(value, name) for name, value in zip(COLUMNS, row)] for row in rows.itertuples(index=False)], repeat)
+    rng = np.random.default_rng(0)
+    edited = rng.choice(len(df), size=EDITED_ROWS, replace=False)
+    delta = {
+        "edited_rows": {int(position): {"Bet Status": "Win", "Bet Payout Amount": 25.0} for position in edited},
+        "added_rows": [dict(zip(COLUMNS, map(utils.to_cell, row, COLUMNS))) for row in rows.itertuples(index=False)],
+        "deleted_rows": sorted(int(position) for position in rng.choice(len(df), size=DELETED_ROWS, replace=False)),
+    }
+    results["write_back.write_bet_delta"] = timed(lambda: utils.write_bet_delta(RecordingWorksheet(), COLUMNS, delta), repeat)
+
+    # The same delta against the SQLite stand-in for the Master tab, i.e. the storage side of the write
+    path = os.path.join(os.environ["BETS_MIRROR_DIR"], f"local_sheets_{len(df)}.sqlite")
+    backend.seed(utils.read_local_source(os.environ[utils.LOCAL_SOURCE_ENV]), path=path, tabs=[utils.MASTER_TAB])
+    worksheet = backend.LocalSpreadsheet(path=path).worksheet(utils.MASTER_TAB)
+    results["write_back.local_sheet"] = timed(lambda: utils.write_bet_delta(worksheet, COLUMNS, delta), repeat)
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current: dict, baseline_path: str) -> None:
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    print(f"\nMedian seconds vs {os.path.basename(baseline_path)} ({baseline['commit']})")
+    for rows, stages in current["results"].items():
+        for stage, timing in stages.items():
+            before = baseline["results"].get(rows, {}).get(stage)
+            if before:
+                ratio = timing["median"] / before["median"] if before["median"] else float("nan")
+                print(f"{rows:>9} {stage:<40} {before['median']:>9.4f} {timing['median']:>9.4f} {ratio:>7.2f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000], help="History sizes to benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per warm stage")
+    parser.add_argument("--out", help="Results file (default bench/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare medians against")
+    args = parser.parse_args()
+
+    report = {
+        "commit": commit(),
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "streamlit": st.__version__,
+        "repeat": args.repeat,
+        "results": {},
+    }
+    for rows in args.rows:
+        path = source_file(rows)
+        os.environ[utils.LOCAL_SOURCE_ENV] = path
+        results = report["results"][str(rows)] = {}
+        df = bench_data_path(results, path, args.repeat)
+        bench_write_back(results, df, args.repeat)
+        bench_pages(results, args.repeat)
+        bench_filters(results, args.repeat)
+        for stage, timing in results.items():
+            print(f"{rows:>9} {stage:<40} median {timing['median']:.4f}s  min {timing['min']:.4f}s")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{report['created'].replace(':', '')}-{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"\nWrote {out}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Bulk bet slip imports for the Bet Logger.
+
+An uploaded CSV or Excel file is read as text and checked one column at a time: every enumerated column against its
+selectbox vocabulary, dates, money and odds with whole-column parses, and the form's required fields for blanks. Rows
+that pass are converted to the values the form writes and queued with `write_queue.enqueue_appends`.
+"""
+import io
+import zipfile
+import numpy as np
+import pandas as pd
+import streamlit as st
+from schema import COLUMNS, DATE_COLUMN, ENUMS, MONEY_COLUMNS, ODDS_COLUMN, TEXT_COLUMNS
+
+# Fields the slip form requires, plus the date, which an import cannot default to today; the rest default like the form
+REQUIRED_COLUMNS = list(ENUMS) + [DATE_COLUMN, ODDS_COLUMN, "Bet Team/Player(s)", "Bet Statistic(s)", "Bet Game(s)"]
+OPTIONAL_COLUMNS = MONEY_COLUMNS + ["Bet Notes"]
+ERROR_COLUMNS = ["Row", "Column", "Value", "Error"]
+# American odds: at least three digits with an optional sign, e.g. +150, -110 or 150
+ODDS_PATTERN = r"^[+-]?\d{3,}$"
+# Only the .xlsx format openpyxl reads; legacy .xls needs xlrd, which the app does not install
+EXCEL_TYPES = ("xlsx",)
+UPLOAD_TYPES = ["csv", *EXCEL_TYPES]
+
+
+def template_csv() -> bytes:
+    """
+    Empty import file with the sheet's header row.
+
+    Returns:
+        bytes: CSV header
+    """
+    return (",".join(COLUMNS) + "\n").encode()
+
+
+def read_slips(data: bytes, file_name: str) -> pd.DataFrame:
+    """
+    Reads an uploaded file as text, with blank cells as empty strings.
+
+    Args:
+        data (bytes): File contents
+        file_name (str): Uploaded file name, whose extension picks the reader
+
+    Returns:
+        pd.DataFrame: One string column per header
+
+    Raises:
+        ValueError: If the file cannot be read
+    """
+    try:
+        if file_name.lower().endswith(EXCEL_TYPES):
+            raw = pd.read_excel(io.BytesIO(data), dtype=str, keep_default_na=False)
+        else:
+            raw = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False, skipinitialspace=True)
+    except ImportError as error:
+        raise ValueError(f"Excel files need the openpyxl package installed ({error})") from error
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError, zipfile.BadZipFile) as error:
+        raise ValueError(f"Could not read {file_name}: {error}") from error
+    raw.columns = [str(column).strip() for column in raw.columns]
+    return raw.astype("string").apply(lambda values: values.str.strip()).fillna("")
+
+
+def _errors(raw: pd.DataFrame, column: str, invalid: np.ndarray, message: str) -> pd.DataFrame:
+    positions = np.flatnonzero(invalid)
+    return pd.DataFrame({
+        # Spreadsheet row numbers: the header is row 1
+        "Row": positions + 2,
+        "Column": column,
+        "Value": raw[column].iloc[positions].to_numpy(dtype=object),
+        "Error": message,
+    })
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def validate_slips(data: bytes, file_name: str) -> dict:
+    """
+    Validates every row of an uploaded file at once. Cached per file, so reruns while reviewing the errors do not
+    parse it again.
+
+    Enumerated values match their vocabulary case-insensitively and are written with the vocabulary's spelling. Money
+    columns default to 0 and, as on the slip form, must not be negative; odds must be American odds.
+
+    Args:
+        data (bytes): File contents
+        file_name (str): Uploaded file name
+
+    Returns:
+        dict: {"rows": DataFrame[COLUMNS] of valid slips in sheet format, "errors": DataFrame[ERROR_COLUMNS] sorted by
+            row, "total": rows in the file, "ignored": unknown columns}
+
+    Raises:
+        ValueError: If the file cannot be read or lacks required columns
+    """
+    raw = read_slips(data, file_name)
+    missing = [column for column in REQUIRED_COLUMNS if column not in raw.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+    ignored = [column for column in raw.columns if column not in COLUMNS]
+    for column in OPTIONAL_COLUMNS:
+        if column not in raw.columns:
+            raw[column] = ""
+    raw = raw[COLUMNS]
+
+    rows = pd.DataFrame(index=raw.index)
+    errors = []
+    blank = {column: (raw[column] == "").to_numpy() for column in COLUMNS}
+    for column in REQUIRED_COLUMNS:
+        errors.append(_errors(raw, column, blank[column], "Required"))
+
+    for column, vocabulary in ENUMS.items():
+        canonical = raw[column].str.lower().map({value.lower(): value for value in vocabulary})
+        errors.append(_errors(raw, column, canonical.isna().to_numpy() & ~blank[column], f"Not one of: {', '.join(vocabulary)}"))
+        rows[column] = canonical
+
+    dates = pd.to_datetime(raw[DATE_COLUMN], errors="coerce", format="ISO8601")
+    # Only dates in other formats (e.g. 1/31/2025) take the slower element-wise parse
+    other = dates.isna() & ~blank[DATE_COLUMN]
+    if other.any():
+        dates[other] = pd.to_datetime(raw.loc[other, DATE_COLUMN], errors="coerce", format="mixed")
+    errors.append(_errors(raw, DATE_COLUMN, dates.isna().to_numpy() & ~blank[DATE_COLUMN], "Not a date"))
+    rows[DATE_COLUMN] = dates.dt.strftime("%Y-%m-%d")
+
+    for column in MONEY_COLUMNS:
+        amounts = pd.to_numeric(raw[column].str.replace(r"^\$|,", "", regex=True).replace("", "0"), errors="coerce")
+        errors.append(_errors(raw, column, (amounts.isna() | (amounts < 0)).to_numpy(), "Not an amount of 0 or more"))
+        rows[column] = amounts.round(2)
+
+    odds = raw[ODDS_COLUMN]
+    well_formed = odds.str.fullmatch(ODDS_PATTERN).fillna(False).to_numpy(dtype=bool)
+    valid_odds = well_formed & (pd.to_numeric(odds, errors="coerce").abs() >= 100).to_numpy()
+    errors.append(_errors(raw, ODDS_COLUMN, ~valid_odds & ~blank[ODDS_COLUMN], "Not American odds such as +150 or -110"))
+    rows[ODDS_COLUMN] = odds
+
+    for column in TEXT_COLUMNS:
+        # Parlay legs may be separated by a literal "\n" in files written by hand
+        rows[column] = raw[column].str.replace(r"\\n", "\n", regex=True)
+
+    errors = pd.concat(errors, ignore_index=True).sort_values(["Row", "Column"], kind="stable", ignore_index=True)
+    failed = np.isin(raw.index.to_numpy() + 2, errors["Row"].to_numpy())
+    return {
+        "rows": rows.loc[~failed, COLUMNS].reset_index(drop=True).astype(object),
+        "errors": errors[ERROR_COLUMNS],
+        "total": len(raw),
+        "ignored": ignored,
+    }
+
+
+def to_sheet_rows(rows: pd.DataFrame) -> list:
+    """
+    Valid slips as `append_rows` values, in the format the slip form writes.
+
+    Args:
+        rows (pd.DataFrame): `validate_slips(...)["rows"]`
+
+    Returns:
+        list: One list of cell values per slip
+    """
+    return rows.astype(object).where(rows.notna(), "N/A").values.tolist()
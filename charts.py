@@ -0,0 +1,106 @@
+"""
+Vega-Lite specs for the Data Visualization page.
+
+Specs are built from the already aggregated frames and cached by `st.cache_data`, which keys them on a hash of those
+frames, so a rerun with unchanged data skips chart building and JSON conversion entirely. Altair consolidates each
+chart's rows into a named top-level dataset that the marks reference by name; Streamlit ships those named datasets as
+Arrow instead of inlining them as JSON values in the spec. Altair is imported inside each builder, so it is only loaded
+on a cache miss rather than with the page.
+"""
+import pandas as pd
+import streamlit as st
+
+THEMES = {"Streamlit theme": "streamlit", "Altair theme": None}
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def pie_spec(counts: pd.DataFrame, field: str, title: str) -> dict:
+    """
+    Donut chart of facet counts.
+
+    Args:
+        counts (pd.DataFrame): [field, "Count"] rows from `aggregations.facet_summary`
+        field (str): Facet column
+        title (str): Chart title
+
+    Returns:
+        dict: Vega-Lite spec
+    """
+    import altair as alt
+
+    pie = alt.Chart(counts).mark_arc(innerRadius=50).encode(
+        theta=alt.Theta(field="Count", type="quantitative"),
+        color=alt.Color(field=field, type="nominal"),
+        tooltip=[field, "Count"]
+    ).properties(
+        width="container",
+        title=title
+    )
+    return pie.to_dict()
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def amount_bar_spec(buckets: pd.DataFrame, resolution: str) -> dict:
+    """
+    Side-by-side bars of Bet Amount vs Net Win Amount, one pair per period.
+
+    Args:
+        buckets (pd.DataFrame): Rows of one `aggregations.rollups` resolution
+        resolution (str): Resolution name, for the axis title
+
+    Returns:
+        dict: Vega-Lite spec
+    """
+    import altair as alt
+
+    # Melt into long format for side-by-side bars
+    melted_df = buckets.melt(
+        id_vars=['Period', 'Bets'],
+        value_vars=['Bet Amount', 'Bet Net Win Amount'],
+        var_name='Metric',
+        value_name='Amount'
+    )
+
+    bar_chart = alt.Chart(melted_df).mark_bar().encode(
+        x=alt.X('Period:O', title=resolution, sort=None, axis=alt.Axis(labelAngle=-50)),
+        xOffset=alt.XOffset('Metric:N', sort=['Bet Amount', 'Bet Net Win Amount']),
+        y=alt.Y('Amount:Q', title='Amount'),
+        color=alt.Color('Metric:N', title='Metric'),
+        tooltip=['Period', 'Metric', alt.Tooltip('Amount:Q', format='$,.2f'), 'Bets']
+    ).properties(
+        title=f'Bet Amount vs Net Win Amount by {resolution}',
+        width="container",
+    )
+    return bar_chart.to_dict()
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def bankroll_spec(series: pd.DataFrame, metric: str) -> dict:
+    """
+    One line per gambler of their bankroll or drawdown over time.
+
+    Args:
+        series (pd.DataFrame): Rows of `aggregations.bankroll_series` with a "Bankroll" column added
+        metric (str): "Bankroll" or "Drawdown"
+
+    Returns:
+        dict: Vega-Lite spec
+    """
+    import altair as alt
+
+    line = alt.Chart(series).mark_line(interpolate="step-after", point=len(series) <= 200).encode(
+        x=alt.X('Bet Date:T', title='Date'),
+        y=alt.Y(f'{metric}:Q', title=metric),
+        color=alt.Color('Gambler:N', title='Gambler'),
+        tooltip=[
+            alt.Tooltip('Gambler:N'),
+            alt.Tooltip('Bet Date:T'),
+            alt.Tooltip('Bankroll:Q', format='$,.2f'),
+            alt.Tooltip('Drawdown:Q', format='$,.2f'),
+            alt.Tooltip('Max Drawdown:Q', format='$,.2f'),
+        ]
+    ).properties(
+        width="container",
+        title=f'{metric} by Gambler'
+    ).interactive(bind_y=False)
+    return line.to_dict()
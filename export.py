@@ -0,0 +1,90 @@
+"""
+Chunked exports of bet data to Parquet, Arrow IPC and CSV.
+
+The rows are converted and written `EXPORT_CHUNK_ROWS` at a time, so an export holds one converted chunk in memory on
+top of the frame it reads from, never a second full copy. Per-leg exports explode each chunk's parlay legs as it is
+written. Downloads go through a temporary file that moves to disk once it grows past `SPOOL_BYTES`, leaving only the
+finished file's bytes in memory.
+"""
+import itertools
+import tempfile
+import pandas as pd
+from schema import LEG_COLUMNS
+from search import build_legs
+
+# Export formats: (file extension, MIME type)
+FORMATS = {
+    "Parquet": ("parquet", "application/vnd.apache.parquet"),
+    "Arrow IPC": ("arrow", "application/vnd.apache.arrow.file"),
+    "CSV": ("csv", "text/csv"),
+}
+EXPORT_CHUNK_ROWS = 50_000
+# Exports larger than this are written to a temporary file on disk instead of memory
+SPOOL_BYTES = 32 * 1024 * 1024
+
+
+def export_chunks(df: pd.DataFrame, legs: bool = False):
+    """
+    Rows to export, `EXPORT_CHUNK_ROWS` bets at a time. Enumerated columns are written as plain text, and "Bet ID"
+    (the bet's index label) comes first so bet and leg exports can be joined.
+
+    Args:
+        df (pd.DataFrame): Bet data, e.g. the filtered view
+        legs (bool): One row per parlay leg, with the bet's other columns repeated, instead of one row per bet
+
+    Yields:
+        pd.DataFrame: The next chunk
+    """
+    for start in range(0, max(len(df), 1), EXPORT_CHUNK_ROWS):
+        chunk = df.iloc[start:start + EXPORT_CHUNK_ROWS]
+        chunk = chunk.astype({column: "string" for column, dtype in chunk.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)})
+        bets = chunk.rename_axis("Bet ID").reset_index()
+        if legs:
+            bets = build_legs(chunk).merge(bets.drop(columns=LEG_COLUMNS), on="Bet ID", how="left")
+        yield bets
+
+
+def write_export(df: pd.DataFrame, sink, file_format: str, legs: bool = False) -> None:
+    """
+    Writes bet data chunk by chunk in one of `FORMATS`.
+
+    Args:
+        df (pd.DataFrame): Bet data, e.g. the filtered view
+        sink: Binary file object to write to
+        file_format (str): Key of `FORMATS`
+        legs (bool): One row per parlay leg instead of one row per bet
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    chunks = export_chunks(df, legs)
+    if file_format == "CSV":
+        for position, chunk in enumerate(chunks):
+            chunk.to_csv(sink, header=position == 0, index=False, date_format="%Y-%m-%d", encoding="utf-8")
+        return
+    first = next(chunks)
+    # Every chunk is written with the first chunk's schema, which the dtypes alone decide
+    schema = pa.Schema.from_pandas(first, preserve_index=False)
+    writer = pq.ParquetWriter(sink, schema) if file_format == "Parquet" else pa.ipc.new_file(sink, schema)
+    with writer:
+        for chunk in itertools.chain([first], chunks):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def export_bets(df: pd.DataFrame, file_format: str, legs: bool = False) -> bytes:
+    """
+    The export as the bytes `st.download_button` serves, written through a temporary file that moves to disk past
+    `SPOOL_BYTES`.
+
+    Args:
+        df (pd.DataFrame): Bet data, e.g. the filtered view
+        file_format (str): Key of `FORMATS`
+        legs (bool): One row per parlay leg instead of one row per bet
+
+    Returns:
+        bytes: File contents
+    """
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as sink:
+        write_export(df, sink, file_format, legs)
+        sink.seek(0)
+        return sink.read()
@@ -0,0 +1,194 @@
+"""
+Cascading multiselect filters backed by per-value bitmaps.
+
+`FilterIndex` packs one bitmap per value of each filtered column, built once per data version. A selection is the AND
+across columns of the OR of each column's selected bitmaps, and the options each filter offers are the popcounts of its
+value bitmaps intersected with every other filter, so a filter change is a handful of array operations on packed bits
+instead of a scan of the frame per filter.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Set bits per byte, for popcounts on numpy versions without np.bitwise_count
+_BYTE_POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+def popcount(bitmaps: np.ndarray) -> np.ndarray:
+    """
+    Set bits in each packed bitmap.
+
+    Args:
+        bitmaps (np.ndarray): uint8 bitmaps from `np.packbits`, one per row of a 2D array
+
+    Returns:
+        np.ndarray: int64 count per bitmap
+    """
+    if hasattr(np, "bitwise_count"):
+        bits = np.bitwise_count(bitmaps)
+    else:
+        bits = _BYTE_POPCOUNT[bitmaps]
+    return bits.sum(axis=-1, dtype=np.int64)
+
+
+class FilterIndex:
+    """
+    Packed row bitmaps for every value of each filter column of one data version.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: list):
+        self.rows = len(df)
+        self.values = {}
+        self.positions = {}
+        self.bitmaps = {}
+        self.totals = {}
+        for column in columns:
+            if isinstance(df[column].dtype, pd.CategoricalDtype):
+                codes = df[column].cat.codes.to_numpy(dtype=np.int64)
+                values = df[column].cat.categories
+            else:
+                codes, values = pd.factorize(df[column], sort=True)
+            # Missing values (code -1) match no bitmap, so a filtered column excludes them as `isin` did
+            bitmaps = np.empty((len(values), (self.rows + 7) // 8), dtype=np.uint8)
+            for code in range(len(values)):
+                bitmaps[code] = np.packbits(codes == code)
+            self.values[column] = list(values)
+            self.positions[column] = {value: code for code, value in enumerate(self.values[column])}
+            self.bitmaps[column] = bitmaps
+            self.totals[column] = popcount(bitmaps)
+
+    def _column_masks(self, selection: dict) -> dict:
+        """
+        OR of the selected values' bitmaps per column. Columns with nothing selected, or only values this version no
+        longer has, do not filter.
+        """
+        masks = {}
+        for column, selected in selection.items():
+            codes = [self.positions[column][value] for value in selected if value in self.positions[column]]
+            if codes:
+                masks[column] = np.bitwise_or.reduce(self.bitmaps[column][codes], axis=0)
+        return masks
+
+    def _counts(self, column: str, masks: dict, codes=slice(None)) -> np.ndarray:
+        others = [mask for other, mask in masks.items() if other != column]
+        if not others:
+            return self.totals[column][codes]
+        return popcount(self.bitmaps[column][codes] & np.bitwise_and.reduce(others, axis=0))
+
+    def counts(self, selection: dict) -> dict:
+        """
+        Rows each value of each column would match given the other columns' selections, i.e. the cascading options.
+
+        Args:
+            selection (dict): {column: [selected values]}
+
+        Returns:
+            dict: {column: int64 array aligned with `self.values[column]`}
+        """
+        masks = self._column_masks(selection)
+        return {column: self._counts(column, masks) for column in self.bitmaps}
+
+    def prune(self, selection: dict) -> dict:
+        """
+        Drops selected values that match no row given the other selections, one column at a time in order, until no
+        more drop out.
+
+        Args:
+            selection (dict): {column: [selected values]}
+
+        Returns:
+            dict: The pruned selection
+        """
+        selection = {column: list(selected) for column, selected in selection.items()}
+        changed = True
+        while changed:
+            changed = False
+            for column, selected in selection.items():
+                selected = [value for value in selected if value in self.positions[column]]
+                # Only the selected values' bitmaps need counting
+                counts = self._counts(column, self._column_masks(selection), [self.positions[column][value] for value in selected])
+                valid = [value for value, count in zip(selected, counts) if count > 0]
+                if valid != selection[column]:
+                    selection[column] = valid
+                    changed = True
+        return selection
+
+    def mask(self, selection: dict):
+        """
+        Rows matching every column's selection.
+
+        Args:
+            selection (dict): {column: [selected values]}
+
+        Returns:
+            np.ndarray | None: Boolean row mask, or None when nothing is selected
+        """
+        masks = list(self._column_masks(selection).values())
+        if not masks:
+            return None
+        return np.unpackbits(np.bitwise_and.reduce(masks, axis=0), count=self.rows).astype(bool)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def filter_index(_df: pd.DataFrame, version: str, columns: tuple) -> FilterIndex:
+    """
+    Bitmaps for the filter columns of one data version, shared by every session.
+
+    Args:
+        _df (pd.DataFrame): Bet data from `load_bets` (not hashed; identified by `version`)
+        version (str): `schema.data_version` of the frame
+        columns (tuple): Filter columns
+
+    Returns:
+        FilterIndex: The index
+    """
+    return FilterIndex(_df, list(columns))
+
+
+def _label(value) -> str:
+    return str(value.date()) if isinstance(value, pd.Timestamp) else str(value)
+
+
+def cascading_filters(df: pd.DataFrame, columns: list, name: str, version: str, num_columns: int = 2) -> pd.DataFrame:
+    """
+    Renders one multiselect per column in the sidebar, each offering only the values that still match the other
+    selections, with their row counts, and returns the rows matching all of them.
+
+    The selection is kept in `st.session_state[name]` as {column: [selected values]}, like DynamicFilters did, so it
+    survives switching pages.
+
+    Args:
+        df (pd.DataFrame): Bet data from `load_bets`
+        columns (list): Columns to filter on
+        name (str): Session state key of the selection
+        version (str): `schema.data_version` of `df`
+        num_columns (int): Filters per sidebar row
+
+    Returns:
+        pd.DataFrame: Filtered dataframe, or `df` itself when nothing is selected
+    """
+    index = filter_index(df, version, tuple(columns))
+    stored = st.session_state.get(name, {})
+    # Widget state holds this run's edits; fall back to the stored selection when the widgets were not on screen
+    selection = {column: st.session_state.get(f"{name}:{column}", stored.get(column, [])) for column in columns}
+    selection = index.prune(selection)
+    counts = index.counts(selection)
+
+    layout = st.sidebar.columns(num_columns, gap="small")
+    for position, column in enumerate(columns):
+        key = f"{name}:{column}"
+        values, column_counts = index.values[column], counts[column]
+        options = [value for value, count in zip(values, column_counts) if count > 0]
+        option_counts = dict(zip(values, column_counts))
+        st.session_state[key] = selection[column]
+        with layout[position % num_columns]:
+            st.multiselect(
+                f"Select {column}",
+                options,
+                format_func=lambda value, option_counts=option_counts: f"{_label(value)} ({option_counts[value]:,})",
+                key=key,
+            )
+    st.session_state[name] = selection
+
+    mask = index.mask(selection)
+    return df if mask is None else df[mask]
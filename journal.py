@@ -0,0 +1,356 @@
+"""
+Append-only change journal for the Master tab.
+
+Every append, edit and delete made through the Bet Logger is recorded in the `Journal` tab as one compact row holding
+the timestamp, the gambler who made the change, the sheet row and the before/after cell values. A full copy of Master
+is only taken every `SNAPSHOT_INTERVAL` into its own `Snapshot <timestamp>` tab. Master can be rebuilt as of any point
+since the first snapshot by replaying the journal on top of the newest snapshot before it. The first snapshot is never
+dropped; the `SNAPSHOT_RETENTION` newest ones only shorten the replay for recent points. Writing a restore back to
+Master goes through the write queue like any other change to it, and is journaled:
+
+    python journal.py restore --as-of 2026-10-01T18:00:00                # print the restored row count
+    python journal.py restore --as-of 2026-10-01T18:00:00 --write        # queue the restore for the app's write worker
+    python journal.py restore --as-of 2026-10-01T18:00:00 --write --run  # overwrite Master now, in this process
+"""
+from datetime import datetime, timedelta, timezone
+import argparse
+import json
+import os
+import time
+from typing import TYPE_CHECKING
+import pandas as pd
+from utils import FIRST_DATA_ROW, MASTER_TAB, append_rows_once, get_spreadsheet, get_worksheet, invalidate_bets, to_cell
+
+# gspread is imported where the journal touches the sheet; the Bet Logger only needs `before_values` on its hot path
+if TYPE_CHECKING:
+    import gspread
+
+JOURNAL_TAB = "Journal"
+JOURNAL_HEADER = ["Timestamp", "Gambler", "Operation", "Row", "Before", "After"]
+SNAPSHOT_PREFIX = "Snapshot "
+SNAPSHOT_FORMAT = "%Y-%m-%dT%H:%M:%S"
+# A full copy of Master is taken when the newest snapshot is older than this
+SNAPSHOT_INTERVAL = timedelta(days=7)
+# Every snapshot tab is a full copy of Master inside the live spreadsheet, which counts against its 10M cell limit.
+# Only this many of the newest are kept on top of the first snapshot, which every older point in time replays from.
+SNAPSHOT_RETENTION = int(os.environ.get("BETS_SNAPSHOT_RETENTION", 2))
+RESTORE_GAMBLER = "Journal restore"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def _dumps(values: dict) -> str:
+    return json.dumps(values, separators=(",", ":"), default=str) if values else ""
+
+
+def journal_worksheet(key: str) -> "gspread.Worksheet":
+    """
+    Gets the journal tab, creating it with a header row on first use.
+
+    Args:
+        key (str): Spreadsheet key
+
+    Returns:
+        gspread.Worksheet: Journal worksheet
+    """
+    import gspread
+
+    try:
+        return get_worksheet(key, JOURNAL_TAB)
+    except gspread.exceptions.WorksheetNotFound:
+        worksheet = get_spreadsheet(key).add_worksheet(JOURNAL_TAB, rows=1, cols=len(JOURNAL_HEADER))
+        worksheet.update("A1", [JOURNAL_HEADER], value_input_option="RAW")
+        return get_worksheet(key, JOURNAL_TAB)
+
+
+def _entry(gambler: str, operation: str, row: int, before: dict = None, after: dict = None) -> list:
+    return [_now().strftime(SNAPSHOT_FORMAT), gambler, operation, row, _dumps(before), _dumps(after)]
+
+
+def appended_row(response: dict) -> int:
+    """
+    Sheet row of the first row written by `append_rows`.
+
+    Args:
+        response (dict): The `append_rows` response, e.g. {"updates": {"updatedRange": "Master!A101:R101"}}
+
+    Returns:
+        int: 1-based sheet row
+    """
+    import gspread.utils
+
+    updated_range = response["updates"]["updatedRange"].split("!")[-1]
+    return gspread.utils.a1_to_rowcol(updated_range.split(":")[0])[0]
+
+
+def append_entries(gambler: str, columns: list, rows: list, first_row: int) -> list:
+    """
+    Journal entries for rows written by `append_rows`.
+
+    Args:
+        gambler (str): Gambler who logged the rows
+        columns (list): Column names in sheet order
+        rows (list): Row values as sent to `append_rows`
+        first_row (int): Sheet row the first of them landed on, see `appended_row`
+
+    Returns:
+        list: Journal rows
+    """
+    return [
+        _entry(gambler, "append", first_row + offset, after=dict(zip(columns, values)))
+        for offset, values in enumerate(rows)
+    ]
+
+
+def row_values(base_df: pd.DataFrame, positions) -> dict:
+    """
+    Whole rows of the frame the editor was given, as cell values.
+
+    Args:
+        base_df (pd.DataFrame): Frame the editor was given
+        positions: Row positions
+
+    Returns:
+        dict: {row position: {column name: cell value}}
+    """
+    return {
+        int(position): {name: to_cell(value, name) for name, value in base_df.iloc[int(position)].items()}
+        for position in positions
+    }
+
+
+def before_values(base_df: pd.DataFrame, delta: dict) -> dict:
+    """
+    Captures what an editor delta is about to overwrite: the changed cells of edited rows and the whole of deleted
+    rows. Taken when the change is submitted, as the frame may be gone by the time the write is journaled.
+
+    Args:
+        base_df (pd.DataFrame): Frame the editor was given
+        delta (dict): The editor's delta in sheet-order positions
+
+    Returns:
+        dict: {row position: {column name: cell value}}
+    """
+    before = {}
+    for position, changes in delta.get("edited_rows", {}).items():
+        before[int(position)] = {name: to_cell(base_df.iloc[int(position)][name], name) for name in changes}
+    before.update(row_values(base_df, delta.get("deleted_rows", [])))
+    return before
+
+
+def delta_entries(gambler: str, columns: list, before: dict, delta: dict, response: dict = None) -> list:
+    """
+    Journal entries for an `st.data_editor` delta written by `utils.write_bet_delta`, in the order the write applies
+    them (edits, appends, bottom-up deletes) so replaying them reproduces the sheet exactly.
+
+    Args:
+        gambler (str): Gambler who submitted the update
+        columns (list): Column names in sheet order
+        before (dict): Overwritten values from `before_values`
+        delta (dict): The editor's `edited_rows`, `added_rows` and `deleted_rows`
+        response (dict): The `append_rows` response for added rows, if any
+
+    Returns:
+        list: Journal rows
+    """
+    # Positions may have been through JSON, which turns int keys into strings
+    before = {int(position): values for position, values in before.items()}
+    entries = []
+    for position, changes in sorted((int(k), v) for k, v in delta.get("edited_rows", {}).items()):
+        after = {name: to_cell(value, name) for name, value in changes.items()}
+        entries.append(_entry(gambler, "edit", position + FIRST_DATA_ROW, before[position], after))
+    added_rows = delta.get("added_rows", [])
+    if added_rows and response:
+        first_row = appended_row(response)
+        for offset, row in enumerate(added_rows):
+            after = {name: to_cell(row.get(name), name) for name in columns}
+            entries.append(_entry(gambler, "append", first_row + offset, after=after))
+    for position in sorted(map(int, delta.get("deleted_rows", [])), reverse=True):
+        entries.append(_entry(gambler, "delete", position + FIRST_DATA_ROW, before=before[position]))
+    return entries
+
+
+def _call(function, *args, **kwargs):
+    return function(*args, **kwargs)
+
+
+def record(key: str, entries: list, call=None) -> None:
+    """
+    Appends entries to the journal and takes a snapshot if one is due. A restore always gets one, so later restores
+    start from it rather than replaying across the restore.
+
+    Args:
+        key (str): Spreadsheet key
+        entries (list): Journal rows from `append_entries` / `delta_entries` / `write_restore`
+        call: Makes each Sheets call as `call(function, *args, **kwargs)`, e.g. `write_queue.with_backoff`, so a
+            failed snapshot is retried on its own and never appends the entries twice
+    """
+    call = call or _call
+    if entries:
+        call(append_rows_once, call(journal_worksheet, key), entries, attempts=[], value_input_option="RAW")
+        maybe_snapshot(key, force=any(entry[2] == "restore" for entry in entries), call=call)
+
+
+def _snapshot_tabs(key: str, call=_call) -> list:
+    """
+    Lists snapshot tabs, oldest first, as (taken at, worksheet title).
+    """
+    snapshots = []
+    for worksheet in call(get_spreadsheet(key).worksheets):
+        if worksheet.title.startswith(SNAPSHOT_PREFIX):
+            taken_at = datetime.strptime(worksheet.title[len(SNAPSHOT_PREFIX):], SNAPSHOT_FORMAT)
+            snapshots.append((taken_at.replace(tzinfo=timezone.utc), worksheet.title))
+    return sorted(snapshots)
+
+
+def maybe_snapshot(key: str, force: bool = False, call=None) -> str:
+    """
+    Copies Master into a new snapshot tab when the newest snapshot is older than `SNAPSHOT_INTERVAL`, and drops
+    snapshots between the first one and the `SNAPSHOT_RETENTION` newest.
+
+    Args:
+        key (str): Spreadsheet key
+        force (bool): Take a snapshot regardless of the interval
+        call: Makes each Sheets call as `call(function, *args, **kwargs)`, defaults to calling it directly
+
+    Returns:
+        str: Title of the new snapshot tab, or None when no snapshot was due
+    """
+    call = call or _call
+    snapshots = _snapshot_tabs(key, call)
+    if snapshots and not force and _now() - snapshots[-1][0] < SNAPSHOT_INTERVAL:
+        return None
+
+    # Start the snapshot on a fresh second, so every entry it includes has an earlier timestamp and every entry
+    # recorded after it has the same or a later one
+    time.sleep(1 - datetime.now(timezone.utc).microsecond / 1_000_000)
+    now = _now()
+    data = call(get_worksheet(key, MASTER_TAB).get_all_values)
+    title = SNAPSHOT_PREFIX + now.strftime(SNAPSHOT_FORMAT)
+    spreadsheet = get_spreadsheet(key)
+    worksheet = call(spreadsheet.add_worksheet, title, rows=max(len(data), 1), cols=max(len(data[0]) if data else 1, 1))
+    call(worksheet.update, "A1", data, value_input_option="RAW")
+
+    # The first snapshot stays: it is where the journal starts, so restores before the retained ones replay from it
+    for _, old_title in snapshots[1: max(len(snapshots) + 1 - SNAPSHOT_RETENTION, 1)]:
+        call(spreadsheet.del_worksheet, call(spreadsheet.worksheet, old_title))
+    return title
+
+
+def replay(snapshot: list, entries: list) -> list:
+    """
+    Applies journal entries on top of a snapshot of Master.
+
+    Args:
+        snapshot (list): Sheet values, header row first, as returned by `get_all_values`
+        entries (list): Journal rows (see `JOURNAL_HEADER`) in the order they were recorded
+
+    Returns:
+        list: Sheet values after the entries are applied
+    """
+    values = [list(row) for row in snapshot]
+    header = values[0]
+    for _, _, operation, row, before, after in entries:
+        index = int(row) - 1
+        if operation == "append":
+            after = json.loads(after)
+            while len(values) < index:
+                values.append([""] * len(header))
+            values.insert(index, [after.get(name, "") for name in header])
+        elif operation == "edit":
+            for name, value in json.loads(after).items():
+                values[index][header.index(name)] = value
+        elif operation == "delete":
+            del values[index]
+    return values
+
+
+def restore(key: str, as_of: datetime) -> list:
+    """
+    Rebuilds Master as it was at `as_of` from the newest snapshot taken at or before that time plus the journal.
+
+    Args:
+        key (str): Spreadsheet key
+        as_of (datetime): Point in time to restore, UTC
+
+    Returns:
+        list: Sheet values, header row first
+    """
+    snapshots = [snapshot for snapshot in _snapshot_tabs(key) if snapshot[0] <= as_of]
+    if not snapshots:
+        raise ValueError(f"No snapshot at or before {as_of:%Y-%m-%d %H:%M:%S}; the first snapshot is the limit")
+    taken_at, title = snapshots[-1]
+    snapshot = get_worksheet(key, title).get_all_values()
+
+    # Journal timestamps are fixed-width ISO strings, so they compare in time order as text. Entries stamped in the
+    # snapshot's own second were recorded after it, see `maybe_snapshot`.
+    since, until = taken_at.strftime(SNAPSHOT_FORMAT), as_of.strftime(SNAPSHOT_FORMAT)
+    entries = [
+        entry for entry in journal_worksheet(key).get_all_values()[1:]
+        if since <= entry[0] <= until
+    ]
+    # A journaled restore replaced Master wholesale, so replay from what it wrote
+    restores = [position for position, entry in enumerate(entries) if entry[2] == "restore"]
+    if restores:
+        restored_as_of = datetime.strptime(json.loads(entries[restores[-1]][5])["as_of"], SNAPSHOT_FORMAT)
+        return replay(restore(key, restored_as_of.replace(tzinfo=timezone.utc)), entries[restores[-1] + 1:])
+    return replay(snapshot, entries)
+
+
+def write_restore(key: str, as_of: datetime, call=None) -> list:
+    """
+    Overwrites Master with `restore(key, as_of)`. Run it through the write queue (`write_queue.enqueue_restore`) so it
+    cannot interleave with other writes to Master; queued edits made before it then fail their row check.
+
+    Args:
+        key (str): Spreadsheet key
+        as_of (datetime): Point in time to restore, UTC, before the current second
+        call: Makes each Sheets call as `call(function, *args, **kwargs)`, defaults to calling it directly
+
+    Returns:
+        list: The journal entry recording the restore, for `record`
+    """
+    import mirror
+
+    call = call or _call
+    # The restore's own entry is stamped with the current second, and must fall after the point it restores
+    if as_of.strftime(SNAPSHOT_FORMAT) >= _now().strftime(SNAPSHOT_FORMAT):
+        raise ValueError(f"Cannot restore {as_of:%Y-%m-%d %H:%M:%S}, which is not in the past")
+    values = restore(key, as_of)
+    master = get_worksheet(key, MASTER_TAB)
+    call(master.clear)
+    call(master.update, "A1", values, value_input_option="RAW")
+    # Every row may have changed or moved
+    mirror.mark_changed(full=True, key=key)
+    invalidate_bets()
+    return [_entry(RESTORE_GAMBLER, "restore", len(values), after={"as_of": as_of.strftime(SNAPSHOT_FORMAT)})]
+
+
+if __name__ == "__main__":
+    from utils import spreadsheet_id
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    restore_parser = subparsers.add_parser("restore", help="Rebuild Master as of a point in time")
+    restore_parser.add_argument("--as-of", required=True, type=datetime.fromisoformat, help="UTC timestamp, e.g. 2026-10-01T18:00:00")
+    restore_parser.add_argument("--write", action="store_true", help="Queue a restore of Master for the app's write worker")
+    restore_parser.add_argument("--run", action="store_true", help="With --write, overwrite Master in this process instead")
+    snapshot_parser = subparsers.add_parser("snapshot", help="Take a full snapshot of Master now")
+    args = parser.parse_args()
+
+    key = spreadsheet_id()
+    if args.command == "snapshot":
+        print(maybe_snapshot(key, force=True))
+    else:
+        as_of = args.as_of if args.as_of.tzinfo else args.as_of.replace(tzinfo=timezone.utc)
+        values = restore(key, as_of)
+        print(f"Restored {len(values) - 1} bets as of {as_of:%Y-%m-%d %H:%M:%S} UTC")
+        if args.write and args.run:
+            record(key, write_restore(key, as_of))
+            print(f"Wrote them to {MASTER_TAB}")
+        elif args.write:
+            from write_queue import enqueue_restore
+
+            print(f"Queued the restore as write #{enqueue_restore(as_of)}")
@@ -0,0 +1,225 @@
+"""
+Hot-path instrumentation: timing spans, counters and their export.
+
+Pages wrap each stage in `span`, library code counts API calls, bytes and cache hits/misses with `count`, and
+`finish_rerun` at the bottom of each page closes the rerun. Every measurement is kept twice: per session for the
+current rerun, shown by the debug sidebar panel (open any page with `?debug=1`, or set `BETS_DEBUG=1`), and process
+wide for export:
+
+- `BETS_METRICS_PROM`: file rewritten after every rerun in Prometheus text format, for node_exporter's textfile
+  collector. Span latencies are summaries with p50/p90/p99 over the last `SPAN_WINDOW` observations.
+- `BETS_METRICS_JSONL`: file that gets one JSON line per rerun with its spans and counters.
+"""
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import json
+import os
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+PROMETHEUS_PATH = os.environ.get("BETS_METRICS_PROM")
+JSONL_PATH = os.environ.get("BETS_METRICS_JSONL")
+DEBUG = os.environ.get("BETS_DEBUG") == "1"
+METRIC_PREFIX = "bets_"
+# Observations per span kept for percentiles
+SPAN_WINDOW = 1024
+QUANTILES = [0.5, 0.9, 0.99]
+
+_lock = threading.Lock()
+_spans = defaultdict(lambda: {"window": deque(maxlen=SPAN_WINDOW), "count": 0, "sum": 0.0})
+_counters = defaultdict(float)
+_local = threading.local()
+
+
+def _session() -> dict:
+    """
+    Measurements of the current session's rerun, or None outside a script thread (e.g. the write queue worker).
+    """
+    if get_script_run_ctx(suppress_warning=True) is None:
+        return None
+    if "_metrics" not in st.session_state:
+        st.session_state["_metrics"] = {"page": None, "spans": [], "counters": defaultdict(float), "started": time.perf_counter()}
+    return st.session_state["_metrics"]
+
+
+def start_rerun(page: str) -> None:
+    """
+    Starts a fresh set of per-rerun measurements. Call at the top of each page script.
+
+    Args:
+        page (str): Page name used as the `page` label
+    """
+    if _session() is not None:
+        st.session_state["_metrics"] = {"page": page, "spans": [], "counters": defaultdict(float), "started": time.perf_counter()}
+
+
+@contextmanager
+def span(name: str):
+    """
+    Times the enclosed block.
+
+    Args:
+        name (str): Stage name, e.g. "filter_dataframe"
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        session = _session()
+        page = session["page"] if session else None
+        with _lock:
+            stats = _spans[(name, page)]
+            stats["window"].append(seconds)
+            stats["count"] += 1
+            stats["sum"] += seconds
+        if session is not None:
+            session["spans"].append((name, seconds))
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    """
+    Adds to a counter, e.g. `count("sheets_api_calls", method="post")` or `count("sheets_bytes", 1024)`.
+
+    Args:
+        name (str): Counter name, without the `_total` suffix
+        value (float): Amount to add
+        **labels: Prometheus labels
+    """
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] += value
+    session = _session()
+    if session is not None:
+        session["counters"][key] += value
+
+
+@contextmanager
+def cache_probe(cache: str):
+    """
+    Counts a hit or miss for a call to a cached function whose body calls `cache_miss`.
+
+    Args:
+        cache (str): Cache name label
+    """
+    _local.missed = False
+    yield
+    count("cache_misses" if _local.missed else "cache_hits", cache=cache)
+
+
+def cache_miss() -> None:
+    """
+    Marks the enclosing `cache_probe` as a miss. Call first thing in the cached function's body.
+    """
+    _local.missed = True
+
+
+def instrument_session(session) -> None:
+    """
+    Counts every HTTP request made through a requests session (gspread's authorized session) and its bytes.
+
+    Args:
+        session (requests.Session): Session to hook
+    """
+    def on_response(response, *args, **kwargs):
+        count("sheets_api_calls", method=response.request.method.lower(), status=str(response.status_code))
+        count("sheets_bytes", len(response.request.body or b""), direction="sent")
+        count("sheets_bytes", len(response.content), direction="received")
+
+    session.hooks["response"].append(on_response)
+
+
+def _labels(labels) -> str:
+    labels = [(name, value) for name, value in labels if value is not None]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}" if labels else ""
+
+
+def prometheus_text() -> str:
+    """
+    Process-wide spans and counters in Prometheus text exposition format.
+
+    Returns:
+        str: Exposition text
+    """
+    lines = []
+    with _lock:
+        spans = {key: (list(stats["window"]), stats["count"], stats["sum"]) for key, stats in _spans.items()}
+        counters = dict(_counters)
+    if spans:
+        metric = f"{METRIC_PREFIX}span_seconds"
+        lines += [f"# HELP {metric} Time spent in each instrumented stage.", f"# TYPE {metric} summary"]
+        for (name, page), (window, total, seconds) in sorted(spans.items(), key=str):
+            labels = [("span", name), ("page", page)]
+            for quantile, value in zip(QUANTILES, np.quantile(window, QUANTILES)):
+                lines.append(f"{metric}{_labels(labels + [('quantile', quantile)])} {value:.6f}")
+            lines.append(f"{metric}_sum{_labels(labels)} {seconds:.6f}")
+            lines.append(f"{metric}_count{_labels(labels)} {total}")
+    for name in sorted({name for name, _ in counters}):
+        metric = f"{METRIC_PREFIX}{name}_total"
+        lines.append(f"# TYPE {metric} counter")
+        for (counter, labels), value in sorted(counters.items(), key=str):
+            if counter == name:
+                lines.append(f"{metric}{_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def _export(session: dict) -> None:
+    if PROMETHEUS_PATH:
+        # Each rerun writes its own temporary file, as concurrent reruns would otherwise interleave writes to a
+        # shared one and the second `os.replace` would find it already moved
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(os.path.abspath(PROMETHEUS_PATH)), prefix=os.path.basename(PROMETHEUS_PATH), suffix=".tmp", delete=False
+        ) as file:
+            file.write(prometheus_text())
+        # Temporary files are private to their owner; the textfile collector may run as another user
+        os.chmod(file.name, 0o644)
+        os.replace(file.name, PROMETHEUS_PATH)
+    if JSONL_PATH:
+        line = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "page": session["page"],
+            "seconds": time.perf_counter() - session["started"],
+            "spans": session["spans"],
+            "counters": [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in session["counters"].items()],
+        }
+        with _lock, open(JSONL_PATH, "a") as file:
+            file.write(json.dumps(line) + "\n")
+
+
+def debug_enabled() -> bool:
+    return DEBUG or st.query_params.get("debug") == "1"
+
+
+def finish_rerun() -> None:
+    """
+    Exports the rerun's measurements and, in debug mode, shows them in the sidebar. Call at the bottom of each page.
+    """
+    session = _session()
+    if session is None:
+        return
+    _export(session)
+    if not debug_enabled():
+        return
+    with st.sidebar.expander("⏱️ Debug: this rerun", expanded=True):
+        st.caption(f"{session['page']} · {(time.perf_counter() - session['started']) * 1000:.1f} ms")
+        spans = pd.DataFrame(session["spans"], columns=["Span", "Seconds"])
+        st.dataframe(spans.assign(ms=spans["Seconds"] * 1000).drop(columns="Seconds"), hide_index=True)
+        counters = pd.DataFrame(
+            [(name, ", ".join(f"{key}={value}" for key, value in labels), value) for (name, labels), value in session["counters"].items()],
+            columns=["Counter", "Labels", "Value"],
+        )
+        st.dataframe(counters, hide_index=True)
+    with st.sidebar.expander("⏱️ Debug: process percentiles"):
+        with _lock:
+            rows = [
+                (name, page, stats["count"], *(np.quantile(stats["window"], QUANTILES) * 1000))
+                for (name, page), stats in _spans.items() if stats["count"]
+            ]
+        st.dataframe(pd.DataFrame(rows, columns=["Span", "Page", "Count", "p50 ms", "p90 ms", "p99 ms"]), hide_index=True)
+        st.download_button("Download Prometheus metrics", prometheus_text(), file_name="metrics.prom", mime="text/plain")
@@ -0,0 +1,212 @@
+"""
+Local columnar mirror of the Master tab.
+
+The mirror is a Parquet copy of the sheet values plus a small JSON state file. A sync first asks Drive for the
+spreadsheet's `modifiedTime` and reuses the local copy when it has not moved. Otherwise it fetches only the rows past
+the last known row count plus any rows the app flagged as changed with `mark_changed`. The write queue flags every row
+it writes, appends included, and wraps its writes in `own_writes`, which records the `modifiedTime` they leave behind
+as synced. Only then is the incremental read trusted: when `modifiedTime` moved for any reason `own_writes` did not
+record (an edit or deletion made directly in Google Sheets, a write from another server), the sync falls back to one
+full read, as does a sync after `FULL_RESYNC_INTERVAL`. Archive tabs (see `archive.py`) are synced as immutable: once
+mirrored they are read from disk until a rollover flags them.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import json
+import os
+import threading
+import pandas as pd
+from pandas.io.parsers import TextParser
+import streamlit as st
+import metrics
+from utils import FIRST_DATA_ROW, MASTER_TAB, _credentials, get_gspread_client, get_spreadsheet, get_worksheet, spreadsheet_id
+
+MIRROR_DIR = os.environ.get("BETS_MIRROR_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+# Upper bound on how long an edit made outside the app can go unnoticed while bets keep being appended
+FULL_RESYNC_INTERVAL = timedelta(hours=int(os.environ.get("BETS_FULL_RESYNC_HOURS", 24)))
+
+_lock = threading.Lock()
+
+
+def _paths(key: str, tab_name: str) -> tuple:
+    stem = os.path.join(MIRROR_DIR, f"{key}-{tab_name}")
+    return f"{stem}.parquet", f"{stem}.json"
+
+
+def _read_state(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_state(path: str, state: dict) -> None:
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+@st.cache_resource(show_spinner=False)
+def _drive_service():
+    # Imported here: the Drive client is only needed for the modified-time check of a Google Sheets sync
+    from googleapiclient.discovery import build
+
+    return build("drive", "v3", credentials=_credentials(get_gspread_client()), cache_discovery=False)
+
+
+def modified_time(key: str) -> str:
+    """
+    Drive's last modified time for the spreadsheet, a single lightweight metadata call.
+
+    Args:
+        key (str): Spreadsheet key
+
+    Returns:
+        str: RFC 3339 timestamp
+    """
+    import backend
+
+    if backend.BACKEND == backend.LOCAL:
+        return get_spreadsheet(key).lastUpdateTime
+    metrics.count("drive_api_calls")
+    return _drive_service().files().get(fileId=key, fields="modifiedTime", supportsAllDrives=True).execute()["modifiedTime"]
+
+
+def mark_changed(rows: list = None, full: bool = False, key: str = None, tab_name: str = MASTER_TAB) -> None:
+    """
+    Flags sheet rows the app has just written, overwritten or appended, so the next sync fetches them whether or not
+    Drive's `modifiedTime` has caught up. Use `full=True` after deletions, which shift every row below them.
+
+    Args:
+        rows (list): Sheet row numbers (1-based, header is row 1), e.g. from the `append_rows` response
+        full (bool): Force a full re-read on the next sync
+        key (str): Spreadsheet key, defaults to `spreadsheet_id()`
+        tab_name (str): Worksheet title
+    """
+    _, state_path = _paths(key or spreadsheet_id(), tab_name)
+    with _lock:
+        state = _read_state(state_path)
+        if not state:
+            return
+        state["changed_rows"] = sorted(set(state.get("changed_rows", [])) | set(rows or []))
+        state["full"] = state.get("full", False) or full
+        _write_state(state_path, state)
+
+
+@contextmanager
+def own_writes(key: str = None):
+    """
+    Brackets a batch of writes the app makes itself: to Master, flagged with `mark_changed`, and to other tabs such as
+    the journal. When the mirror was current before the batch, the `modifiedTime` the batch leaves behind is recorded
+    as already synced, so the next sync fetches only the flagged rows instead of treating the batch as an outside
+    edit. An outside edit landing during the batch is then only caught by the next full read.
+
+    Args:
+        key (str): Spreadsheet key, defaults to `spreadsheet_id()`
+    """
+    key = key or spreadsheet_id()
+    _, state_path = _paths(key, MASTER_TAB)
+    synced = _read_state(state_path).get("modified_time")
+    current = synced is not None and modified_time(key) == synced
+    yield
+    if not current:
+        return
+    modified = modified_time(key)
+    with _lock:
+        state = _read_state(state_path)
+        if state:
+            state["modified_time"] = modified
+            _write_state(state_path, state)
+
+
+def _to_frame(header: list, rows: list) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=header, dtype="string") if rows else pd.DataFrame(columns=header, dtype="string")
+
+
+def _pad(rows: list, width: int) -> list:
+    return [(row + [""] * width)[:width] for row in rows]
+
+
+def sync(key: str = None, tab_name: str = MASTER_TAB, immutable: bool = False) -> pd.DataFrame:
+    """
+    Brings the local mirror up to date with the sheet and returns it.
+
+    Args:
+        key (str): Spreadsheet key, defaults to `spreadsheet_id()`
+        tab_name (str): Worksheet title
+        immutable (bool): The tab only changes through `mark_changed(full=True)`, like an archive tab, so an existing
+            mirror is used without asking Drive whether the spreadsheet moved
+
+    Returns:
+        pd.DataFrame: Sheet values as strings, one row per sheet row below the header
+    """
+    key = key or spreadsheet_id()
+    parquet_path, state_path = _paths(key, tab_name)
+    with _lock:
+        os.makedirs(MIRROR_DIR, exist_ok=True)
+        state = _read_state(state_path)
+        have_mirror = bool(state) and os.path.exists(parquet_path)
+        if immutable and have_mirror and not state.get("full"):
+            metrics.count("mirror_syncs", mode="immutable")
+            return pd.read_parquet(parquet_path)
+        modified = modified_time(key)
+        now = datetime.now(timezone.utc)
+
+        if have_mirror and modified == state["modified_time"] and not state.get("changed_rows") and not state.get("full"):
+            metrics.count("mirror_syncs", mode="unchanged")
+            return pd.read_parquet(parquet_path)
+
+        worksheet = get_worksheet(key, tab_name)
+        # A `modifiedTime` that `own_writes` did not record means the sheet changed outside the app's flagged rows,
+        # e.g. a row deleted in Sheets, which shifts the rows the app flagged since
+        full = (
+            not have_mirror
+            or state.get("full")
+            or modified != state["modified_time"]
+            or now - datetime.fromisoformat(state["full_synced_at"]) > FULL_RESYNC_INTERVAL
+        )
+        if not full:
+            import gspread.utils
+
+            df = pd.read_parquet(parquet_path)
+            header = df.columns.tolist()
+            last_col = gspread.utils.rowcol_to_a1(1, len(header)).rstrip("1")
+            first_new_row = len(df) + FIRST_DATA_ROW
+            # Rows at or past the end of the mirror are the app's appends, which the tail range covers
+            changed_rows = [row for row in state.get("changed_rows", []) if row < first_new_row]
+            last_appended = max(state.get("changed_rows", []) + [0])
+            ranges = [f"A{first_new_row}:{last_col}"] + [f"A{row}:{last_col}{row}" for row in changed_rows]
+            tail, *changed = worksheet.batch_get(ranges)
+            # Fewer rows than the app appended, so the sheet was edited elsewhere during one of its own batches
+            full = first_new_row + len(tail) <= last_appended
+
+        if full:
+            values = worksheet.get_all_values()
+            header, rows = values[0], values[1:]
+            df = _to_frame(header, _pad(rows, len(header)))
+            state = {"full_synced_at": now.isoformat()}
+        else:
+            for row, values in zip(changed_rows, changed):
+                df.iloc[row - FIRST_DATA_ROW] = _pad(list(values) or [[]], len(header))[0]
+            df = pd.concat([df, _to_frame(header, _pad(list(tail), len(header)))], ignore_index=True)
+
+        metrics.count("mirror_syncs", mode="full" if full else "incremental")
+        df.to_parquet(parquet_path, index=False)
+        state.update(modified_time=modified, changed_rows=[], full=False)
+        _write_state(state_path, state)
+        return df
+
+
+def parse_values(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parses mirrored string values the same way the gsheets connection does (blank cells to NaN, numbers inferred).
+
+    Args:
+        df (pd.DataFrame): Mirror frame from `sync`
+
+    Returns:
+        pd.DataFrame: Frame with inferred dtypes
+    """
+    rows = df.fillna("").values.tolist()
+    return TextParser(rows, names=df.columns.tolist()).read() if rows else pd.DataFrame(columns=df.columns)
@@ -1,16 +1,38 @@
 from datetime import datetime
-import pytz
+import hashlib
+from zoneinfo import ZoneInfo
 import pandas as pd
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
-import gspread
-import time
+import journal
+import metrics
+from archive import hot_only
+from bulk_import import UPLOAD_TYPES, template_csv, to_sheet_rows, validate_slips
+from schema import (
+    bet_category_selectbox,
+    data_version,
+    bet_sport_selectbox,
+    bet_type_selectbox,
+    gambler_selectbox,
+    normalize_bets,
+    risk_type_selectbox,
+    sportsbook_selectbox,
+    status_selectbox,
+    yes_no,
+)
+from utils import (
+    load_bets,
+    page_delta_to_global,
+    paginate,
+    status_index,
+)
+from write_queue import enqueue_append, enqueue_appends, enqueue_delta, job_status, start_worker
 
 # ###########################################################################
 # Show app title and description.
 # ###########################################################################
 st.set_page_config(page_title="Bet Logger", page_icon="📒", layout="wide")
 st.title("📒 Bet Logger 📒")
+metrics.start_rerun("Bet Logger")
 st.write(
     """
     Add a new bet slip to the archive.
@@ -19,45 +41,61 @@ st.write(
 st.divider()
 
 # ###########################################################################
-# Create a connection object.
+# Load the shared bet data.
 # Save the dataframe in session state (a dictionary-like object that persists across page runs). This ensures our data is persisted when the app updates.
+# Only Master, the hot partition, is loaded here: archived periods are read-only and editor rows map to Master rows.
 # ###########################################################################
-conn = st.connection("gsheets", type=GSheetsConnection)
-df = conn.read()
+df = load_bets(**hot_only())
+st.session_state.df = df
 
-sheet_name = "Gamblers Anonymous Streamlit"
-tab_name = "Master"
+# ###########################################################################
+# Writes go through a durable background queue, so submitting never waits on Google Sheets.
+# The worker merges queued slips into batched appends and backs off on rate limits.
+# ###########################################################################
+start_worker()
+if 'write_jobs' not in st.session_state:
+    st.session_state.write_jobs = []
 
-gc = gspread.service_account_from_dict(dict(st.secrets["gsheets"]))
-# gc = gspread.service_account(filename="secrets/google-credentials.json")
-google_sheet = gc.open(sheet_name)
-google_worksheet = google_sheet.worksheet(tab_name)
 
-# Convert to datetime.date
-df['Bet Date'] = pd.to_datetime(df['Bet Date']).dt.date
-df['Bet Odds'] = df["Bet Odds"].astype(str)
-df['Certified Degenerate Bet'] = (df["Certified Degenerate Bet"]).str.title()
+def write_update(delta: dict, gambler: str) -> None:
+    """
+    Queues an editor delta (in sheet-order positions) for Master, with the overwritten values for the journal and the
+    rows it touches, which the worker checks are still in place.
+    """
+    before = journal.before_values(base_df, delta)
+    expected = journal.row_values(base_df, [*delta["edited_rows"], *delta["deleted_rows"]])
+    st.session_state.write_jobs.append(enqueue_delta(gambler, base_df.columns.tolist(), delta, before, expected))
+    st.session_state.editor_version += 1
 
-st.session_state.df = df
+
+@st.fragment(run_every=2)
+def write_status() -> None:
+    """
+    Reports this session's queued writes and reloads the page once they have landed.
+    """
+    statuses = job_status(st.session_state.write_jobs)
+    pending = [job_id for job_id, (status, _) in statuses.items() if status in ("pending", "running")]
+    done = [job_id for job_id, (status, _) in statuses.items() if status == "done"]
+    for job_id, (status, error) in statuses.items():
+        if error:
+            st.error(f"Write #{job_id} {'failed' if status == 'failed' else 'finished with a warning'}: {error}", icon="🚨")
+    if pending:
+        st.info(f"⏳ {len(pending)} write(s) queued for Google Sheets...")
+    if done:
+        st.session_state.write_jobs = [job_id for job_id in st.session_state.write_jobs if job_id not in done]
+        st.toast("✅ Successfully wrote bet update(s)!")
+        st.rerun()
+
+
+with st.sidebar:
+    write_status()
 
 # ###########################################################################
 # Generate date default in CST
 # ###########################################################################
-cst_na = pytz.timezone('America/Chicago')
+cst_na = ZoneInfo('America/Chicago')
 datetime_cst_na = datetime.now(cst_na).date() 
 
-# ###########################################################################
-# selectbox Lists
-# ###########################################################################
-sportsbook_selectbox = ["Prizepicks", "Underdog", "Fliff", "Sleeper", "Chalkboard", "Boom Fantasy", "Potawatomi", "ParlayPlay", "FanDuel", "ProphetX", "Thrillz", "Rebet", "Novig"]
-gambler_selectbox = ["Alex Hennes", "Ty Mallo", "Bryan Driebel", "Dustin Wendegatz"]
-status_selectbox = ["Placed", "Win", "Loss", "Push", "Reboot"]
-risk_type_selectbox = ["Cash", "Promotion"]
-bet_type_selectbox = ["Straight", "Parlay", "Future"]
-bet_category_selectbox = ["Prop", "Moneyline", "Spread", "Totals", "Mixed"]
-bet_sport_selectbox = ["Baseball", "Football", "Basketball", "Hockey", "Tennis", "Soccer", "Golf", "Other"]
-yes_no = ["No", "Yes"]
-
 # ###########################################################################
 # Show a form to add a new bet slip.
 # We're adding bets via an `st.form` and some input widgets. If widgets are used in a form, the app will only rerun once the submit button is pressed.
@@ -69,7 +107,7 @@ if 'validation_messages' not in st.session_state:
 
 st.header("Log a New Bet Slip")
 st.info(
-    "You can add a new bet slip by entering information into the form below. If a bet result and payout becomes known, please use the table below and sort by bet status to find \"Placed\" bet slips.",
+    "You can add a new bet slip by entering information into the form below. If a bet result and payout becomes known, please use the Settle Open Bets table below, which lists only \"Placed\" bet slips.",
     icon="✍️",
 )
 with st.form("add_bet_slip_form"):
@@ -199,7 +237,7 @@ if submitted:
                     "Bet Status": status,
                     "Bet Risk Type": risk_type,
                     "Bet Type": bet_type,
-                    "Bet Cateogry": bet_category,
+                    "Bet Category": bet_category,
                     "Bet Sport": bet_sport,
                     "Bet Date": bet_date,
                     "Bet Amount": bet_amount,
@@ -211,7 +249,7 @@ if submitted:
                     "Bet Statistic(s)": bet_stat,
                     "Bet Game(s)": bet_game,
                     "Certified Degenerate Bet": degen_bet,
-                    "Notes": notes,
+                    "Bet Notes": notes,
                 }
             ]
         )
@@ -221,7 +259,9 @@ if submitted:
         # ###########################################################################
         st.success("🤑 Bet slip submitted! Details can be found below.")
         st.dataframe(df_with_submitted, use_container_width=True, hide_index=True)
-        st.session_state.df = pd.concat([df_with_submitted, st.session_state.df], axis=0)
+        # Appended at the end to keep editor row positions aligned with sheet rows, then normalized again as the
+        # concatenation falls back to object columns wherever the categories differ
+        st.session_state.df = normalize_bets(pd.concat([st.session_state.df, df_with_submitted], axis=0, ignore_index=True))
 
         # ###########################################################################
         # Write new bet slip contents to sheet
@@ -229,9 +269,140 @@ if submitted:
         df_with_submitted["Bet Date"] = df_with_submitted["Bet Date"].astype(str)
         df_with_submitted = df_with_submitted.fillna("N/A")
 
-        google_worksheet.append_rows(df_with_submitted.values.tolist(), value_input_option="USER_ENTERED")
-    
+        st.session_state.write_jobs.append(
+            enqueue_append(gambler, df.columns.tolist(), df_with_submitted.values.tolist(), value_input_option="USER_ENTERED")
+        )
+
+# ###########################################################################
+# Show a bulk import for backfilling many bet slips from a CSV or Excel file.
+# Every row is validated at once; valid rows are queued as a few chunked appends.
+# ###########################################################################
+if 'upload_version' not in st.session_state:
+    st.session_state.upload_version = 0
+
+with st.expander("📤 Import Bet Slips from CSV/Excel"):
+    st.write("Upload a file with the sheet's column headers. Money columns and Bet Notes may be left out; every other column is required.")
+    st.download_button("Download template", template_csv(), file_name="bet_slips_template.csv", mime="text/csv")
+    upload = st.file_uploader("Bet slips file", type=UPLOAD_TYPES, key=f"bet_upload_{st.session_state.upload_version}")
+    if upload is not None:
+        try:
+            with metrics.span("validate_slips"):
+                checked = validate_slips(upload.getvalue(), upload.name)
+        except ValueError as error:
+            st.error(str(error), icon="🚨")
+        else:
+            valid_col, error_col = st.columns(2)
+            valid_col.metric("Valid Bet Slips", f"{len(checked['rows']):,} of {checked['total']:,}")
+            error_col.metric("Rows With Errors", f"{checked['errors']['Row'].nunique():,}")
+            if checked['ignored']:
+                st.warning(f"Ignoring unknown column(s): {', '.join(checked['ignored'])}")
+            if not checked['errors'].empty:
+                st.write("Rows with errors are skipped. Fix them in the file and upload it again to import them.")
+                st.dataframe(checked['errors'], use_container_width=True, hide_index=True)
+            if not checked['rows'].empty:
+                st.dataframe(checked['rows'], use_container_width=True, hide_index=True)
+                imported_by = st.selectbox(
+                    "Imported By"
+                    ,gambler_selectbox
+                    ,index=None
+                    ,placeholder="Select your gambler name..."
+                )
+                submit_import = st.button(label=f"Import {len(checked['rows']):,} Bet Slip(s)",
+                            type="primary",
+                            icon="📥",
+                        )
+                if submit_import and not imported_by:
+                    st.error("Please select who is importing the bet slips before submitting.")
+                elif submit_import:
+                    st.session_state.write_jobs += enqueue_appends(
+                        imported_by, df.columns.tolist(), to_sheet_rows(checked['rows']), value_input_option="USER_ENTERED"
+                    )
+                    # Appended at the end to keep editor row positions aligned with sheet rows, normalized as for the form
+                    st.session_state.df = normalize_bets(pd.concat([st.session_state.df, checked['rows']], axis=0, ignore_index=True))
+                    # A fresh uploader, so the same file is not imported twice
+                    st.session_state.upload_version += 1
+                    st.success(f"✅ {len(checked['rows']):,} bet slip(s) queued!")
+
 
+# Pre-edit rows, journaled as the "before" side of each change
+base_df = st.session_state.df
+
+# The editor keys are rotated after each write so a submitted edit delta is not replayed on the next run
+if 'editor_version' not in st.session_state:
+    st.session_state.editor_version = 0
+
+# ###########################################################################
+# Show the open bets settlement queue.
+# Only "Placed" rows are sent to the editor; their positions map settlements back to sheet rows.
+# ###########################################################################
+st.divider()
+st.header("Settle Open Bets")
+with metrics.span("status_index"):
+    open_positions = status_index(base_df, data_version(base_df), "Placed")
+st.write(f"Number of open bets: `{len(open_positions)}`")
+settle_columns = [
+    "Gambler Name",
+    "Bet Date",
+    "Sportsbook Name",
+    "Bet Amount",
+    "Bet Odds",
+    "Bet Team/Player(s)",
+    "Bet Statistic(s)",
+    "Bet Status",
+    "Bet Payout Amount",
+    "Bet Net Win Amount",
+]
+# The editor key is tied to the exact set of open bets, as for the paged editor below, so a pending settlement is
+# never applied to different bets that happen to leave the same count open
+settle_signature = hashlib.sha1(open_positions.tobytes()).hexdigest()[:8]
+settle_key = f"settle_editor_{st.session_state.editor_version}_{settle_signature}"
+st.data_editor(
+    base_df.iloc[open_positions][settle_columns],
+    use_container_width=True,
+    hide_index=True,
+    column_config={
+        "Bet Date": st.column_config.DateColumn("Bet Date"),
+        "Bet Status": st.column_config.SelectboxColumn(
+            "Bet Status",
+            help="Bet Status",
+            options=status_selectbox,
+            required=True,
+        ),
+        "Bet Payout Amount": st.column_config.NumberColumn(
+            "Bet Payout Amount",
+            help="If the bet is settled, enter total payout amount. Otherwise enter 0 to update later...",
+            min_value=0,
+            format="dollar",
+            required=True,
+        ),
+        "Bet Net Win Amount": st.column_config.NumberColumn(
+            "Bet Net Win Amount",
+            help="If the bet pays any nonzero amount, enter total payout amount. Otherwsie enter 0...",
+            min_value=0,
+            format="dollar",
+            required=True,
+        ),
+    },
+    # Only the settlement fields are editable
+    disabled=[column for column in settle_columns if column not in ("Bet Status", "Bet Payout Amount", "Bet Net Win Amount")],
+    key=settle_key,
+)
+settled_by = st.selectbox(
+    "Settled By"
+    ,gambler_selectbox
+    ,index=None
+    ,placeholder="Select your gambler name..."
+)
+submit_settlement = st.button(label="Settle Bet(s)",
+            type="primary",
+            icon="💰",
+        )
+
+if submit_settlement and not settled_by:
+    st.error("Please select who is settling the bet(s) before submitting.")
+elif submit_settlement:
+    write_update(page_delta_to_global(st.session_state[settle_key], open_positions), settled_by)
+    st.success("✅ Bet settlement(s) queued!")
 
 # ###########################################################################
 # Show section to view and edit existing bets in a table.
@@ -239,16 +410,24 @@ if submitted:
 st.divider()
 st.header("Update an existing bet")
 st.info(
-    "You can edit the bet slips by double clicking on a cell. The table is sortable by clicking on column headers.",
+    "You can edit the bet slips by double clicking on a cell. Use the controls above the table to pick columns, sort and page through bets. Submit your update(s) before changing page, sort or columns. Settled bets from archived periods are read-only and can be found in Historical Bet Lookup.",
     icon="✍️",
 )
 
 
+# Only one page of bets is sent to the editor; its positions map edits back to sheet rows
+with metrics.span("paginate"):
+    page_df, page_positions = paginate(base_df, key="editor")
+
+# The editor key is tied to the visible page so a delta is never applied to the wrong rows
+page_signature = hashlib.sha1(page_positions.tobytes() + str(page_df.columns.tolist()).encode()).hexdigest()[:8]
+editor_key = f"bet_editor_{st.session_state.editor_version}_{page_signature}"
+
 # ###########################################################################
 # Show the bets dataframe with `st.data_editor`. This lets the user edit the table cells. The edited data is returned as a new dataframe.
 # ###########################################################################
 edited_df = st.data_editor(
-    st.session_state.df,
+    page_df,
     use_container_width=True,
     hide_index=True,
     column_config={
@@ -330,6 +509,7 @@ edited_df = st.data_editor(
         "Bet Odds": st.column_config.NumberColumn(
             "Bet Odds",
             help="Enter bet odds, including +/- (American)",
+            format="%+d",
             required=True,
         ), 
         "Bet Team/Player(s)": st.column_config.TextColumn(
@@ -361,37 +541,28 @@ edited_df = st.data_editor(
     },
     # Disable editing
     disabled=[],
+    key=editor_key,
 )
-st.session_state.df = edited_df
 
 # ###########################################################################
 #  Write updated bet slip contents to sheet
 # ###########################################################################
+updated_by = st.selectbox(
+    "Updated By"
+    ,gambler_selectbox
+    ,index=None
+    ,placeholder="Select your gambler name..."
+)
 submit_update = st.button(label="Submit Update(s)",
             type="primary",
             icon="🗳️",
         )
 
-if submit_update:
-    df_update_existing_bet = edited_df
-    df_update_existing_bet["Bet Date"] = df_update_existing_bet["Bet Date"].astype(str)
-    df_update_existing_bet = df_update_existing_bet.fillna("N/A")
-
-    # Create a backup as the update process is truncate-load
-    data = google_worksheet.get_all_values()
-    # Create or get backup tab
-    backup_ws = google_sheet.worksheet("Backup")
-    backup_ws.clear()
-    backup_ws.update("A1", data)
-
-    # google_worksheet.clear()
-    google_worksheet.update("A1",
-                            [df_update_existing_bet.columns.tolist()] + df_update_existing_bet.values.tolist(),
-                             value_input_option="RAW"
-                        )
-    with st.empty():
-        st.success("✅ Successfully wrote bet update(s)!")
-        time.sleep(5)
-        st.write("")
+if submit_update and not updated_by:
+    st.error("Please select who is making the update before submitting.")
+elif submit_update:
+    write_update(page_delta_to_global(st.session_state[editor_key], page_positions), updated_by)
+    st.success("✅ Bet update(s) queued!")
 
-st.divider()
\ No newline at end of file
+st.divider()
+metrics.finish_rerun()
\ No newline at end of file
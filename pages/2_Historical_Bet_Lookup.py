@@ -1,14 +1,18 @@
 from datetime import datetime
-import pandas as pd
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
-from utils import filter_dataframe
+import metrics
+from archive import date_scope, load_scope, scope_key
+from export import FORMATS, export_bets
+from schema import data_version
+from search import leg_index, restrict, search_text
+from utils import filter_dataframe, paginate
 
 # ###########################################################################
 # Show app title and description.
 # ###########################################################################
 st.set_page_config(page_title="Historical Bet Lookup", page_icon="🔎", layout="wide")
 st.title("🔎 Historical Bet Lookup 🔎")
+metrics.start_rerun("Historical Bet Lookup")
 st.write(
     """
     A historical data lookup for all bets placed through the `Gamblers Anonymous` support group. Many :green[winners]! ... and even more :red[losers]!
@@ -17,14 +21,12 @@ st.write(
 st.divider()
 
 # ###########################################################################
-# Create a connection object.
+# Load the shared bet data.
 # Save the dataframe in session state (a dictionary-like object that persists across page runs). This ensures our data is persisted when the app updates.
 # ###########################################################################
-conn = st.connection("gsheets", type=GSheetsConnection)
-df = conn.read()
-# Convert to datetime.date
-df['Bet Date'] = pd.to_datetime(df['Bet Date']).dt.date
-df['Bet Odds'] = df["Bet Odds"].astype(str)
+# Archived periods are only read when the sidebar date range reaches into them
+scope = date_scope()
+df = load_scope(**scope)
 
 st.session_state.df = df
 
@@ -32,7 +34,10 @@ st.session_state.df = df
 # Show section to view and edit existing bets in a table.
 # ###########################################################################
 st.header("Historical Bet Records")
-st.write(f"Number of total bets placed: `{len(st.session_state.df)}`")
+if scope:
+    st.write(f"Number of bets placed in the selected date range: `{len(st.session_state.df)}`")
+else:
+    st.write(f"Number of total bets placed: `{len(st.session_state.df)}`")
 
 st.info(
     "You can filter the historical data by any dimension and/or attribute using the Add filters checkbox.",
@@ -42,5 +47,59 @@ st.info(
 # ###########################################################################
 # User input for filtering dataframe
 # ###########################################################################
-st.dataframe(filter_dataframe(df))
-st.divider()
\ No newline at end of file
+with metrics.span("filter_dataframe"):
+    filtered_df = filter_dataframe(df)
+
+# ###########################################################################
+# Parlay leg search, answered from an inverted index over the exploded legs
+# ###########################################################################
+with st.expander("Search parlay legs"):
+    st.caption("Finds bets with a leg matching every field you fill in, e.g. Obi Toppin + R+A.")
+    leg_columns = st.columns(3)
+    leg_queries = {
+        "Bet Team/Player(s)": leg_columns[0].text_input("Team/Player"),
+        "Bet Statistic(s)": leg_columns[1].text_input("Statistic"),
+        "Bet Game(s)": leg_columns[2].text_input("Game"),
+    }
+if any(leg_queries.values()):
+    with metrics.span("leg_search"):
+        bet_ids = leg_index(df, data_version(df)).search(leg_queries)
+        filtered_df = restrict(filtered_df, bet_ids, str(sorted(leg_queries.items())))
+
+# ###########################################################################
+# Full-text search across every text field, ranked best match first
+# ###########################################################################
+search_query = st.text_input(
+    "🔍 Search all bets",
+    placeholder="Players, games, stats, sportsbooks or notes, e.g. flex friday toppin",
+)
+if search_query:
+    with metrics.span("text_search"):
+        ranked_ids = search_text(df, search_query, scope_key(scope))
+        filtered_df = restrict(filtered_df, ranked_ids, search_query, ranked=True)
+
+# Only the visible page of the filtered rows is sent to the browser
+with metrics.span("paginate"):
+    page_df, _ = paginate(filtered_df, key="history")
+with metrics.span("render_table"):
+    st.dataframe(page_df, hide_index=True, column_config={"Bet Date": st.column_config.DateColumn("Bet Date")})
+
+# ###########################################################################
+# Export the filtered rows for offline analysis.
+# The file is only built when the button is clicked, in chunks, off the page script.
+# ###########################################################################
+with st.expander("⬇️ Export filtered bets"):
+    export_left, export_right = st.columns(2)
+    export_format = export_left.radio("Format:", list(FORMATS), horizontal=True)
+    export_legs = export_right.checkbox("One row per parlay leg", help="Repeats each bet's details on every leg, with Bet ID and Leg number")
+    extension, mime = FORMATS[export_format]
+    st.download_button(
+        f"Download {len(filtered_df):,} bet(s)",
+        data=lambda: export_bets(filtered_df, export_format, export_legs),
+        file_name=f"bets{'_legs' if export_legs else ''}_{datetime.now():%Y%m%d}.{extension}",
+        mime=mime,
+        on_click="ignore",
+        icon="📦",
+    )
+st.divider()
+metrics.finish_rerun()
\ No newline at end of file
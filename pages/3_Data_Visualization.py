@@ -1,15 +1,19 @@
-import altair as alt
 import pandas as pd
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
-from streamlit_dynamic_filters import DynamicFilters
-from utils import filter_dataframe
+import metrics
+from archive import date_scope, load_scope, scope_key
+from aggregations import bankroll_series, facet_summary, pick_resolution, selection_key
+from analytics import GROUPINGS, profitability
+from charts import THEMES, amount_bar_spec, bankroll_spec, pie_spec
+from filters import cascading_filters
+from schema import data_version
 
 # ###########################################################################
 # Show app title and description.
 # ###########################################################################
 st.set_page_config(page_title="Data Visualization", page_icon="📊", layout="wide")
 st.title("📊 Data Visualization 📊")
+metrics.start_rerun("Data Visualization")
 st.write(
     """
     Overall statistics and aggregate calculations for historical bet data.
@@ -22,190 +26,148 @@ st.info(
 st.divider()
 
 # ###########################################################################
-# Create a connection object.
+# Load the shared bet data.
 # Save the dataframe in session state (a dictionary-like object that persists across page runs). This ensures our data is persisted when the app updates.
 # ###########################################################################
-conn = st.connection("gsheets", type=GSheetsConnection)
-df = conn.read()
-# Convert to datetime.date
-df['Bet Date'] = pd.to_datetime(df['Bet Date']).dt.date
-df['Bet Odds'] = df["Bet Odds"].astype(str)
-df['Certified Degenerate Bet'] = (df["Certified Degenerate Bet"]).str.title().astype(str)
+# Archived periods are only read when the sidebar date range reaches into them
+scope = date_scope()
+df = load_scope(**scope)
 
 st.session_state.df = df
 
 # ###########################################################################
 # Page Filters
 # ###########################################################################
-bet_logger_dynamic_filters = DynamicFilters(
-    df=df,
-    filters=['Gambler Name', 'Bet Status', 'Bet Sport', 'Bet Date', 'Bet Category', 'Certified Degenerate Bet'],
-    filters_name='bet_logger'
-)
-bet_logger_dynamic_filters.display_filters(location='sidebar', num_columns=2, gap='small')
-
-# save filtered df as new variable
-filter_df = bet_logger_dynamic_filters.filter_df()
+with metrics.span("cascading_filters"):
+    filter_df = cascading_filters(
+        df,
+        columns=['Gambler Name', 'Bet Status', 'Bet Sport', 'Bet Date', 'Bet Category', 'Certified Degenerate Bet'],
+        name='bet_logger',
+        version=data_version(df),
+    )
 source = filter_df
 
+# All facet counts and daily sums, computed once per data version and filter selection
+with metrics.span("facet_summary"), metrics.cache_probe("facet_summary"):
+    summary = facet_summary(filter_df, data_version(df), selection_key(st.session_state['bet_logger']))
+
 # ###########################################################################
 # Show some metrics and charts
+# Only the selected theme is rendered, from specs cached on the aggregated data
 # ###########################################################################
 st.header("Statistics & Data Visualization")
-st.write("#### Bet Win vs. Loss Totals")
-status_counts = filter_df['Bet Status'].value_counts().reset_index()
-status_counts.columns = ['Bet Status', 'Count']
-
-# Build Altair pie chart
-pie = alt.Chart(status_counts).mark_arc(innerRadius=50).encode(
-    theta=alt.Theta(field="Count", type="quantitative"),
-    color=alt.Color(field="Bet Status", type="nominal"),
-    tooltip=["Bet Status", "Count"]
-).properties(
-    width="container",
-    title="Wins vs Losses"
-)
+theme = THEMES[st.radio("Chart theme", list(THEMES), horizontal=True)]
 
-tab1, tab2 = st.tabs(["Streamlit theme", "Altair theme"])
-with tab1:
-    st.altair_chart(pie, theme="streamlit", use_container_width=True)
-with tab2:
-        st.altair_chart(pie, theme=None, use_container_width=True)
+st.write("#### Bet Win vs. Loss Totals")
+with metrics.span("chart.Bet Status"):
+    st.vega_lite_chart(pie_spec(summary['facets']['Bet Status'], "Bet Status", "Wins vs Losses"), theme=theme, use_container_width=True)
 
 st.divider()
 
 st.write("#### Bet Total Risk & Win Amounts Totals By Date")
 st.info(
-    "Data is restricted to the month selected in the selection box below. This reduces the clutter of the visual and maintains readability of data.",
-    icon="⚠️",
+    "Bars are grouped by day, week, month or season (calendar quarter), whichever is the finest that keeps the chart readable for the selected range.",
+    icon="📅",
 )
-filter_df['Bet Date'] = pd.to_datetime(filter_df['Bet Date'])
-filter_df['Year-Month'] = filter_df['Bet Date'].dt.to_period('M').astype(str)
-
-# Streamlit dropdown to select month
-available_months = sorted(filter_df['Year-Month'].unique(), reverse=True)
-selected_month = st.selectbox("Select Month:", available_months)
+rollups = summary['rollups']
+daily_df = rollups['Day']
+if daily_df.empty:
+    st.write("No dated bets to chart.")
+else:
+    first_day, last_day = daily_df['Start'].min().date(), daily_df['Start'].max().date()
+    amount_range = st.date_input("Date Range:", value=(first_day, last_day), min_value=first_day, max_value=last_day, key="amount_range")
+    # The range is a single date while the second end is being picked
+    range_start, range_end = map(pd.Timestamp, amount_range if len(amount_range) == 2 else (first_day, last_day))
+    resolution, buckets = pick_resolution(rollups, range_start, range_end)
+    st.caption(f"{len(buckets)} {resolution.lower()} buckets")
+    with metrics.span("chart.amount_bar"):
+        st.vega_lite_chart(amount_bar_spec(buckets, resolution), theme=theme, use_container_width=True)
 
-filtered_month_df = filter_df[filter_df['Year-Month'] == selected_month]
-
-agg_df = (
-    filtered_month_df
-    .groupby('Bet Date')[['Bet Amount', 'Bet Net Win Amount']]
-    .sum()
-    .reset_index()
-)
+st.divider()
 
-# Melt into long format for side-by-side bars
-melted_df = agg_df.melt(
-    id_vars='Bet Date',
-    value_vars=['Bet Amount', 'Bet Net Win Amount'],
-    var_name='Metric',
-    value_name='Amount'
+st.write("#### Bankroll & Drawdown")
+st.info(
+    "Running totals over every settled bet, limited to the gamblers selected in the sidebar. Drawdown is how far a gambler is below their best running total.",
+    icon="💰",
 )
-
-# Altair grouped horizontal bar chart
-bar_chart = alt.Chart(melted_df).mark_bar().encode(
-    column=alt.Column('Bet Date', spacing=5, header=alt.Header(labelOrient="bottom", labelAngle=50, labelPadding=75, labelFontSize=12)),
-    x=alt.X('Metric', sort=['Bet Amount', 'Bet Net Win Amount'], axis=None),
-    y=alt.Y('Amount', title='Amount'),
-    color=alt.Color('Metric:N', title='Metric')
-).properties(
-    title='Bet Amount vs Net Win Amount by Date',
-    width=30,
-).interactive()
-
-tab1, tab2 = st.tabs(["Streamlit theme", "Altair theme"])
-with tab1:
-    st.altair_chart(bar_chart, theme="streamlit", use_container_width=False)
-with tab2:
-    st.altair_chart(bar_chart, theme=None, use_container_width=False)
+with metrics.span("bankroll_series"):
+    bankroll_df = bankroll_series(df, scope_key(scope))
+selected_gamblers = st.session_state['bet_logger'].get('Gambler Name')
+if selected_gamblers:
+    bankroll_df = bankroll_df[bankroll_df['Gambler'].isin(selected_gamblers)]
+
+if bankroll_df.empty:
+    st.write("No settled bets to chart.")
+else:
+    first_date, last_date = bankroll_df['Bet Date'].min().date(), bankroll_df['Bet Date'].max().date()
+    bankroll_left, bankroll_middle, bankroll_right = st.columns(3)
+    starting_bankroll = bankroll_left.number_input("Starting Bankroll:", min_value=0.0, value=0.0, step=50.0)
+    bankroll_metric = bankroll_middle.radio("Show:", ["Bankroll", "Drawdown"], horizontal=True)
+    date_range = bankroll_right.date_input("Date Range:", value=(first_date, last_date), min_value=first_date, max_value=last_date, key="bankroll_range")
+    # The range is a single date while the second end is being picked
+    if len(date_range) == 2:
+        start_date, end_date = map(pd.Timestamp, date_range)
+        bankroll_df = bankroll_df[bankroll_df['Bet Date'].between(start_date, end_date)]
+    bankroll_df = bankroll_df.assign(Bankroll=starting_bankroll + bankroll_df['P&L'])
+    with metrics.span("chart.bankroll"):
+        st.vega_lite_chart(bankroll_spec(bankroll_df, bankroll_metric), theme=theme, use_container_width=True)
 
 st.divider()
 
 st.write("#### Bet Type Totals")
-status_counts = filter_df['Bet Type'].value_counts().reset_index()
-status_counts.columns = ['Bet Type', 'Count']
-
-# Build Altair pie chart
-pie = alt.Chart(status_counts).mark_arc(innerRadius=50).encode(
-    theta=alt.Theta(field="Count", type="quantitative"),
-    color=alt.Color(field="Bet Type", type="nominal"),
-    tooltip=["Bet Type", "Count"]
-).properties(
-    width="container",
-    title="Bets Placed By Type"
-)
-
-tab1, tab2 = st.tabs(["Streamlit theme", "Altair theme"])
-with tab1:
-    st.altair_chart(pie, theme="streamlit", use_container_width=True)
-with tab2:
-        st.altair_chart(pie, theme=None, use_container_width=True)
+with metrics.span("chart.Bet Type"):
+    st.vega_lite_chart(pie_spec(summary['facets']['Bet Type'], "Bet Type", "Bets Placed By Type"), theme=theme, use_container_width=True)
 
 st.divider()
 
 st.write("#### Bet Sport Totals")
-status_counts = filter_df['Bet Sport'].value_counts().reset_index()
-status_counts.columns = ['Bet Sport', 'Count']
-
-# Build Altair pie chart
-pie = alt.Chart(status_counts).mark_arc(innerRadius=50).encode(
-    theta=alt.Theta(field="Count", type="quantitative"),
-    color=alt.Color(field="Bet Sport", type="nominal"),
-    tooltip=["Bet Sport", "Count"]
-).properties(
-    width="container",
-    title="Bets Placed By Sport"
-)
-
-tab1, tab2 = st.tabs(["Streamlit theme", "Altair theme"])
-with tab1:
-    st.altair_chart(pie, theme="streamlit", use_container_width=True)
-with tab2:
-        st.altair_chart(pie, theme=None, use_container_width=True)
+with metrics.span("chart.Bet Sport"):
+    st.vega_lite_chart(pie_spec(summary['facets']['Bet Sport'], "Bet Sport", "Bets Placed By Sport"), theme=theme, use_container_width=True)
 
 st.divider()
 
 st.write("#### Bet Sportsbook Totals")
-status_counts = filter_df['Sportsbook Name'].value_counts().reset_index()
-status_counts.columns = ['Sportsbook Name', 'Count']
-
-# Build Altair pie chart
-pie = alt.Chart(status_counts).mark_arc(innerRadius=50).encode(
-    theta=alt.Theta(field="Count", type="quantitative"),
-    color=alt.Color(field="Sportsbook Name", type="nominal"),
-    tooltip=["Sportsbook Name", "Count"]
-).properties(
-    width="container",
-    title="Bets Placed By Sportsbooks"
-)
-
-tab1, tab2 = st.tabs(["Streamlit theme", "Altair theme"])
-with tab1:
-    st.altair_chart(pie, theme="streamlit", use_container_width=True)
-with tab2:
-        st.altair_chart(pie, theme=None, use_container_width=True)
+with metrics.span("chart.Sportsbook Name"):
+    st.vega_lite_chart(pie_spec(summary['facets']['Sportsbook Name'], "Sportsbook Name", "Bets Placed By Sportsbooks"), theme=theme, use_container_width=True)
 
 st.divider()
 
 st.write("#### Certified Degenerate Bet Totals")
-status_counts = filter_df['Certified Degenerate Bet'].value_counts().reset_index()
-status_counts.columns = ['Certified Degenerate Bet', 'Count']
-
-# Build Altair pie chart
-pie = alt.Chart(status_counts).mark_arc(innerRadius=50).encode(
-    theta=alt.Theta(field="Count", type="quantitative"),
-    color=alt.Color(field="Certified Degenerate Bet", type="nominal"),
-    tooltip=["Certified Degenerate Bet", "Count"]
-).properties(
-    width="container",
-    title="Certified Degenerate Bet Totals"
-)
+with metrics.span("chart.Certified Degenerate Bet"):
+    st.vega_lite_chart(pie_spec(summary['facets']['Certified Degenerate Bet'], "Certified Degenerate Bet", "Certified Degenerate Bet Totals"), theme=theme, use_container_width=True)
 
-tab1, tab2 = st.tabs(["Streamlit theme", "Altair theme"])
-with tab1:
-    st.altair_chart(pie, theme="streamlit", use_container_width=True)
-with tab2:
-        st.altair_chart(pie, theme=None, use_container_width=True)
+st.divider()
+
+# ###########################################################################
+# Profitability: hit rate vs the breakeven rate implied by the odds, and ROI
+# ###########################################################################
+st.header("Profitability")
+st.info(
+    "Hit rate counts wins and losses only. Breakeven is the win rate the odds taken require; Edge is the difference. Net is payout minus stake, and ROI is net over staked, for settled bets.",
+    icon="📈",
+)
+with metrics.span("profitability"), metrics.cache_probe("profitability"):
+    analytics = profitability(filter_df, data_version(df), selection_key(st.session_state['bet_logger']))
+overall = analytics['overall']
+
+hit_rate_col, breakeven_col, roi_col, net_col = st.columns(4)
+hit_rate_col.metric("Hit Rate", f"{overall['Hit Rate']:.1%}")
+breakeven_col.metric("Breakeven Rate", f"{overall['Breakeven Rate']:.1%}", delta=f"{overall['Edge']:+.1%} edge")
+roi_col.metric("ROI", f"{overall['ROI']:.1%}")
+net_col.metric("Net", f"${overall['Net']:,.2f}", delta=f"${overall['Staked']:,.2f} staked", delta_color="off")
+
+grouping = st.selectbox("Group by:", GROUPINGS)
+st.dataframe(
+    analytics['groups'][grouping],
+    column_config={
+        "Hit Rate": st.column_config.NumberColumn(format="percent"),
+        "Breakeven Rate": st.column_config.NumberColumn(format="percent"),
+        "Edge": st.column_config.NumberColumn(format="percent"),
+        "ROI": st.column_config.NumberColumn(format="percent"),
+        "Staked": st.column_config.NumberColumn(format="dollar"),
+        "Net": st.column_config.NumberColumn(format="dollar"),
+        "Avg Decimal Odds": st.column_config.NumberColumn(format="%.2f"),
+    },
+)
 
-st.divider()
\ No newline at end of file
+metrics.finish_rerun()
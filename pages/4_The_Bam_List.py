@@ -1,8 +1,5 @@
-import altair as alt
 import pandas as pd
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
-from streamlit_dynamic_filters import DynamicFilters
 from utils import filter_dataframe
 
 # ###########################################################################
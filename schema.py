@@ -0,0 +1,128 @@
+"""
+Single definition of the bet sheet's columns, their vocabularies and their in-memory dtypes.
+"""
+import hashlib
+import pandas as pd
+
+# ###########################################################################
+# selectbox Lists
+# ###########################################################################
+sportsbook_selectbox = ["Prizepicks", "Underdog", "Fliff", "Sleeper", "Chalkboard", "Boom Fantasy", "Potawatomi", "ParlayPlay", "FanDuel", "ProphetX", "Thrillz", "Rebet", "Novig"]
+gambler_selectbox = ["Alex Hennes", "Ty Mallo", "Bryan Driebel", "Dustin Wendegatz"]
+status_selectbox = ["Placed", "Win", "Loss", "Push", "Reboot"]
+risk_type_selectbox = ["Cash", "Promotion"]
+bet_type_selectbox = ["Straight", "Parlay", "Future"]
+bet_category_selectbox = ["Prop", "Moneyline", "Spread", "Totals", "Mixed"]
+bet_sport_selectbox = ["Baseball", "Football", "Basketball", "Hockey", "Tennis", "Soccer", "Golf", "Other"]
+yes_no = ["No", "Yes"]
+
+# ###########################################################################
+# Columns, in sheet order
+# ###########################################################################
+COLUMNS = [
+    "Gambler Name",
+    "Sportsbook Name",
+    "Bet Status",
+    "Bet Risk Type",
+    "Bet Type",
+    "Bet Category",
+    "Bet Sport",
+    "Bet Date",
+    "Bet Amount",
+    "Bet Promotion Amount",
+    "Bet Payout Amount",
+    "Bet Net Win Amount",
+    "Bet Odds",
+    "Bet Team/Player(s)",
+    "Bet Statistic(s)",
+    "Bet Game(s)",
+    "Certified Degenerate Bet",
+    "Bet Notes",
+]
+
+# Enumerated columns are stored as `category` with the selectbox list as the leading categories
+ENUMS = {
+    "Gambler Name": gambler_selectbox,
+    "Sportsbook Name": sportsbook_selectbox,
+    "Bet Status": status_selectbox,
+    "Bet Risk Type": risk_type_selectbox,
+    "Bet Type": bet_type_selectbox,
+    "Bet Category": bet_category_selectbox,
+    "Bet Sport": bet_sport_selectbox,
+    "Certified Degenerate Bet": yes_no,
+}
+DATE_COLUMN = "Bet Date"
+ODDS_COLUMN = "Bet Odds"
+MONEY_COLUMNS = ["Bet Amount", "Bet Promotion Amount", "Bet Payout Amount", "Bet Net Win Amount"]
+# Parlay legs, one per line
+LEG_COLUMNS = ["Bet Team/Player(s)", "Bet Statistic(s)", "Bet Game(s)"]
+TEXT_COLUMNS = LEG_COLUMNS + ["Bet Notes"]
+
+
+def _categorical(values: pd.Series, vocabulary: list) -> pd.Categorical:
+    # Values outside the vocabulary (a retired sportsbook, a typo made in the sheet) are kept as extra categories
+    extra = sorted(set(values.dropna().unique()) - set(vocabulary))
+    return pd.Categorical(values, categories=vocabulary + extra)
+
+
+def parse_odds(values: pd.Series) -> pd.Series:
+    """
+    Parses American odds such as "+150", "-110" or 150 into numbers. Anything else becomes NaN.
+
+    Args:
+        values (pd.Series): Odds as read from the sheet
+
+    Returns:
+        pd.Series: float32 odds
+    """
+    text = values.astype("string").str.strip().str.replace(r"^\+", "", regex=True)
+    return pd.to_numeric(text, errors="coerce").astype("float32")
+
+
+def normalize_bets(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Coerces a raw sheet read into the shared schema: `category` for enumerated columns, `datetime64` bet dates,
+    numeric odds and float32 money columns. Runs once per read inside the shared loader, so pages never re-coerce.
+
+    Args:
+        df (pd.DataFrame): Bet data as parsed from the sheet
+
+    Returns:
+        pd.DataFrame: Normalized bet data
+    """
+    df = df.copy()
+    for column, vocabulary in ENUMS.items():
+        if column in df.columns:
+            values = df[column]
+            if column == "Certified Degenerate Bet":
+                values = values.astype("string").str.title()
+            df[column] = _categorical(values, vocabulary)
+    if DATE_COLUMN in df.columns:
+        df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN], errors="coerce").dt.normalize()
+    if ODDS_COLUMN in df.columns:
+        df[ODDS_COLUMN] = parse_odds(df[ODDS_COLUMN])
+    for column in MONEY_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float32")
+    for column in TEXT_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype("string")
+    return df
+
+
+def data_version(df: pd.DataFrame) -> str:
+    """
+    Content hash identifying a version of the bet data. Derived caches key on it so they are rebuilt only when
+    the data changes.
+
+    Args:
+        df (pd.DataFrame): Bet data
+
+    Returns:
+        str: Hex digest of the frame's contents
+    """
+    version = df.attrs.get("data_version")
+    if version is None:
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        version = hashlib.sha1(hashes.tobytes() + "|".join(map(str, df.columns)).encode()).hexdigest()[:16]
+    return version
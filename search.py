@@ -0,0 +1,301 @@
+"""
+Token indexes over the free-text bet fields.
+
+`search_text` answers the search box from a token/prefix index over every text column, one per date scope (see
+`archive.scope_key`) shared by every session loading that scope. It is updated in place as the data changes: only rows
+that are new or whose text changed are re-tokenized.
+
+Parlay legs are stored one per line in the leg columns. `leg_index` explodes them into one row per leg, linked to the
+parent bet by its row position in `load_bets()` (which is also its index label), and builds an inverted index from
+normalized tokens to legs, so "every bet involving Obi Toppin" is a couple of set intersections instead of a regex
+scan over every row.
+"""
+from bisect import bisect_left
+from collections import Counter
+import hashlib
+import math
+import re
+import threading
+import unicodedata
+import numpy as np
+import pandas as pd
+import streamlit as st
+from schema import ENUMS, LEG_COLUMNS, TEXT_COLUMNS, data_version
+
+_TOKEN = re.compile(r"[0-9]+(?:\.[0-9]+)?|[^\W\d_]+")
+
+
+def tokenize(text) -> list:
+    """
+    Splits text into lowercase, accent-free word and number tokens, e.g. "Over 4.5 R+A" -> ["over", "4.5", "r", "a"].
+
+    Args:
+        text: Any cell value
+
+    Returns:
+        list: Tokens in order of appearance
+    """
+    if not isinstance(text, str):
+        return []
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return _TOKEN.findall("".join(char for char in text if not unicodedata.combining(char)))
+
+
+def build_legs(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Explodes the newline-separated leg columns into one row per leg. Legs are lined up by line number; a column with
+    fewer lines than the others leaves the missing legs empty.
+
+    Args:
+        df (pd.DataFrame): Bet data
+
+    Returns:
+        pd.DataFrame: ["Bet ID", "Leg", *LEG_COLUMNS] where "Bet ID" is the bet's index label
+    """
+    legs = None
+    for column in LEG_COLUMNS:
+        lines = df[column].astype("string").str.strip().str.split("\n").explode()
+        lines = lines.rename_axis("Bet ID").reset_index()
+        lines["Leg"] = lines.groupby("Bet ID").cumcount() + 1
+        lines[column] = lines[column].str.strip().replace("", pd.NA)
+        legs = lines if legs is None else legs.merge(lines, on=["Bet ID", "Leg"], how="outer")
+    legs = legs.dropna(subset=LEG_COLUMNS, how="all").sort_values(["Bet ID", "Leg"], kind="stable")
+    return legs.reset_index(drop=True)[["Bet ID", "Leg"] + LEG_COLUMNS]
+
+
+class LegIndex:
+    """
+    Inverted index from normalized tokens to legs, per leg column.
+    """
+
+    def __init__(self, legs: pd.DataFrame):
+        self.legs = legs
+        self.bet_ids = legs["Bet ID"].to_numpy()
+        self.postings = {}
+        for column in LEG_COLUMNS:
+            tokens = legs[column].map(tokenize).explode().dropna()
+            pairs = pd.DataFrame({"token": tokens.to_numpy(), "leg": tokens.index.to_numpy()}).drop_duplicates()
+            self.postings[column] = {
+                token: np.sort(group.to_numpy()) for token, group in pairs.groupby("token")["leg"]
+            }
+
+    def legs_matching(self, column: str, query: str) -> np.ndarray:
+        """
+        Legs whose `column` contains every token of the query.
+
+        Args:
+            column (str): One of `LEG_COLUMNS`
+            query (str): Free text, e.g. "obi toppin"
+
+        Returns:
+            np.ndarray: Row positions in `self.legs`
+        """
+        matches = None
+        for token in tokenize(query):
+            posting = self.postings[column].get(token, np.empty(0, dtype=np.int64))
+            matches = posting if matches is None else np.intersect1d(matches, posting, assume_unique=True)
+        return np.arange(len(self.legs)) if matches is None else matches
+
+    def search(self, queries: dict) -> np.ndarray:
+        """
+        Bets with at least one leg matching every given column query, e.g. a player and a stat on the same leg.
+
+        Args:
+            queries (dict): {leg column: query}; empty queries are ignored
+
+        Returns:
+            np.ndarray: Sorted bet IDs
+        """
+        legs = None
+        for column, query in queries.items():
+            if query and tokenize(query):
+                matches = self.legs_matching(column, query)
+                legs = matches if legs is None else np.intersect1d(legs, matches, assume_unique=True)
+        return np.unique(self.bet_ids[legs]) if legs is not None else np.unique(self.bet_ids)
+
+
+@st.cache_resource(show_spinner="Indexing parlay legs...", max_entries=4)
+def leg_index(_df: pd.DataFrame, version: str) -> LegIndex:
+    """
+    Leg table and inverted index, built once per data version and shared across sessions.
+
+    Args:
+        _df (pd.DataFrame): Bet data from `load_bets` (not hashed)
+        version (str): `schema.data_version` of the frame
+
+    Returns:
+        LegIndex: Index over the exploded legs
+    """
+    return LegIndex(build_legs(_df))
+
+
+# ###########################################################################
+# Full-text search
+# ###########################################################################
+SEARCH_COLUMNS = TEXT_COLUMNS + list(ENUMS)
+# A one-letter prefix expands to a large share of the vocabulary on every keystroke, so a shorter last word waits for
+# the next letter: it is left out after other words and matched whole on its own
+MIN_PREFIX_LENGTH = 2
+
+
+class TextIndex:
+    """
+    Token and prefix index over `SEARCH_COLUMNS`, maintained incrementally. Postings hold term frequencies per bet so
+    results can be ranked; a sorted vocabulary answers prefix queries for the word still being typed.
+    """
+
+    def __init__(self):
+        # Reentrant: `search_text` holds it across an update and the search
+        self.lock = threading.RLock()
+        self.version = None
+        self.row_hashes = np.empty(0, dtype=np.uint64)
+        self.row_tokens = {}
+        self.postings = {}
+        self.vocabulary = []
+
+    def _remove(self, bet_id: int) -> None:
+        for token in self.row_tokens.pop(bet_id, ()):
+            posting = self.postings[token]
+            del posting[bet_id]
+            if not posting:
+                del self.postings[token]
+
+    def _add(self, bet_id: int, texts) -> None:
+        counts = Counter(token for text in texts for token in tokenize(text))
+        self.row_tokens[bet_id] = counts
+        for token, count in counts.items():
+            self.postings.setdefault(token, {})[bet_id] = count
+
+    def update(self, df: pd.DataFrame, version: str) -> int:
+        """
+        Brings the index in line with `df`, re-tokenizing only rows that were appended or whose text changed.
+
+        Args:
+            df (pd.DataFrame): Bet data from `load_bets`
+            version (str): `schema.data_version` of the frame
+
+        Returns:
+            int: Number of rows (re-)indexed
+        """
+        with self.lock:
+            if version == self.version:
+                return 0
+            columns = [column for column in SEARCH_COLUMNS if column in df.columns]
+            hashes = pd.util.hash_pandas_object(df[columns].astype("string"), index=False).to_numpy()
+            common = min(len(hashes), len(self.row_hashes))
+            changed = np.flatnonzero(hashes[:common] != self.row_hashes[:common])
+            for bet_id in range(len(hashes), len(self.row_hashes)):
+                self._remove(bet_id)
+            values = df[columns].astype("string").to_numpy(dtype=object, na_value=None)
+            for bet_id in np.concatenate((changed, np.arange(common, len(hashes)))):
+                self._remove(int(bet_id))
+                self._add(int(bet_id), values[bet_id])
+            self.row_hashes = hashes
+            self.vocabulary = sorted(self.postings)
+            self.version = version
+            return len(changed) + len(hashes) - common
+
+    def _expand(self, prefix: str) -> list:
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + "\uffff")
+        return self.vocabulary[start:end]
+
+    def search(self, query: str, limit: int = None) -> np.ndarray:
+        """
+        Bets containing every query word, the last one as a prefix (once it is `MIN_PREFIX_LENGTH` characters long) so
+        results update while typing. Ranked by summed tf-idf so rare words (a player, a promo tag) outweigh common ones.
+
+        Args:
+            query (str): Free text, e.g. "flex friday topp"
+            limit (int): Keep only the best `limit` bets
+
+        Returns:
+            np.ndarray: Bet IDs, best match first
+        """
+        tokens = tokenize(query)
+        if len(tokens) > 1 and len(tokens[-1]) < MIN_PREFIX_LENGTH:
+            tokens = tokens[:-1]
+        if not tokens:
+            return np.empty(0, dtype=np.int64)
+        with self.lock:
+            total = max(len(self.row_tokens), 1)
+            scores = None
+            for position, token in enumerate(tokens):
+                prefix = position == len(tokens) - 1 and len(token) >= MIN_PREFIX_LENGTH
+                expanded = self._expand(token) if prefix else [token]
+                token_scores = Counter()
+                for term in expanded:
+                    posting = self.postings.get(term, {})
+                    idf = math.log(1 + total / (1 + len(posting)))
+                    for bet_id, count in posting.items():
+                        token_scores[bet_id] = max(token_scores[bet_id], idf * count / (count + 1))
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = Counter({bet_id: score + token_scores[bet_id] for bet_id, score in scores.items() if bet_id in token_scores})
+        # Best score first, most recent bet first among ties
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:limit]
+        return np.array([bet_id for bet_id, _ in ranked], dtype=np.int64)
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _text_index(scope: str) -> TextIndex:
+    return TextIndex()
+
+
+def text_index(df: pd.DataFrame, scope: str = "") -> TextIndex:
+    """
+    The search index for a date scope, updated for `df` first. Only rows appended or edited since the last update are
+    re-tokenized, so new slips are searchable without rebuilding the index.
+
+    Args:
+        df (pd.DataFrame): Bet data from `archive.load_scope`
+        scope (str): `archive.scope_key` of the scope `df` was loaded for
+
+    Returns:
+        TextIndex: Up-to-date index
+    """
+    index = _text_index(scope)
+    index.update(df, data_version(df))
+    return index
+
+
+def search_text(df: pd.DataFrame, query: str, scope: str = "", limit: int = None) -> np.ndarray:
+    """
+    Ranked full-text search over `df`. The scope's index is updated for `df` and searched under one lock, so another
+    session cannot re-index it for a different frame in between and hand back Bet IDs of that frame.
+
+    Args:
+        df (pd.DataFrame): Bet data from `archive.load_scope`
+        query (str): Free text, see `TextIndex.search`
+        scope (str): `archive.scope_key` of the scope `df` was loaded for
+        limit (int): Keep only the best `limit` bets
+
+    Returns:
+        np.ndarray: Bet IDs (positions in `df`), best match first
+    """
+    index = _text_index(scope)
+    with index.lock:
+        index.update(df, data_version(df))
+        return index.search(query, limit)
+
+
+def restrict(df: pd.DataFrame, bet_ids: np.ndarray, reason: str, ranked: bool = False) -> pd.DataFrame:
+    """
+    Keeps the rows of `df` whose index label is in `bet_ids`, giving the result its own data version.
+
+    Args:
+        df (pd.DataFrame): Bet data, possibly already filtered
+        bet_ids (np.ndarray): Bet IDs to keep
+        reason (str): What produced the IDs (e.g. the query), folded into the data version
+        ranked (bool): Order rows as in `bet_ids` instead of sheet order
+
+    Returns:
+        pd.DataFrame: Matching rows
+    """
+    if ranked:
+        restricted = df.loc[bet_ids[np.isin(bet_ids, df.index)]]
+    else:
+        restricted = df[df.index.isin(bet_ids)]
+    restricted.attrs["data_version"] = f"{data_version(df)}-{hashlib.sha1(reason.encode()).hexdigest()[:12]}"
+    return restricted
@@ -0,0 +1,59 @@
+"""
+Starts the app and warms the shared caches while the server boots, so the first visitor after a deploy or container
+restart does not pay for the gspread login and the first sheet read:
+
+    python serve.py [streamlit run options, e.g. --server.port 8501]
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from streamlit.runtime import Runtime
+from streamlit.web import cli
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Home.py")
+# How long to wait for Streamlit to create its runtime (and cache storage) before giving up on prewarming
+RUNTIME_WAIT_SECONDS = 60
+
+logger = logging.getLogger("serve")
+
+
+def prewarm() -> None:
+    """
+    Authorizes the gspread client, loads the bet history into the shared cache and builds the process-wide search
+    index. Runs in a background thread once the runtime exists, so the cached values land in the same cache storage
+    the sessions use.
+    """
+    deadline = time.monotonic() + RUNTIME_WAIT_SECONDS
+    while not Runtime.exists():
+        if time.monotonic() > deadline:
+            logger.warning("Streamlit runtime did not start; skipping cache prewarm")
+            return
+        time.sleep(0.05)
+
+    start = time.perf_counter()
+    try:
+        import archive
+        import backend
+        import search
+        import utils
+
+        if backend.BACKEND == backend.GSHEETS and not os.environ.get(utils.LOCAL_SOURCE_ENV):
+            utils.get_gspread_client()
+        # What the pages load by default: the hot partition, for the Bet Logger and, up to today, for the lookup page
+        df = utils.load_bets(**archive.hot_only())
+        scope = archive.default_scope()
+        search.text_index(archive.load_scope(**scope), archive.scope_key(scope))
+    except Exception:
+        # The first session loads the data itself instead
+        logger.exception("Cache prewarm failed")
+        return
+    logger.info("Prewarmed %d bets in %.2fs", len(df), time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    threading.Thread(target=prewarm, daemon=True, name="cache-prewarm").start()
+    sys.argv = ["streamlit", "run", APP, *sys.argv[1:]]
+    sys.exit(cli.main())
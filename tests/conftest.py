@@ -0,0 +1,14 @@
+"""
+Points the app at a throwaway local SQLite spreadsheet and mirror directory (see `backend.py`) before any test imports
+it, so no test needs Google credentials.
+"""
+import os
+import tempfile
+
+_DIR = tempfile.mkdtemp(prefix="bets-tests-")
+os.environ.update(
+    BETS_BACKEND="local",
+    BETS_LOCAL_SPREADSHEET="tests",
+    BETS_LOCAL_SHEETS=os.path.join(_DIR, "sheets.sqlite"),
+    BETS_MIRROR_DIR=os.path.join(_DIR, "mirror"),
+)
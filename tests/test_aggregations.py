@@ -0,0 +1,25 @@
+"""
+Checks that sessions charting different date scopes do not share a bankroll ledger.
+"""
+import pandas as pd
+from aggregations import _bankroll_ledger, bankroll_series
+
+
+def _bets(amounts: list) -> pd.DataFrame:
+    return pd.DataFrame({
+        "Gambler Name": pd.Series(["Sam"] * len(amounts), dtype="string"),
+        "Bet Date": pd.date_range("2026-01-01", periods=len(amounts)),
+        "Bet Status": pd.Series(["Loss"] * len(amounts), dtype="string"),
+        "Bet Amount": pd.Series(amounts, dtype="float64"),
+        "Bet Payout Amount": pd.Series([0.0] * len(amounts)),
+    })
+
+
+def test_scopes_keep_their_own_ledger():
+    hot, wide = _bets([10.0, 20.0]), _bets([5.0, 5.0, 5.0])
+    assert bankroll_series(hot, "hot")["P&L"].tolist() == [-10.0, -30.0]
+    processed = _bankroll_ledger("hot").version
+    assert bankroll_series(wide, "wide")["P&L"].tolist() == [-5.0, -10.0, -15.0]
+    # Charting the other scope did not reset this scope's ledger
+    assert _bankroll_ledger("hot").version == processed
+    assert bankroll_series(hot, "hot")["P&L"].tolist() == [-10.0, -30.0]
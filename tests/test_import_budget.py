@@ -0,0 +1,14 @@
+"""
+Fails when a module goes over its import-time budget or imports a deferred dependency at module level, see
+`bench/import_budget.py`.
+"""
+import pytest
+from bench.import_budget import BUDGET_MS, measure, violations
+
+# Best of a few cold imports, so a busy machine does not fail the budget on one slow run
+RUNS = 3
+
+
+@pytest.mark.parametrize("module", list(BUDGET_MS))
+def test_import_budget(module):
+    assert violations(module, measure(module, RUNS)) == []
@@ -0,0 +1,64 @@
+"""
+Checks point-in-time restores from the journal, against the local SQLite backend.
+"""
+import time
+import pandas as pd
+import pytest
+import backend
+import journal
+from utils import MASTER_TAB, get_spreadsheet, get_worksheet, spreadsheet_id
+
+
+@pytest.fixture
+def master():
+    spreadsheet = get_spreadsheet(spreadsheet_id())
+    for worksheet in spreadsheet.worksheets():
+        if worksheet.title == journal.JOURNAL_TAB or worksheet.title.startswith(journal.SNAPSHOT_PREFIX):
+            spreadsheet.del_worksheet(worksheet)
+    # Cached handles would keep writing to the deleted tabs
+    get_worksheet.clear()
+    columns = backend.COLUMNS
+    backend.seed(pd.DataFrame([[f"Bet {row}"] + [""] * (len(columns) - 1) for row in range(3)], columns=columns), key=spreadsheet_id())
+    return get_worksheet(spreadsheet_id(), MASTER_TAB)
+
+
+def _log(worksheet, name: str) -> None:
+    # What the write queue does for a slip
+    row = [name] + [""] * (len(backend.COLUMNS) - 1)
+    first_row = journal.appended_row(worksheet.append_rows([row]))
+    journal.record(spreadsheet_id(), journal.append_entries("Sam", backend.COLUMNS, [row], first_row))
+
+
+def test_restore_before_the_retained_snapshots(master):
+    key = spreadsheet_id()
+    journal.maybe_snapshot(key, force=True)
+    _log(master, "Early slip")
+    as_of = journal._now()
+    for name in ("Slip 2", "Slip 3", "Slip 4"):
+        journal.maybe_snapshot(key, force=True)
+        _log(master, name)
+    titles = [title for _, title in journal._snapshot_tabs(key)]
+    # The first snapshot plus the newest SNAPSHOT_RETENTION
+    assert len(titles) == journal.SNAPSHOT_RETENTION + 1
+    names = [row[0] for row in journal.restore(key, as_of)[1:]]
+    assert names == ["Bet 0", "Bet 1", "Bet 2", "Early slip"]
+
+
+def test_restore_is_written_and_journaled(master):
+    key = spreadsheet_id()
+    journal.maybe_snapshot(key, force=True)
+    _log(master, "Early slip")
+    as_of = journal._now()
+    time.sleep(1)
+    _log(master, "Late slip")
+    with pytest.raises(ValueError):
+        journal.write_restore(key, journal._now())
+    journal.record(key, journal.write_restore(key, as_of))
+    assert [row[0] for row in master.get_all_values()[1:]] == ["Bet 0", "Bet 1", "Bet 2", "Early slip"]
+    _log(master, "After restore")
+    expected = ["Bet 0", "Bet 1", "Bet 2", "Early slip", "After restore"]
+    assert [row[0] for row in journal.restore(key, journal._now())[1:]] == expected
+    # Without the snapshot taken after the restore, the replay goes across the journaled restore
+    spreadsheet = get_spreadsheet(key)
+    spreadsheet.del_worksheet(spreadsheet.worksheet(journal._snapshot_tabs(key)[-1][1]))
+    assert [row[0] for row in journal.restore(key, journal._now())[1:]] == expected
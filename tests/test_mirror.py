@@ -0,0 +1,42 @@
+"""
+Checks that the Master mirror notices edits made outside the app, against the local SQLite backend.
+"""
+import pandas as pd
+import backend
+import journal
+import mirror
+from utils import MASTER_TAB, get_worksheet, spreadsheet_id
+
+
+def _seed(rows: int):
+    source = pd.DataFrame([[f"Bet {row}"] + [""] * (len(backend.COLUMNS) - 1) for row in range(rows)], columns=backend.COLUMNS)
+    backend.seed(source, key=spreadsheet_id())
+    return get_worksheet(spreadsheet_id(), MASTER_TAB)
+
+
+def _append_as_app(worksheet, rows: list) -> None:
+    # What the write queue does for a slip
+    with mirror.own_writes():
+        first_row = journal.appended_row(worksheet.append_rows(rows))
+        mirror.mark_changed(rows=list(range(first_row, first_row + len(rows))))
+
+
+def test_app_append_syncs_incrementally(monkeypatch):
+    worksheet = _seed(5)
+    mirror.sync()
+    _append_as_app(worksheet, [["Slip"] + [""] * (len(backend.COLUMNS) - 1)])
+    modes = []
+    monkeypatch.setattr(mirror.metrics, "count", lambda name, value=1, **labels: modes.append(labels.get("mode")))
+    df = mirror.sync()
+    assert "incremental" in modes and "full" not in modes
+    assert df.iloc[:, 0].tolist() == [f"Bet {row}" for row in range(5)] + ["Slip"]
+
+
+def test_delete_outside_then_append():
+    worksheet = _seed(5)
+    mirror.sync()
+    # Deleted directly in Sheets, so the app never flags it
+    worksheet.delete_rows(3)
+    _append_as_app(worksheet, [["Slip"] + [""] * (len(backend.COLUMNS) - 1)])
+    df = mirror.sync()
+    assert df.iloc[:, 0].tolist() == ["Bet 0", "Bet 2", "Bet 3", "Bet 4", "Slip"]
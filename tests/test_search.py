@@ -0,0 +1,23 @@
+"""
+Checks that sessions searching different date scopes do not share an index.
+"""
+import pandas as pd
+from schema import COLUMNS
+from search import _text_index, search_text
+
+
+def _bets(notes: list) -> pd.DataFrame:
+    df = pd.DataFrame({column: pd.Series([None] * len(notes), dtype="string") for column in COLUMNS})
+    df["Bet Notes"] = pd.Series(notes, dtype="string")
+    return df
+
+
+def test_scopes_keep_their_own_index():
+    hot = _bets(["toppin over", "brunson under"])
+    wide = _bets(["archived bet", "another one", "toppin points"])
+    assert search_text(hot, "toppin", "hot").tolist() == [0]
+    indexed = _text_index("hot").version
+    assert search_text(wide, "toppin", "wide").tolist() == [2]
+    # Searching the other scope neither re-indexed this one nor changes its Bet IDs
+    assert _text_index("hot").version == indexed
+    assert search_text(hot, "toppin", "hot").tolist() == [0]
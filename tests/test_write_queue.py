@@ -0,0 +1,78 @@
+"""
+Checks that retried appends never write their rows twice, against the local SQLite backend.
+"""
+import pandas as pd
+import pytest
+import requests
+import backend
+import journal
+import write_queue
+from utils import MASTER_TAB, append_rows_once, get_worksheet, spreadsheet_id
+
+
+def _server_error() -> Exception:
+    error = backend.quota_exceeded("write", 1)
+    error.response.status_code = 503
+    return error
+
+
+class _Flaky:
+    """
+    Worksheet whose next `append_rows` fails with `error`, after writing the rows when `landed`.
+    """
+
+    def __init__(self, worksheet, error: Exception, landed: bool):
+        self.worksheet, self.error, self.landed = worksheet, error, landed
+        self.reads = 0
+
+    def __getattr__(self, name):
+        return getattr(self.worksheet, name)
+
+    def batch_get(self, *args, **kwargs):
+        self.reads += 1
+        return self.worksheet.batch_get(*args, **kwargs)
+
+    def append_rows(self, *args, **kwargs):
+        if self.error is None:
+            return self.worksheet.append_rows(*args, **kwargs)
+        error, self.error = self.error, None
+        if self.landed:
+            self.worksheet.append_rows(*args, **kwargs)
+        raise error
+
+
+@pytest.fixture
+def master(monkeypatch):
+    monkeypatch.setattr(write_queue, "BACKOFF_BASE_SECONDS", 0)
+    columns = backend.COLUMNS
+    backend.seed(pd.DataFrame([[f"Bet {row}"] + [""] * (len(columns) - 1) for row in range(3)], columns=columns), key=spreadsheet_id())
+    return get_worksheet(spreadsheet_id(), MASTER_TAB)
+
+
+@pytest.mark.parametrize(
+    "error, landed, read_back",
+    [
+        (_server_error(), True, True),
+        (_server_error(), False, True),
+        (requests.exceptions.ConnectionError(), True, True),
+        (backend.quota_exceeded("write", 1), False, False),
+    ],
+)
+def test_retried_append_writes_once(master, error, landed, read_back):
+    columns = backend.COLUMNS
+    slip = ["Slip", "Book", "Won", "Straight", "Moneyline", "+150"] + [""] * (len(columns) - 6)
+    flaky = _Flaky(master, error, landed)
+    response = write_queue.with_backoff(append_rows_once, flaky, [slip], attempts=[], columns=columns)
+    names = [row[0] for row in master.get_all_values()[1:]]
+    assert names == ["Bet 0", "Bet 1", "Bet 2", "Slip"]
+    assert journal.appended_row(response) == 5
+    # A rate limit means nothing was written, so it is retried without reading the sheet back
+    assert bool(flaky.reads) == read_back
+
+
+def test_restarted_workers_jobs_are_not_alive():
+    host, pid, token = write_queue._worker_id().split(":")
+    assert write_queue._alive(write_queue._worker_id())
+    # Same hostname and pid after a container restart, but a different start time
+    assert not write_queue._alive(f"{host}:{pid}:{int(token) + 1 if token.isdigit() else 'restarted'}")
+    assert not write_queue._alive(f"{host}:{pid}")
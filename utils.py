@@ -1,17 +1,540 @@
 from pandas.api.types import (
-    is_categorical_dtype,
     is_datetime64_any_dtype,
     is_numeric_dtype,
     is_object_dtype,
+    is_string_dtype,
 )
+from datetime import datetime, timedelta, timezone
+import hashlib
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+import numpy as np
 import pandas as pd
 import streamlit as st
-from streamlit_gsheets import GSheetsConnection
-import gspread
+import metrics
+from schema import ODDS_COLUMN, data_version, normalize_bets
+
+# gspread, google-auth and the local backend are imported where they are used, so pages that only read bets from the
+# shared cache never pay for them
+if TYPE_CHECKING:
+    import gspread
+
+# ###########################################################################
+# Shared bet data loader
+# ###########################################################################
+# Seconds a loaded copy of the bet sheet is shared across sessions before the next read goes back to Google Sheets.
+BETS_CACHE_TTL = int(os.environ.get("BETS_CACHE_TTL", 600))
+# Path to a Parquet or CSV file of raw sheet values to read instead of Google Sheets, e.g. output of bench/generate.py
+LOCAL_SOURCE_ENV = "BETS_LOCAL_SOURCE"
+
+
+def read_local_source(path: str) -> pd.DataFrame:
+    """
+    Reads a local file of raw sheet values, as strings, in place of the Master tab.
+
+    Args:
+        path (str): Parquet (.parquet) or CSV file with the sheet's header row
+
+    Returns:
+        pd.DataFrame: String frame, as returned by `mirror.sync`
+    """
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path).astype("string")
+    return pd.read_csv(path, dtype="string", keep_default_na=False)
+
+
+@st.cache_data(ttl=BETS_CACHE_TTL, show_spinner="Loading bet history...")
+def _read_bets(archives: tuple = ()) -> pd.DataFrame:
+    """
+    Syncs the local mirrors of the given archive tabs and of the Master tab (see `mirror.py`) and parses them as one
+    frame, archives first. Wrapped in `st.cache_data`, which holds a per-key compute lock, so concurrent cache misses
+    from many sessions result in a single sync.
+
+    Args:
+        archives (tuple): Archive tab titles, oldest first (see `archive.partitions_for`)
+
+    Returns:
+        pd.DataFrame: Bet data normalized to the shared schema
+    """
+    # Imported here as mirror.py builds on the sheet handles defined below
+    import mirror
+
+    metrics.cache_miss()
+    local_source = os.environ.get(LOCAL_SOURCE_ENV)
+    with metrics.span("sheet_read"):
+        if local_source:
+            raw = read_local_source(local_source)
+        else:
+            raw = pd.concat([mirror.sync(tab_name=tab, immutable=True) for tab in archives] + [mirror.sync()], ignore_index=True)
+    with metrics.span("parse_values"):
+        parsed = mirror.parse_values(raw)
+    with metrics.span("normalize_bets"):
+        df = normalize_bets(parsed)
+        df.attrs["data_version"] = data_version(df)
+    return df
+
+
+def load_bets(start: pd.Timestamp = None, end: pd.Timestamp = None) -> pd.DataFrame:
+    """
+    Single entry point used by every page to get the bet history. The sheet is read at most once per
+    `BETS_CACHE_TTL` seconds across all sessions, or sooner after `invalidate_bets` is called.
+
+    Master is always read; archived periods (see `archive.py`) only when they overlap [start, end]. Rows come archives
+    first, so with no archive in range a bet's position is its Master row.
+
+    Args:
+        start (pd.Timestamp): First Bet Date needed, or None for the whole history
+        end (pd.Timestamp): Last Bet Date needed, or None for no upper bound
+
+    Returns:
+        pd.DataFrame: Bet data normalized to the shared schema, see `schema.normalize_bets`. `df.attrs["data_version"]`
+        identifies the read for derived caches.
+    """
+    with metrics.span("load_bets"), metrics.cache_probe("bets"):
+        archives = ()
+        if not os.environ.get(LOCAL_SOURCE_ENV):
+            import archive
+
+            archives = tuple(archive.partitions_for(spreadsheet_id(), start, end))
+        return _read_bets(archives)
+
+
+def invalidate_bets() -> None:
+    """
+    Drops the shared bet cache so the next `load_bets` call reads the sheet again. Call after any write to the Master tab.
+    """
+    _read_bets.clear()
+
+
+# ###########################################################################
+# Shared gspread client and worksheet handles
+# ###########################################################################
+MASTER_TAB = "Master"
+# Access tokens are refreshed this long before they expire so no rerun ever waits on a token exchange.
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)
+
+
+def spreadsheet_id() -> str:
+    """
+    Resolves the spreadsheet key from the gsheets connection secrets, which may hold either a full URL or a bare key.
+
+    Returns:
+        str: Google Sheets spreadsheet key
+    """
+    import backend
+
+    if backend.BACKEND == backend.LOCAL:
+        return backend.LOCAL_SPREADSHEET_ID
+    spreadsheet = st.secrets["connections"]["gsheets"]["spreadsheet"]
+    if spreadsheet.startswith("http"):
+        import gspread
+
+        return gspread.utils.extract_id_from_url(spreadsheet)
+    return spreadsheet
+
+
+def _credentials(gc: "gspread.Client"):
+    # gspread 6 moved the credentials onto the HTTP client
+    return getattr(gc, "http_client", gc).auth
+
+
+def _keep_token_fresh(gc: "gspread.Client") -> None:
+    """
+    Background loop that refreshes the client's access token shortly before it expires.
+
+    Args:
+        gc (gspread.Client): Authorized client to keep fresh
+    """
+    from google.auth.transport.requests import Request
+
+    credentials = _credentials(gc)
+    while True:
+        expiry = credentials.expiry
+        if expiry is None or expiry.replace(tzinfo=timezone.utc) - datetime.now(timezone.utc) <= TOKEN_REFRESH_MARGIN:
+            try:
+                credentials.refresh(Request())
+            except Exception:
+                # Leave it to the session's own refresh-on-401 and retry on the next tick
+                pass
+        time.sleep(60)
+
+
+@st.cache_resource(show_spinner=False)
+def get_gspread_client() -> "gspread.Client":
+    """
+    Process-wide authorized gspread client. The OAuth token exchange happens once per server process
+    and a daemon thread refreshes the token ahead of expiry.
+
+    Returns:
+        gspread.Client: Authorized client
+    """
+    import gspread
+
+    gc = gspread.service_account_from_dict(dict(st.secrets["gsheets"]))
+    # gc = gspread.service_account(filename="secrets/google-credentials.json")
+    # gspread 6 moved the session onto the HTTP client
+    metrics.instrument_session(getattr(gc, "http_client", gc).session)
+    threading.Thread(target=_keep_token_fresh, args=(gc,), daemon=True, name="gspread-token-refresh").start()
+    return gc
+
+
+@st.cache_resource(show_spinner=False)
+def get_spreadsheet(key: str) -> "gspread.Spreadsheet":
+    """
+    Process-wide spreadsheet handle, opened by key rather than a Drive search by title. With `BETS_BACKEND=local`
+    this is the offline stand-in from `backend.py`.
+
+    Args:
+        key (str): Spreadsheet key, see `spreadsheet_id`
+
+    Returns:
+        gspread.Spreadsheet: Opened spreadsheet, or a `backend.LocalSpreadsheet`
+    """
+    import backend
+
+    if backend.BACKEND == backend.LOCAL:
+        return backend.LocalSpreadsheet(key)
+    return get_gspread_client().open_by_key(key)
+
+
+@st.cache_resource(show_spinner=False)
+def get_worksheet(key: str, tab_name: str) -> "gspread.Worksheet":
+    """
+    Process-wide worksheet handle, keyed by spreadsheet key and tab name.
+
+    Args:
+        key (str): Spreadsheet key, see `spreadsheet_id`
+        tab_name (str): Worksheet title, e.g. `MASTER_TAB`
+
+    Returns:
+        gspread.Worksheet: Opened worksheet
+    """
+    return get_spreadsheet(key).worksheet(tab_name)
+
+
+# ###########################################################################
+# Diff-based write-back of data editor changes
+# ###########################################################################
+# Sheet row holding the first bet; row 1 is the header.
+FIRST_DATA_ROW = 2
+
+
+def to_cell(value, column: str = None):
+    """
+    Converts a dataframe value into what the update path has always written to the sheet:
+    dates as ISO strings, odds as signed American odds such as "+150", missing values as "N/A" and numpy scalars as
+    plain Python values.
+
+    Args:
+        value: Any dataframe or data editor value
+        column (str): Column the value belongs to, if known
+
+    Returns:
+        A JSON-serializable cell value
+    """
+    if value is None or (not isinstance(value, (list, dict, str)) and pd.isna(value)):
+        return "N/A"
+    if column == ODDS_COLUMN and isinstance(value, (int, float, np.number)):
+        # Odds are float32 in memory but typed with their sign in the sheet
+        return f"{round(float(value)):+d}"
+    if hasattr(value, "isoformat"):
+        return value.isoformat()[:10]
+    if isinstance(value, np.floating):
+        # Shortest repr of the float32 money columns, so 10.1 is written as 10.1 and not 10.100000381469727
+        return float(str(value))
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+def delta_to_ranges(columns: list, edited_rows: dict) -> list:
+    """
+    Turns the `edited_rows` part of an `st.data_editor` delta into the fewest A1 ranges that cover the changed cells.
+    Adjacent changed cells within a row are merged into a single range.
+
+    Args:
+        columns (list): Column names in sheet order
+        edited_rows (dict): {row position: {column name: new value}}
+
+    Returns:
+        list: `batch_update` payload of {"range": ..., "values": [[...]]}
+    """
+    ranges = []
+    for position, changes in sorted((int(k), v) for k, v in edited_rows.items()):
+        row = position + FIRST_DATA_ROW
+        cells = sorted((columns.index(name) + 1, to_cell(value, name)) for name, value in changes.items() if name in columns)
+        run = []
+        for col, value in cells:
+            if run and col != run[-1][0] + 1:
+                ranges.append(_run_to_range(row, run))
+                run = []
+            run.append((col, value))
+        if run:
+            ranges.append(_run_to_range(row, run))
+    return ranges
+
+
+def _run_to_range(row: int, run: list) -> dict:
+    import gspread.utils
+
+    start = gspread.utils.rowcol_to_a1(row, run[0][0])
+    end = gspread.utils.rowcol_to_a1(row, run[-1][0])
+    return {"range": start if start == end else f"{start}:{end}", "values": [[value for _, value in run]]}
+
+
+def page_delta_to_global(delta: dict, positions: np.ndarray) -> dict:
+    """
+    Maps an `st.data_editor` delta made on one page of a `paginate`d frame back to row positions in the full frame.
+
+    Args:
+        delta (dict): The editor's `edited_rows`, `added_rows` and `deleted_rows`, in page positions
+        positions (np.ndarray): Row positions of the page, as returned by `paginate`
+
+    Returns:
+        dict: The same delta in full-frame positions
+    """
+    return {
+        "edited_rows": {int(positions[int(row)]): changes for row, changes in delta.get("edited_rows", {}).items()},
+        "added_rows": delta.get("added_rows", []),
+        "deleted_rows": [int(positions[int(row)]) for row in delta.get("deleted_rows", [])],
+    }
+
+
+def rows_match(columns: list, values: list, expected: list) -> bool:
+    """
+    Whether sheet rows still hold the bets they are expected to. Both sides are parsed the way `load_bets` parses the
+    sheet, so formatting alone ("+150" against 150, 10.10 against 10.1) is not a difference.
+
+    Args:
+        columns (list): Column names in sheet order
+        values (list): Rows as read from the sheet, e.g. one `batch_get` range
+        expected (list): {column name: cell value} per row, e.g. from `journal.before_values`. Only the columns each
+            row holds are compared.
+
+    Returns:
+        bool: True when every row matches
+    """
+    import mirror
+
+    if len(values) != len(expected):
+        return False
+    width = len(columns)
+    sheet = normalize_bets(mirror.parse_values(pd.DataFrame([(list(row) + [""] * width)[:width] for row in values], columns=columns, dtype="string")))
+    wanted = normalize_bets(mirror.parse_values(pd.DataFrame([[str(row.get(name, "")) for name in columns] for row in expected], columns=columns, dtype="string")))
+    for position, row in enumerate(expected):
+        for name in row:
+            have, want = sheet[name].iloc[position], wanted[name].iloc[position]
+            if pd.isna(have) or pd.isna(want):
+                if not (pd.isna(have) and pd.isna(want)):
+                    return False
+            elif have != want:
+                return False
+    return True
+
+
+def _call(function, *args, **kwargs):
+    return function(*args, **kwargs)
+
+
+def _delete_rows(worksheet: "gspread.Worksheet", columns: list, first_row: int, last_row: int, expected: list, attempts: list) -> None:
+    """
+    One `delete_rows` call. A failed call may still have landed and shifted the rows, so a retry first re-reads them
+    and refuses to delete rows that are no longer the expected bets.
+    """
+    import gspread.utils
+
+    if attempts and expected is not None:
+        last_col = gspread.utils.rowcol_to_a1(1, len(columns)).rstrip("1")
+        values = worksheet.batch_get([f"A{first_row}:{last_col}{last_row}"])[0]
+        if not rows_match(columns, values, expected):
+            raise ValueError(
+                f"Sheet rows {first_row}-{last_row} no longer hold the bets being deleted; the deletion may already have landed"
+            )
+    attempts.append(first_row)
+    worksheet.delete_rows(first_row, last_row)
+
+
+def _appended(worksheet: "gspread.Worksheet", rows: list, columns: list = None) -> dict:
+    """
+    An `append_rows`-style response for `rows` when they are the last rows of the sheet, else None.
+    """
+    import gspread.utils
+
+    last_row = len(worksheet.batch_get(["A:A"])[0])
+    first_row = last_row - len(rows) + 1
+    if first_row < FIRST_DATA_ROW:
+        return None
+    width = max(map(len, rows))
+    last_col = gspread.utils.rowcol_to_a1(1, width).rstrip("1")
+    values = worksheet.batch_get([f"A{first_row}:{last_col}{last_row}"])[0]
+    if columns is not None:
+        landed = rows_match(columns, values, [dict(zip(columns, row)) for row in rows])
+    else:
+        landed = [(list(row) + [""] * width)[:width] for row in values] == [
+            ["" if value is None else str(value) for value in row] + [""] * (width - len(row)) for row in rows
+        ]
+    if not landed:
+        return None
+    return {"updates": {"updatedRange": f"{worksheet.title}!A{first_row}:{last_col}{last_row}", "updatedRows": len(rows)}}
+
+
+def append_rows_once(worksheet: "gspread.Worksheet", rows: list, attempts: list, columns: list = None, **kwargs) -> dict:
+    """
+    One `append_rows` call, for a `call` that retries it. A rate limit (429) rejects the call before anything is
+    written, so it is simply tried again; a server error or a dropped connection may come after the rows landed, so
+    the next try first reads the last rows of the sheet back and does not append them again when they are there.
+
+    Args:
+        worksheet (gspread.Worksheet): Worksheet to append to
+        rows (list): Rows to append
+        attempts (list): An empty list shared by every try of this append
+        columns (list): Column names in sheet order, to compare read-back rows as bets (see `rows_match`) rather than
+            as the values sent
+        **kwargs: Passed to `append_rows`
+
+    Returns:
+        dict: The `append_rows` response, or an equivalent one for rows found already appended
+    """
+    import gspread
+
+    if attempts and attempts[-1]:
+        response = _appended(worksheet, rows, columns)
+        if response:
+            return response
+    try:
+        return worksheet.append_rows(rows, **kwargs)
+    except Exception as error:
+        attempts.append(not (isinstance(error, gspread.exceptions.APIError) and error.response.status_code == 429))
+        raise
+
+
+def write_bet_delta(
+    worksheet: "gspread.Worksheet", columns: list, delta: dict, before: dict = None, progress: dict = None, call=None
+) -> dict:
+    """
+    Writes only what changed in an `st.data_editor` session: edited cells in one `batch_update`, added rows in one
+    `append_rows` and deleted rows bottom-up so earlier positions stay valid. Row positions refer to the frame the
+    editor was given, which mirrors the sheet order.
+
+    Every Sheets call goes through `call`, e.g. `write_queue.with_backoff`, so a failed call is retried on its own and
+    never repeats the calls that landed before it. Finished steps are recorded in `progress`; passing the same dict
+    again resumes at the first unfinished step.
+
+    Args:
+        worksheet (gspread.Worksheet): Master worksheet
+        columns (list): Column names in sheet order
+        delta (dict): The editor's session state value with `edited_rows`, `added_rows` and `deleted_rows`
+        before (dict): Overwritten values from `journal.before_values`. When given, a retried deletion first checks its
+            rows still hold these bets.
+        progress (dict): Steps already written, updated in place as each one lands
+        call: Makes each Sheets call as `call(function, *args, **kwargs)`, defaults to calling it directly
+
+    Returns:
+        dict: The `append_rows` response for added rows, or None when no rows were added
+    """
+    progress = {} if progress is None else progress
+    call = call or _call
+    # Positions may have been through JSON, which turns int keys into strings
+    before = {int(position): values for position, values in before.items()} if before is not None else None
+    edited_rows = delta.get("edited_rows", {})
+    added_rows = delta.get("added_rows", [])
+    deleted_rows = sorted(map(int, delta.get("deleted_rows", [])), reverse=True)
+
+    if not progress.get("edited"):
+        ranges = delta_to_ranges(columns, edited_rows)
+        if ranges:
+            call(worksheet.batch_update, ranges, value_input_option="RAW")
+        progress["edited"] = True
+    if added_rows and "appended" not in progress:
+        progress["appended"] = call(
+            append_rows_once,
+            worksheet,
+            [[to_cell(row.get(name), name) for name in columns] for row in added_rows],
+            attempts=[],
+            columns=columns,
+            value_input_option="RAW",
+        )
+    # Contiguous blocks, from the bottom up
+    blocks, block = [], []
+    for position in deleted_rows + [None]:
+        if block and (position is None or position != block[-1] - 1):
+            blocks.append(block[::-1])
+            block = []
+        if position is not None:
+            block.append(position)
+    for number, block in enumerate(blocks[progress.get("deleted", 0):], start=progress.get("deleted", 0)):
+        expected = [before[position] for position in block] if before is not None else None
+        call(_delete_rows, worksheet, columns, block[0] + FIRST_DATA_ROW, block[-1] + FIRST_DATA_ROW, expected, attempts=[])
+        progress["deleted"] = number + 1
+    return progress.get("appended")
+
+
+# ###########################################################################
+# Filtering
+# ###########################################################################
+# Text columns with fewer unique values than this are filtered with a multiselect
+CATEGORICAL_THRESHOLD = 10
+# Object columns are only parsed as dates when this many leading non-null values all parse
+DATE_SNIFF_SAMPLE = 20
+
+
+def _sniff_dates(values: pd.Series):
+    """
+    Parses an object column as dates if a small sample parses cleanly. Free text (notes, multi-line legs) fails on the
+    sample and is never parsed in full.
+    """
+    sample = values.dropna().head(DATE_SNIFF_SAMPLE)
+    if sample.empty or sample.astype(str).str.contains("\n").any():
+        return None
+    if pd.to_datetime(sample, errors="coerce", format="mixed").isna().any():
+        return None
+    parsed = pd.to_datetime(values, errors="coerce", format="mixed")
+    return parsed.dt.tz_localize(None) if parsed.dt.tz is not None else parsed
+
+
+@st.cache_resource(show_spinner=False, max_entries=32)
+def column_summaries(_df: pd.DataFrame, version: str) -> dict:
+    """
+    Infers how each column is filtered and precomputes what its widget needs, once per data version.
+    Cached as a resource so reruns share the summaries without copying them.
+
+    Args:
+        _df (pd.DataFrame): Frame to summarize (not hashed)
+        version (str): `schema.data_version` of the frame
+
+    Returns:
+        dict: {column: {"kind": "categorical" | "numeric" | "datetime" | "text", "values": ..., ...}}
+    """
+    summaries = {}
+    for column in _df.columns:
+        values = _df[column]
+        if is_datetime64_any_dtype(values) and getattr(values.dt, "tz", None) is not None:
+            values = values.dt.tz_localize(None)
+        elif is_object_dtype(values) or is_string_dtype(values):
+            parsed = _sniff_dates(values)
+            if parsed is not None:
+                values = parsed
+
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            observed = values.cat.categories[np.unique(values.cat.codes[values.cat.codes >= 0])]
+            summaries[column] = {"kind": "categorical", "values": values, "options": observed.tolist()}
+        elif values.nunique() < CATEGORICAL_THRESHOLD:
+            summaries[column] = {"kind": "categorical", "values": values, "options": values.dropna().unique().tolist()}
+        elif is_numeric_dtype(values):
+            summaries[column] = {"kind": "numeric", "values": values.to_numpy(), "min": float(values.min()), "max": float(values.max())}
+        elif is_datetime64_any_dtype(values):
+            summaries[column] = {"kind": "datetime", "values": values.to_numpy(), "min": values.min(), "max": values.max()}
+        else:
+            summaries[column] = {"kind": "text", "values": values}
+    return summaries
+
 
 def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Adds a UI on top of a dataframe to let viewers filter columns
+    Adds a UI on top of a dataframe to let viewers filter columns. Column types and widget ranges come from
+    `column_summaries`, and every selected filter is folded into one boolean mask over the original frame.
 
     Args:
         df (pd.DataFrame): Original dataframe
@@ -24,37 +547,29 @@ def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     if not modify:
         return df
 
-    df = df.copy()
-
-    # Try to convert datetimes into a standard format (datetime, no timezone)
-    for col in df.columns:
-        if is_object_dtype(df[col]):
-            try:
-                df[col] = pd.to_datetime(df[col])
-            except Exception:
-                pass
-
-        if is_datetime64_any_dtype(df[col]):
-            df[col] = df[col].dt.tz_localize(None)
+    summaries = column_summaries(df, data_version(df))
+    mask = np.ones(len(df), dtype=bool)
+    text_filters = []
 
     modification_container = st.container()
 
     with modification_container:
         to_filter_columns = st.multiselect("Filter dataframe on", df.columns)
         for column in to_filter_columns:
+            summary = summaries[column]
             left, right = st.columns((1, 20))
-            # Treat columns with < 10 unique values as categorical
-            if is_categorical_dtype(df[column]) or df[column].nunique() < 10:
+            if summary["kind"] == "categorical":
                 user_cat_input = right.multiselect(
                     f"Values for {column}",
-                    df[column].unique(),
-                    default=list(df[column].unique()),
+                    summary["options"],
+                    default=summary["options"],
                 )
-                df = df[df[column].isin(user_cat_input)]
-            elif is_numeric_dtype(df[column]):
-                _min = float(df[column].min())
-                _max = float(df[column].max())
-                step = (_max - _min) / 100
+                if len(user_cat_input) < len(summary["options"]):
+                    mask &= summary["values"].isin(user_cat_input).to_numpy()
+            elif summary["kind"] == "numeric":
+                _min = summary["min"]
+                _max = summary["max"]
+                step = (_max - _min) / 100 or 1.0
                 user_num_input = right.slider(
                     f"Values for {column}",
                     min_value=_min,
@@ -62,24 +577,113 @@ def filter_dataframe(df: pd.DataFrame) -> pd.DataFrame:
                     value=(_min, _max),
                     step=step,
                 )
-                df = df[df[column].between(*user_num_input)]
-            elif is_datetime64_any_dtype(df[column]):
+                if user_num_input != (_min, _max):
+                    values = summary["values"]
+                    mask &= (values >= user_num_input[0]) & (values <= user_num_input[1])
+            elif summary["kind"] == "datetime":
                 user_date_input = right.date_input(
                     f"Values for {column}",
                     value=(
-                        df[column].min(),
-                        df[column].max(),
+                        summary["min"],
+                        summary["max"],
                     ),
                 )
                 if len(user_date_input) == 2:
-                    user_date_input = tuple(map(pd.to_datetime, user_date_input))
-                    start_date, end_date = user_date_input
-                    df = df.loc[df[column].between(start_date, end_date)]
+                    start_date, end_date = map(np.datetime64, user_date_input)
+                    values = summary["values"]
+                    mask &= (values >= start_date) & (values <= end_date)
             else:
                 user_text_input = right.text_input(
                     f"Substring or regex in {column}",
                 )
                 if user_text_input:
-                    df = df[df[column].astype(str).str.contains(user_text_input)]
+                    text_filters.append((summary["values"], user_text_input))
 
-    return df
+    # Regex scans run last and only over rows the cheaper filters kept
+    for values, pattern in text_filters:
+        candidates = np.flatnonzero(mask)
+        matches = values.iloc[candidates].astype(str).str.contains(pattern).to_numpy(dtype=bool)
+        mask[candidates[~matches]] = False
+
+    if mask.all():
+        return df
+    filtered = df[mask]
+    # The filtered frame gets its own version so caches keyed on it (e.g. `sort_index`) never see the parent's
+    filtered.attrs["data_version"] = f"{data_version(df)}-{hashlib.sha1(np.packbits(mask).tobytes()).hexdigest()[:12]}"
+    return filtered
+
+
+@st.cache_resource(show_spinner=False, max_entries=16)
+def status_index(_df: pd.DataFrame, version: str, status: str) -> np.ndarray:
+    """
+    Row positions of bets with the given status, e.g. the open "Placed" bets, computed once per data version.
+
+    Args:
+        _df (pd.DataFrame): Bet data (not hashed)
+        version (str): `schema.data_version` of the frame
+        status (str): Bet Status value
+
+    Returns:
+        np.ndarray: Row positions in sheet order
+    """
+    return np.flatnonzero((_df["Bet Status"] == status).to_numpy(dtype=bool, na_value=False))
+
+
+# ###########################################################################
+# Server-side paging
+# ###########################################################################
+PAGE_SIZES = [25, 50, 100, 250, 500]
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def sort_index(_df: pd.DataFrame, version: str, column: str, ascending: bool) -> np.ndarray:
+    """
+    Row positions of the frame in sorted order, computed once per data version, column and direction.
+    Missing values sort last and ties keep sheet order.
+
+    Args:
+        _df (pd.DataFrame): Frame to sort (not hashed)
+        version (str): `schema.data_version` of the frame
+        column (str): Column to sort by
+        ascending (bool): Sort direction
+
+    Returns:
+        np.ndarray: Row positions
+    """
+    values = _df[column].reset_index(drop=True)
+    return values.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+
+
+def paginate(df: pd.DataFrame, key: str, default_columns: list = None) -> tuple:
+    """
+    Adds column, sort and paging controls and slices out only the visible page, so the browser receives one page of
+    the displayed columns instead of the whole frame.
+
+    Args:
+        df (pd.DataFrame): Frame to page through
+        key (str): Widget key prefix, unique per table on a page
+        default_columns (list): Columns shown initially, defaults to all
+
+    Returns:
+        tuple: (page dataframe, row positions of the page's rows in `df`)
+    """
+    controls = st.columns((4, 2, 1, 1, 1))
+    columns = controls[0].multiselect(
+        "Columns", df.columns.tolist(), default=default_columns or df.columns.tolist(), key=f"{key}_columns"
+    )
+    sort_column = controls[1].selectbox("Sort by", [None] + df.columns.tolist(), key=f"{key}_sort")
+    descending = controls[2].toggle("Descending", key=f"{key}_descending")
+    page_size = controls[3].selectbox("Rows per page", PAGE_SIZES, key=f"{key}_page_size")
+    pages = max((len(df) - 1) // page_size + 1, 1)
+    # Narrower filters can leave the remembered page past the end
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages
+    page = controls[4].number_input("Page", min_value=1, max_value=pages, value=1, step=1, key=f"{key}_page")
+
+    start = (page - 1) * page_size
+    if sort_column is None:
+        positions = np.arange(start, min(start + page_size, len(df)))
+    else:
+        positions = sort_index(df, data_version(df), sort_column, not descending)[start:start + page_size]
+    st.caption(f"Rows {start + 1 if len(df) else 0}–{start + len(positions)} of {len(df)} · page {page} of {pages}")
+    return df.iloc[positions][columns or df.columns.tolist()], positions
@@ -0,0 +1,436 @@
+"""
+Durable background write queue for the Master tab.
+
+Pages enqueue bet slips and editor deltas into a local SQLite file and return immediately. One worker thread per server
+process drains the queue in order: runs of pending slips are merged into a single `append_rows` call, each delta becomes
+one `utils.write_bet_delta`, archive rollovers and journal restores run as jobs of their own, and every Sheets call is
+retried on its own with exponential backoff on 429/5xx responses, so a retry never repeats calls that already landed. An
+append that failed after it may have landed (a server error or a dropped connection) is first looked for at the end of
+the sheet. Pending jobs survive a restart and are picked up when the worker next starts. A job is marked running before
+its first call and its finished steps are saved as it goes; a job a crash left running is failed with those steps in its
+error rather than replayed, as the call in flight may or may not have landed. Sessions poll `job_status` for the jobs
+they submitted.
+"""
+from contextlib import closing, contextmanager
+from datetime import datetime
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import streamlit as st
+import journal
+import mirror
+from utils import FIRST_DATA_ROW, MASTER_TAB, append_rows_once, get_worksheet, invalidate_bets, rows_match, spreadsheet_id, write_bet_delta
+
+QUEUE_PATH = os.path.join(mirror.MIRROR_DIR, "write_queue.sqlite")
+# Slips merged into one append_rows call, kept well under the Sheets API's request size limit
+APPEND_BATCH_ROWS = 500
+APPEND_BATCH_BYTES = 1_000_000
+# Backoff for rate limits and server errors: 1s, 2s, 4s ... capped, with jitter, then the job is marked failed
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 64.0
+MAX_ATTEMPTS = 8
+POLL_SECONDS = 0.5
+
+_lock = threading.Lock()
+_wake = threading.Event()
+
+
+@contextmanager
+def _connect():
+    os.makedirs(os.path.dirname(QUEUE_PATH), exist_ok=True)
+    with closing(sqlite3.connect(QUEUE_PATH, timeout=30, isolation_level=None)) as conn:
+        _create(conn)
+        yield conn
+
+
+def _create(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            error TEXT,
+            created_at REAL NOT NULL,
+            finished_at REAL
+        )
+        """
+    )
+    # Added after the first release, so older queue files gain them here
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+    for column in ("worker", "progress"):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+
+
+def _enqueue(kind: str, payload: dict) -> int:
+    with _lock, _connect() as conn:
+        job_id = conn.execute(
+            "INSERT INTO jobs (kind, payload, created_at) VALUES (?, ?, ?)",
+            (kind, json.dumps(payload, default=str), time.time()),
+        ).lastrowid
+    _wake.set()
+    return job_id
+
+
+def enqueue_append(gambler: str, columns: list, rows: list, value_input_option: str = "USER_ENTERED") -> int:
+    """
+    Queues new bet slips for `append_rows`.
+
+    Args:
+        gambler (str): Gambler who logged the slips, for the journal
+        columns (list): Column names in sheet order
+        rows (list): Row values, already converted for the sheet
+        value_input_option (str): How Sheets should interpret the values
+
+    Returns:
+        int: Job id
+    """
+    return _enqueue("append", {"gambler": gambler, "columns": columns, "rows": rows, "value_input_option": value_input_option})
+
+
+def enqueue_appends(gambler: str, columns: list, rows: list, value_input_option: str = "USER_ENTERED") -> list:
+    """
+    Queues a bulk import as consecutive slip jobs of at most `APPEND_BATCH_ROWS` rows and `APPEND_BATCH_BYTES`
+    bytes each, so every job fits in one `append_rows` call.
+
+    Args:
+        gambler (str): Gambler who imported the slips, for the journal
+        columns (list): Column names in sheet order
+        rows (list): Row values, already converted for the sheet
+        value_input_option (str): How Sheets should interpret the values
+
+    Returns:
+        list: Job ids, in sheet order
+    """
+    job_ids, chunk, size = [], [], 0
+    for row in rows:
+        row_size = _payload_size(row)
+        if chunk and (len(chunk) == APPEND_BATCH_ROWS or size + row_size > APPEND_BATCH_BYTES):
+            job_ids.append(enqueue_append(gambler, columns, chunk, value_input_option))
+            chunk, size = [], 0
+        chunk.append(row)
+        size += row_size
+    if chunk:
+        job_ids.append(enqueue_append(gambler, columns, chunk, value_input_option))
+    return job_ids
+
+
+def enqueue_delta(gambler: str, columns: list, delta: dict, before: dict, expected: dict) -> int:
+    """
+    Queues an `st.data_editor` delta, in sheet-order positions, for `utils.write_bet_delta`. The worker first checks
+    the rows it touches still hold `expected`, and fails the job otherwise: positions go stale when rows above them
+    are deleted, e.g. by an archive rollover, after the editor's frame was loaded.
+
+    Args:
+        gambler (str): Gambler who submitted the update
+        columns (list): Column names in sheet order
+        delta (dict): The editor's `edited_rows`, `added_rows` and `deleted_rows`
+        before (dict): Overwritten values from `journal.before_values`
+        expected (dict): Whole edited and deleted rows from `journal.row_values`
+
+    Returns:
+        int: Job id
+    """
+    return _enqueue("delta", {"gambler": gambler, "columns": columns, "delta": delta, "before": before, "expected": expected})
+
+
+def enqueue_rollover() -> int:
+    """
+    Queues `archive.rollover`, which deletes rows from Master and so must not interleave with other writes.
+
+    Returns:
+        int: Job id
+    """
+    return _enqueue("rollover", {})
+
+
+def enqueue_restore(as_of: datetime) -> int:
+    """
+    Queues `journal.write_restore`, which overwrites all of Master and so must not interleave with other writes.
+
+    Args:
+        as_of (datetime): Point in time to restore, UTC
+
+    Returns:
+        int: Job id
+    """
+    return _enqueue("restore", {"as_of": as_of.isoformat()})
+
+
+def job_status(job_ids: list) -> dict:
+    """
+    Current state of the given jobs.
+
+    Args:
+        job_ids (list): Ids returned by `enqueue_append` / `enqueue_delta`
+
+    Returns:
+        dict: {job id: (status, error)} with status one of "pending", "running", "done", "failed"
+    """
+    if not job_ids:
+        return {}
+    with _connect() as conn:
+        rows = conn.execute(
+            f"SELECT id, status, error FROM jobs WHERE id IN ({','.join('?' * len(job_ids))})", list(job_ids)
+        ).fetchall()
+    return {job_id: (status, error) for job_id, status, error in rows}
+
+
+def _payload_size(row: list) -> int:
+    return len(json.dumps(row, default=str).encode())
+
+
+def _retryable(error: Exception) -> bool:
+    import gspread
+    import requests
+
+    if isinstance(error, gspread.exceptions.APIError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def with_backoff(call, *args, **kwargs):
+    """
+    Runs a Sheets call, retrying rate-limit (429) and server (5xx) errors with capped exponential backoff and jitter.
+
+    Args:
+        call: Function making the API call
+        *args, **kwargs: Passed to `call`
+
+    Returns:
+        Whatever `call` returns
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return call(*args, **kwargs)
+        except Exception as error:
+            if not _retryable(error) or attempt == MAX_ATTEMPTS - 1:
+                raise
+            delay = min(BACKOFF_BASE_SECONDS * 2 ** attempt, BACKOFF_MAX_SECONDS)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+class _Progress(dict):
+    """
+    Finished steps of a running batch, saved to the queue each time one is recorded.
+    """
+
+    def __init__(self, job_ids: list):
+        super().__init__()
+        self.job_ids = job_ids
+
+    def __setitem__(self, step: str, value) -> None:
+        super().__setitem__(step, value)
+        with _lock, _connect() as conn:
+            conn.executemany(
+                "UPDATE jobs SET progress = ? WHERE id = ?", [(json.dumps(self, default=str), job_id) for job_id in self.job_ids]
+            )
+
+
+def _started(pid: int) -> str:
+    """
+    Start time of a running process, in clock ticks since boot (Linux), or None when it is not running.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rpartition(")")[2].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+# Host, pid and a start token: a restarted container often gets the same hostname and pid, but not the same start time
+_WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{_started(os.getpid()) or uuid.uuid4().hex}"
+
+
+def _worker_id() -> str:
+    return _WORKER_ID
+
+
+def _alive(worker: str) -> bool:
+    if worker == _WORKER_ID:
+        return True
+    parts = (worker or "").split(":")
+    # Ids without a start token predate it and are never this boot's workers
+    if len(parts) != 3 or parts[0] != socket.gethostname() or not parts[1].isdigit():
+        return False
+    _, pid, token = parts
+    return _started(int(pid)) == token
+
+
+def _fail_interrupted(conn: sqlite3.Connection) -> None:
+    """
+    Fails jobs left running by a worker that is no longer alive. The call in flight when it stopped may or may not
+    have landed, so replaying the job could append its rows twice or delete at shifted positions.
+    """
+    jobs = conn.execute("SELECT id, worker, progress FROM jobs WHERE status = 'running'").fetchall()
+    for job_id, worker, progress in jobs:
+        if _alive(worker):
+            continue
+        steps = ", ".join(json.loads(progress or "{}")) or "none"
+        _finish(
+            conn, [job_id], "failed",
+            f"Interrupted by a restart (finished steps: {steps}). Check Master and the Journal tab before submitting it again.",
+        )
+
+
+def _finish(conn: sqlite3.Connection, job_ids: list, status: str, error: str = None) -> None:
+    conn.executemany(
+        "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+        [(status, error, time.time(), job_id) for job_id in job_ids],
+    )
+
+
+def _next_batch(conn: sqlite3.Connection) -> list:
+    """
+    Oldest pending job, plus the pending slips queued right behind it when it is a slip, up to `APPEND_BATCH_ROWS`
+    rows and `APPEND_BATCH_BYTES` bytes. The jobs are marked running for this worker in the same transaction, so no
+    other worker on the queue file picks them up.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        batch = _pending_batch(conn)
+        conn.executemany(
+            "UPDATE jobs SET status = 'running', worker = ? WHERE id = ?", [(_worker_id(), job_id) for job_id, _, _ in batch]
+        )
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return batch
+
+
+def _pending_batch(conn: sqlite3.Connection) -> list:
+    jobs = conn.execute("SELECT id, kind, payload FROM jobs WHERE status = 'pending' ORDER BY id LIMIT ?", (APPEND_BATCH_ROWS,)).fetchall()
+    batch, rows, size = [], 0, 0
+    for job_id, kind, raw in jobs:
+        payload = json.loads(raw)
+        if batch and (kind != "append" or batch[0][1] != "append"):
+            break
+        if batch and (
+            rows + len(payload["rows"]) > APPEND_BATCH_ROWS
+            or size + len(raw) > APPEND_BATCH_BYTES
+            or payload["value_input_option"] != batch[0][2]["value_input_option"]
+        ):
+            break
+        batch.append((job_id, kind, payload))
+        rows += len(payload.get("rows", []))
+        size += len(raw)
+    return batch
+
+
+def _check_rows(worksheet, columns: list, expected: dict) -> None:
+    """
+    Reads the rows a delta is about to change and raises if any no longer holds the bet the editor showed.
+    """
+    import gspread.utils
+
+    if not expected:
+        return
+    last_col = gspread.utils.rowcol_to_a1(1, len(columns)).rstrip("1")
+    positions = sorted(map(int, expected))
+    values = with_backoff(
+        worksheet.batch_get, [f"A{position + FIRST_DATA_ROW}:{last_col}{position + FIRST_DATA_ROW}" for position in positions]
+    )
+    expected = {int(position): row for position, row in expected.items()}
+    stale = [
+        position + FIRST_DATA_ROW for position, rows in zip(positions, values)
+        if not rows_match(columns, list(rows)[:1], [expected[position]])
+    ]
+    if stale:
+        raise ValueError(
+            f"Master changed since the update was made (sheet rows {', '.join(map(str, stale[:10]))}); reload the page "
+            "and submit it again"
+        )
+
+
+def _run_batch(batch: list, progress: dict) -> tuple:
+    key = spreadsheet_id()
+    worksheet = get_worksheet(key, MASTER_TAB)
+    _, kind, payload = batch[0]
+    if kind == "append":
+        rows = [row for _, _, job in batch for row in job["rows"]]
+        if "appended" not in progress:
+            progress["appended"] = with_backoff(
+                append_rows_once, worksheet, rows, attempts=[], columns=payload["columns"],
+                value_input_option=payload["value_input_option"],
+            )
+        first_row, entries = journal.appended_row(progress["appended"]), []
+        mirror.mark_changed(rows=list(range(first_row, first_row + len(rows))))
+        invalidate_bets()
+        for _, _, job in batch:
+            entries += journal.append_entries(job["gambler"], job["columns"], job["rows"], first_row)
+            first_row += len(job["rows"])
+    elif kind == "rollover":
+        import archive
+
+        entries = archive.rollover(key)
+    elif kind == "restore":
+        entries = journal.write_restore(key, datetime.fromisoformat(payload["as_of"]), call=with_backoff)
+    else:
+        delta = payload["delta"]
+        if "edited" not in progress:
+            _check_rows(worksheet, payload["columns"], payload["expected"])
+        response = write_bet_delta(
+            worksheet, payload["columns"], delta, before=payload["before"], progress=progress, call=with_backoff
+        )
+        rows = [int(position) + FIRST_DATA_ROW for position in delta["edited_rows"]]
+        if response:
+            first_row = journal.appended_row(response)
+            rows += range(first_row, first_row + len(delta["added_rows"]))
+        # Deletions shift every row below them, so they need a full re-read of the mirror
+        mirror.mark_changed(rows=rows, full=bool(delta["deleted_rows"]))
+        invalidate_bets()
+        entries = journal.delta_entries(payload["gambler"], payload["columns"], payload["before"], delta, response)
+    return key, entries
+
+
+def _work() -> None:
+    with _lock, _connect() as conn:
+        _fail_interrupted(conn)
+    while True:
+        with _lock, _connect() as conn:
+            batch = _next_batch(conn)
+        if not batch:
+            _wake.wait(POLL_SECONDS)
+            _wake.clear()
+            continue
+        job_ids = [job_id for job_id, _, _ in batch]
+        progress = _Progress(job_ids)
+        try:
+            # Every write below is flagged for the mirror, so its Drive modified time is not an outside edit
+            with mirror.own_writes():
+                key, entries = _run_batch(batch, progress)
+                # The bets are written at this point, so a journal failure is reported without failing the job
+                error = None
+                try:
+                    journal.record(key, entries, call=with_backoff)
+                    progress["journaled"] = True
+                except Exception as journal_error:
+                    error = f"Journal not updated: {type(journal_error).__name__}: {journal_error}"
+        except Exception as error:
+            with _lock, _connect() as conn:
+                _finish(conn, job_ids, "failed", f"{type(error).__name__}: {error}")
+            continue
+        with _lock, _connect() as conn:
+            _finish(conn, job_ids, "done", error)
+
+
+@st.cache_resource(show_spinner=False)
+def start_worker() -> threading.Thread:
+    """
+    Starts the process-wide queue worker once; later calls return the running thread.
+
+    Returns:
+        threading.Thread: Worker thread
+    """
+    worker = threading.Thread(target=_work, daemon=True, name="sheets-write-queue")
+    worker.start()
+    return worker